@@ -56,10 +56,84 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Les transactions prennent le verrou d'écriture dès leur ouverture : deux réservations
+            # concurrentes sont ainsi sérialisées au lieu de lire toutes deux un créneau libre.
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
         }
     }
 
 
+# Cache des données de référence (jours, catalogue des salons et des soins).
+# En production, REDIS_URL désigne un cache partagé par tous les workers gunicorn : les compteurs de
+# génération incrémentés à chaque modification y sont visibles par tous. Sans REDIS_URL, chaque processus a
+# son propre cache mémoire : une modification faite dans un worker n'invalide pas les copies des autres,
+# d'où une durée de vie de quelques secondes seulement (et un avertissement au démarrage, voir wsgi.py).
+CACHE_PARTAGE = bool(os.environ.get('REDIS_URL'))
+if CACHE_PARTAGE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Durée de vie des entrées du cache de référence (en secondes). Avec un cache partagé, les modifications
+# l'invalident immédiatement ; avec un cache par processus, seule cette durée borne le retard des autres workers.
+CACHE_REFERENCE_DUREE = 24 * 60 * 60 if CACHE_PARTAGE else 5
+
+# Indicatif pays des numéros de téléphone saisis au format national (normalisation E.164).
+INDICATIF_TELEPHONE_PAR_DEFAUT = '32'
+
+# Instrumentation des requêtes (gestion.middleware.InstrumentationMiddleware) : part des requêtes mesurées,
+# de 0.0 à 1.0, réglable par variable d'environnement pour échantillonner en production sous forte charge.
+INSTRUMENTATION_TAUX_ECHANTILLONNAGE = float(os.environ.get('INSTRUMENTATION_TAUX_ECHANTILLONNAGE', '1.0'))
+# Renvoie les mesures dans l'en-tête Server-Timing (temps SQL, gabarits, vue) des réponses mesurées, au
+# personnel (is_staff) seulement, ou à tous en DEBUG ; la ligne de journal JSON est écrite pour toutes.
+INSTRUMENTATION_SERVER_TIMING = True
+
+# Journal des requêtes SQL lentes (gestion.requetes_lentes) : seuil en millisecondes, 0 pour le désactiver.
+REQUETES_LENTES_SEUIL_MS = float(os.environ.get('REQUETES_LENTES_SEUIL_MS', '100'))
+# Fichier JSON Lines du journal, résumé par la commande resumer_requetes_lentes.
+REQUETES_LENTES_FICHIER = os.environ.get('REQUETES_LENTES_FICHIER', BASE_DIR / 'journaux' / 'requetes_lentes.jsonl')
+# PostgreSQL : intervalle minimal (en secondes) entre deux EXPLAIN (ANALYZE, BUFFERS) d'une même requête lente,
+# qui est alors exécutée une seconde fois. 0 pour ne jamais capturer de plan.
+REQUETES_LENTES_EXPLAIN_INTERVALLE = 300
+
+# Dossier des profils enregistrés par gestion.middleware.ProfilageMiddleware (?profiler=1, personnel seulement).
+PROFILAGE_DOSSIER = BASE_DIR / 'profils'
+
+# Journalisation : les mesures de l'instrumentation sont écrites une par ligne, en JSON, sur la sortie
+# d'erreur (récupérée par gunicorn et par les journaux de l'hébergeur).
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'instrumentation': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'gestion.instrumentation': {
+            'handlers': ['instrumentation'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # Application definition
 INSTALLED_APPS = [
     # J'ai déplacé 'gestion' en premier pour une meilleure gestion des traductions
@@ -75,6 +149,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Après WhiteNoise (fichiers statiques non mesurés), avant les sessions dont les requêtes SQL sont comptées.
+    'gestion.middleware.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -82,6 +158,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # ?profiler=1 sur n'importe quelle URL pour le personnel : nécessite request.user.
+    'gestion.middleware.ProfilageMiddleware',
 ]
 
 ROOT_URLCONF = 'GestionClient.urls'
@@ -7,10 +7,28 @@ For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 """
 
+import logging
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'GestionClient.settings')
 
 application = get_wsgi_application()
+
+# Sans REDIS_URL, chaque worker a son propre cache mémoire : les invalidations ne se propagent pas d'un
+# worker à l'autre et le cache de référence ne vit que CACHE_REFERENCE_DUREE secondes.
+if not settings.CACHE_PARTAGE:
+    logging.getLogger(__name__).warning(
+        "REDIS_URL n'est pas défini : cache mémoire propre à chaque worker, données de référence conservées "
+        "%s s seulement. Définir REDIS_URL pour partager le cache entre les workers.",
+        settings.CACHE_REFERENCE_DUREE)
+
+# Préchauffe le cache des données de référence au démarrage du worker, pour que les premières requêtes
+# ne paient pas le chargement du catalogue. Une base indisponible ne doit pas empêcher le démarrage.
+try:
+    from gestion.services.cache_reference import prechauffer
+    prechauffer()
+except Exception:
+    logging.getLogger(__name__).warning("Préchauffage du cache de référence impossible.", exc_info=True)
@@ -1,7 +1,7 @@
 # gestion/admin.py
 from django.contrib import admin
 from .models import RendezVous, Salon, Soin, SoinSalonDetail, Utilisateur, Jour, PlageHoraire, JourSpecial, \
-    PlageHoraireSpeciale  # Assurez-vous d'importer tous vos modèles
+    PlageHoraireSpeciale, PeriodeFermeture  # Assurez-vous d'importer tous vos modèles
 
 # Enregistrez vos modèles ici
 admin.site.register(RendezVous)  # Ajoutez cette ligne
@@ -13,3 +13,4 @@ admin.site.register(Jour)
 admin.site.register(PlageHoraire)
 admin.site.register(JourSpecial)
 admin.site.register(PlageHoraireSpeciale)
+admin.site.register(PeriodeFermeture)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class GestionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gestion'
+
+    def ready(self):
+        # Enregistre les signaux qui maintiennent les données dérivées (calendrier des horaires effectifs).
+        from gestion import signals  # noqa: F401
+        # Installe le journal des requêtes SQL lentes sur chaque nouvelle connexion (signal connection_created).
+        from gestion import requetes_lentes  # noqa: F401
@@ -5,7 +5,8 @@ from datetime import date
 from django import forms
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
-from gestion.models import PlageHoraire, Jour, JourSpecial, PlageHoraireSpeciale
+from gestion.models import Salon, PlageHoraire, Jour, JourSpecial, PlageHoraireSpeciale
+from gestion.services import cache_reference
 
 
 class PlageHoraireForm(forms.ModelForm):
@@ -27,6 +28,10 @@ class PlageHoraireForm(forms.ModelForm):
         self.salon = kwargs.pop('salon', None)
         super().__init__(*args, **kwargs)
         self.fields['jour'].queryset = Jour.objects.all().order_by('numero')
+        # Liste affichée depuis le cache de référence : la table n'est lue que pour valider le choix soumis.
+        self.fields['jour'].choices = [('', self.fields['jour'].empty_label)] + [
+            (jour.pk, str(jour)) for jour in cache_reference.jours()
+        ]
 
         for field_name, field in self.fields.items():
             if not isinstance(field.widget, (forms.CheckboxSelectMultiple, forms.RadioSelect)):
@@ -199,6 +204,21 @@ class PeriodeVacancesForm(forms.Form):
         required=False,  # Pour qu'il puisse être coché ou non
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
     )
+    # Permet d'appliquer la même fermeture (congés scolaires...) à plusieurs salons en une fois
+    salons = forms.ModelMultipleChoiceField(
+        label="Appliquer aussi à ces salons",
+        queryset=Salon.objects.none(),
+        required=False,
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        self.salon = kwargs.pop('salon', None)
+        super().__init__(*args, **kwargs)
+        autres_salons = Salon.objects.order_by('nom').only('nom')
+        if self.salon:
+            autres_salons = autres_salons.exclude(pk=self.salon.pk)
+        self.fields['salons'].queryset = autres_salons
 
     def clean(self):
         cleaned_data = super().clean()
@@ -1,12 +1,14 @@
 # gestion/forms/rendezvous_forms.py
 
 from django import forms
-from gestion.models import (
-    Soin, SoinSalonDetail, Salon, RendezVous, Utilisateur, Jour, PlageHoraire,
-    JourSpecial, PlageHoraireSpeciale
-)
+from gestion.models import Soin, SoinSalonDetail, Salon, RendezVous, Utilisateur, STATUT_CHOICES
 from django.core.exceptions import ValidationError
-from datetime import timedelta, datetime, time, date
+from datetime import datetime, time, date
+
+from gestion.forms.widgets import SelecteurUtilisateur
+from gestion.services import cache_reference
+from gestion.services.disponibilites import BATTEMENT
+from gestion.services.validation import erreurs_rendezvous, erreurs_disponibilite
 
 
 class RendezVousForm(forms.ModelForm):
@@ -50,8 +52,10 @@ class RendezVousForm(forms.ModelForm):
                 self.fields['utilisateur'].initial = self.user.pk
                 self.fields['utilisateur'].queryset = Utilisateur.objects.filter(pk=self.user.pk)
         elif self.user and (self.user.is_professional or self.user.role == 'eleve'):
-            self.fields['utilisateur'].queryset = Utilisateur.objects.all().order_by('last_name', 'first_name')
-            self.fields['utilisateur'].empty_label = "Sélectionner un bénéficiaire"
+            # Aucune option n'est rendue : le bénéficiaire est choisi par recherche et seule sa clé est soumise,
+            # puis validée en une requête par le champ.
+            self.fields['utilisateur'].queryset = Utilisateur.objects.all()
+            self.fields['utilisateur'].widget = SelecteurUtilisateur()
         else:
             self.fields['utilisateur'].queryset = Utilisateur.objects.none()
 
@@ -71,6 +75,11 @@ class RendezVousForm(forms.ModelForm):
                 'soin')
             self.fields['soin_detail'].label_from_instance = lambda \
                 obj: f"{obj.soin.type_de_soin} ({int(obj.duree.total_seconds() / 60)} min) - {obj.prix}€"
+            # Options lues dans le cache de référence ; la base n'est consultée que pour valider le soin soumis.
+            self.fields['soin_detail'].choices = [('', self.fields['soin_detail'].empty_label)] + [
+                (detail.pk, self.fields['soin_detail'].label_from_instance(detail))
+                for detail in cache_reference.soins_du_salon(self.salon.pk)
+            ]
         else:
             self.fields['soin_detail'].queryset = SoinSalonDetail.objects.none()
 
@@ -96,87 +105,31 @@ class RendezVousForm(forms.ModelForm):
         if not all([utilisateur_rv, date_rv, heure_debut_rv, soin_detail, salon]):
             return cleaned_data
 
-        # --- NOUVELLE LOGIQUE DE VALIDATION POUR LA PÉRIODE D'ACTIVITÉ ---
-        if salon.date_debut_periode and date_rv < salon.date_debut_periode:
-            raise ValidationError("Le salon n'est pas encore en période d'activité à cette date.")
-
-        if salon.date_fin_periode and date_rv > salon.date_fin_periode:
-            raise ValidationError("Le salon ne sera plus en période d'activité à cette date.")
-        # --- FIN DE LA NOUVELLE LOGIQUE ---
-
-        rv_datetime_debut = datetime.combine(date_rv, heure_debut_rv)
-        if rv_datetime_debut < datetime.now():
-            raise ValidationError("Le rendez-vous ne peut pas être pris dans le passé.")
-
         duree_soin = soin_detail.duree
-        duree_totale_rv = duree_soin + timedelta(minutes=10)
-        dt_heure_fin_rv = datetime.combine(datetime.min.date(), heure_debut_rv) + duree_totale_rv
+        duree_totale_rv = duree_soin + BATTEMENT
+        dt_heure_fin_rv = datetime.combine(date_rv, heure_debut_rv) + duree_totale_rv
         heure_fin_rv = dt_heure_fin_rv.time()
         cleaned_data['heure_fin'] = heure_fin_rv
 
-        # Validation : heures d'ouverture du salon
-        jour_semaine = date_rv.weekday()
-        jour_special = JourSpecial.objects.filter(salon=salon, date=date_rv).first()
-        plages_ouverture_effectives = []
-        if jour_special:
-            if jour_special.est_ferme:
-                raise ValidationError("Le salon est entièrement fermé ce jour spécial.")
-            plages_ouverture_effectives = PlageHoraireSpeciale.objects.filter(jour_special=jour_special).order_by(
-                'heure_debut')
-        else:
-            try:
-                jour_obj = Jour.objects.get(numero=jour_semaine)
-                plages_ouverture_effectives = PlageHoraire.objects.filter(salon=salon, jour=jour_obj).order_by(
-                    'heure_debut')
-            except Jour.DoesNotExist:
-                pass
-
-        if not any(
-                plage.heure_debut <= heure_debut_rv and plage.heure_fin >= heure_fin_rv
-                for plage in plages_ouverture_effectives
-        ):
-            raise ValidationError(
-                f"Le rendez-vous ({heure_debut_rv.strftime('%H:%M')} - {heure_fin_rv.strftime('%H:%M')}) "
-                "n'est pas entièrement compris dans les heures d'ouverture du salon pour cette date."
-            )
-
-        # Validation 1: Pas de chevauchement pour le client
-        qs_existing_rv_client = RendezVous.objects.filter(
-            utilisateur=utilisateur_rv,
-            date=date_rv,
-            heure_debut__lt=heure_fin_rv,
-            heure_fin__gt=heure_debut_rv,
-        )
-        if self.instance and self.instance.pk:
-            qs_existing_rv_client = qs_existing_rv_client.exclude(pk=self.instance.pk)
-        if qs_existing_rv_client.exists():
-            raise ValidationError(
-                "Ce client a déjà un rendez-vous qui chevauche cette plage horaire. "
-                "Veuillez choisir un autre créneau."
-            )
-
-        # Validation 2: Disponibilité des employés du salon
-        qs_existing_rv_salon = RendezVous.objects.filter(
-            salon=salon,
-            date=date_rv,
-            heure_debut__lt=heure_fin_rv,
-            heure_fin__gt=heure_debut_rv,
-        )
-        if self.instance and self.instance.pk:
-            qs_existing_rv_salon = qs_existing_rv_salon.exclude(pk=self.instance.pk)
-
-        nombre_employes_occupes = qs_existing_rv_salon.count()
-        nombre_employes_total = salon.nombre_employes
-
-        if nombre_employes_total <= 0:
-            raise ValidationError("Ce salon ne dispose pas d'employés enregistrés pour prendre des rendez-vous.")
-
-        if nombre_employes_occupes >= nombre_employes_total:
-            raise ValidationError(
-                "Désolé, tous les employés sont occupés à cette heure. Veuillez choisir un autre créneau.")
+        # Toutes les règles (période d'activité, passé, heures d'ouverture, employés) sont évaluées en deux
+        # requêtes, et toutes les erreurs sont présentées ensemble. Le chevauchement avec un autre rendez-vous
+        # du client est refusé par la base à l'enregistrement (voir services/reservation.py).
+        erreurs = erreurs_rendezvous(salon, date_rv, heure_debut_rv, heure_fin_rv, exclure_pk=self.instance.pk)
+        if erreurs:
+            raise ValidationError(erreurs)
 
         return cleaned_data
 
+    def verifier_disponibilite(self):
+        """
+        Vérifie que les employés du salon sont libres sur le créneau déjà nettoyé.
+        Appelée par le service de réservation sous verrou, juste avant l'enregistrement.
+        """
+        erreurs = erreurs_disponibilite(self.salon, self.cleaned_data['date'], self.cleaned_data['heure_debut'],
+                                        self.cleaned_data['heure_fin'], exclure_pk=self.instance.pk)
+        if erreurs:
+            raise ValidationError(erreurs)
+
 
 class ModifierStatutForm(forms.ModelForm):
     """
@@ -191,3 +144,45 @@ class ModifierStatutForm(forms.ModelForm):
         widgets = {
             'statut': forms.Select(attrs={'class': 'form-select'}),
         }
+
+
+class FiltreRendezVousForm(forms.Form):
+    """
+    Filtres de la liste de tous les rendez-vous (rendezvous_tous_view). Chaque filtre correspond à un
+    prédicat indexé : salon, plage de dates, statut et type de soin.
+    """
+    salon = forms.ModelChoiceField(
+        queryset=Salon.objects.order_by('nom'),
+        required=False,
+        empty_label="Tous les salons",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    du = forms.DateField(
+        label="Du",
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}, format='%Y-%m-%d')
+    )
+    au = forms.DateField(
+        label="Au",
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}, format='%Y-%m-%d')
+    )
+    statut = forms.ChoiceField(
+        choices=[('', 'Tous les statuts')] + STATUT_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    soin = forms.ModelChoiceField(
+        queryset=Soin.objects.order_by('type_de_soin'),
+        required=False,
+        empty_label="Tous les soins",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        du = cleaned_data.get('du')
+        au = cleaned_data.get('au')
+        if du and au and au < du:
+            self.add_error('au', "La date de fin doit être postérieure ou égale à la date de début.")
+        return cleaned_data
@@ -6,8 +6,40 @@ from django.contrib.auth.forms import UserChangeForm, UserCreationForm
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 
+from gestion.normalisation import normaliser_telephone, normaliser_email
 
-class UtilisateurCreationForm(UserCreationForm):
+
+class CoordonneesUniquesMixin:
+    """
+    Refuse un email ou un numéro de téléphone déjà utilisé par un autre compte, à la casse et au format près
+    (« 0471 23 45 67 » et « +32471234567 » sont le même numéro). Une lecture d'index unique par champ.
+    """
+
+    def _autres_comptes(self):
+        utilisateurs = Utilisateur.objects.all()
+        if self.instance.pk:
+            utilisateurs = utilisateurs.exclude(pk=self.instance.pk)
+        return utilisateurs
+
+    def clean_email(self):
+        email = self.cleaned_data['email']
+        if self._autres_comptes().filter(email_normalise=normaliser_email(email)).exists():
+            raise forms.ValidationError(_("Cette adresse e-mail est déjà utilisée."))
+        return email
+
+    def clean_telephone(self):
+        telephone = self.cleaned_data.get('telephone')
+        if not telephone:
+            return None
+        telephone_normalise = normaliser_telephone(telephone)
+        if telephone_normalise is None:
+            raise forms.ValidationError(_("Ce numéro de téléphone n'est pas valide."))
+        if self._autres_comptes().filter(telephone_normalise=telephone_normalise).exists():
+            raise forms.ValidationError(_("Ce numéro de téléphone est déjà utilisé par un autre compte."))
+        return telephone
+
+
+class UtilisateurCreationForm(CoordonneesUniquesMixin, UserCreationForm):
     """
     Formulaire pour la création d'un nouvel utilisateur.
     Il inclut le champ 'telephone' et utilise les fonctionnalités
@@ -54,12 +86,6 @@ class UtilisateurCreationForm(UserCreationForm):
             'telephone': _('Entrez un numéro de téléphone valide (ex: +324701234567, 0471 23 45 67).')
         }
 
-    def clean_email(self):
-        email = self.cleaned_data['email']
-        if Utilisateur.objects.filter(email=email).exists():
-            raise forms.ValidationError(_("Cette adresse e-mail est déjà utilisée."))
-        return email
-
     def save(self, commit=True):
         user = super().save(commit=False)
         if user.role == 'professionnel':
@@ -71,7 +97,7 @@ class UtilisateurCreationForm(UserCreationForm):
         return user
 
 
-class UtilisateurChangeForm(UserChangeForm):
+class UtilisateurChangeForm(CoordonneesUniquesMixin, UserChangeForm):
     """
     Formulaire pour la modification des informations d'un utilisateur existant.
     Il inclut le champ 'telephone'.
@@ -123,13 +149,6 @@ class UtilisateurChangeForm(UserChangeForm):
 
         }
 
-    def clean_email(self):
-        email = self.cleaned_data['email']
-        if self.instance.pk:  # Lors d'une modification
-            if Utilisateur.objects.filter(email=email).exclude(pk=self.instance.pk).exists():
-                raise forms.ValidationError(_("Cette adresse e-mail est déjà utilisée par un autre compte."))
-        return email
-
     def save(self, commit=True):
         user = super().save(commit=False)
         if user.role == 'professionnel':
@@ -142,7 +161,7 @@ class UtilisateurChangeForm(UserChangeForm):
         return user
 
 
-class UtilisateurPublicRegistrationForm(UserCreationForm):
+class UtilisateurPublicRegistrationForm(CoordonneesUniquesMixin, UserCreationForm):
     """
     Formulaire simplifié pour l'inscription d'un nouvel utilisateur (client/élève) via la page "Créer un compte".
     Expose les champs pertinents pour l'utilisateur final et définit le rôle/statut par défaut.
@@ -179,12 +198,6 @@ class UtilisateurPublicRegistrationForm(UserCreationForm):
             'telephone': _('Entrez un numéro de téléphone valide (ex: +324701234567, 0471 23 45 67).')
         }
 
-    def clean_email(self):
-        email = self.cleaned_data['email']
-        if Utilisateur.objects.filter(email=email).exists():
-            raise forms.ValidationError(_("Cette adresse e-mail est déjà utilisée."))
-        return email
-
     def save(self, commit=True):
         user = super().save(commit=False)
         user.role = 'client'
@@ -0,0 +1,37 @@
+# gestion/forms/widgets.py
+
+from django import forms
+from django.urls import reverse_lazy
+
+from gestion.models import Utilisateur
+from gestion.services.recherche import LONGUEUR_MINIMALE, libelle_utilisateur
+
+
+class SelecteurUtilisateur(forms.Widget):
+    """
+    Champ de recherche avec suggestions (voir utilisateur_recherche) qui ne soumet que la clé primaire
+    de l'utilisateur choisi, dans un champ caché. Aucune liste d'utilisateurs n'est rendue dans la page.
+    """
+    template_name = 'gestion/widgets/selecteur_utilisateur.html'
+
+    def __init__(self, attrs=None, url=reverse_lazy('utilisateur_recherche')):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        libelle = ''
+        if value:
+            # Une seule lecture, uniquement pour réafficher un choix déjà fait (modification, formulaire invalide).
+            utilisateur = Utilisateur.objects.filter(pk=value).only('first_name', 'last_name', 'email').first()
+            if utilisateur:
+                libelle = libelle_utilisateur(utilisateur)
+        context['widget'].update({
+            'url': str(self.url),
+            'libelle': libelle,
+            'longueur_minimale': LONGUEUR_MINIMALE,
+        })
+        return context
+
+    def id_for_label(self, id_):
+        return f'{id_}_recherche' if id_ else id_
@@ -0,0 +1,67 @@
+# gestion/management/commands/analyser_requetes_rendezvous.py
+
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from gestion.models import RendezVous
+
+
+class Command(BaseCommand):
+    help = ("Affiche le plan d'exécution et le temps médian des requêtes critiques sur RendezVous "
+            "(contrôles de chevauchement, agendas des salons). À lancer sur une base volumineuse "
+            "avant et après une modification des index pour comparer les plans.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repetitions', type=int, default=20,
+                            help="Nombre d'exécutions de chaque requête pour le temps médian.")
+        parser.add_argument('--analyze', action='store_true',
+                            help="PostgreSQL uniquement : EXPLAIN (ANALYZE, BUFFERS) au lieu de EXPLAIN.")
+
+    def handle(self, *args, **options):
+        exemple = RendezVous.objects.order_by('-id').values('salon_id', 'utilisateur_id', 'debut').first()
+        if exemple is None:
+            raise CommandError("Aucun rendez-vous en base : générez d'abord des données.")
+
+        salon_id = exemple['salon_id']
+        utilisateur_id = exemple['utilisateur_id']
+        debut = exemple['debut']
+        fin = debut + timedelta(hours=1)
+        maintenant = timezone.now()
+
+        requetes = {
+            "Chevauchement client (contrainte de non-chevauchement)": RendezVous.objects.actifs().filter(
+                utilisateur_id=utilisateur_id, debut__lt=fin, fin__gt=debut),
+            "Capacité du salon (réservation)": RendezVous.objects.actifs().filter(
+                salon_id=salon_id, debut__lt=fin, fin__gt=debut
+            ).values_list('debut', 'fin'),
+            "Disponibilités d'une semaine": RendezVous.objects.actifs().filter(
+                salon_id=salon_id, debut__lt=debut + timedelta(days=7), fin__gt=debut
+            ).values_list('debut', 'fin'),
+            "Agenda à venir (detail_salon)": RendezVous.objects.filter(
+                salon_id=salon_id, debut__gte=maintenant).order_by('debut'),
+            "Historique (anciens_rendezvous)": RendezVous.objects.filter(
+                salon_id=salon_id, debut__lt=maintenant).order_by('-debut'),
+        }
+
+        options_explain = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                raise CommandError("--analyze n'est disponible que sur PostgreSQL.")
+            options_explain = {'analyze': True, 'buffers': True}
+
+        self.stdout.write(f"Base : {connection.vendor} - {RendezVous.objects.count()} rendez-vous\n")
+        for titre, queryset in requetes.items():
+            durees = []
+            for _ in range(options['repetitions']):
+                depart = time.perf_counter()
+                list(queryset)
+                durees.append((time.perf_counter() - depart) * 1000)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(titre))
+            self.stdout.write(queryset.explain(**options_explain))
+            self.stdout.write(f"Temps médian : {statistics.median(durees):.2f} ms\n")
@@ -0,0 +1,368 @@
+# gestion/management/commands/generer_donnees.py
+
+import multiprocessing
+import random
+import time as chrono
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from gestion.models import (
+    Utilisateur, Soin, Salon, SoinSalonDetail, Jour, PlageHoraire, JourSpecial, PlageHoraireSpeciale,
+    PeriodeFermeture, RendezVous
+)
+from gestion.services import cache_reference
+from gestion.services.calendrier import calculer_journees, reconstruire_calendrier
+from gestion.services.disponibilites import BATTEMENT
+
+# Jeu de données volumineux et reproductible pour le travail de performance : à graine et volumes égaux,
+# deux exécutions produisent exactement les mêmes lignes, quel que soit le nombre de processus (chaque
+# salon a son propre générateur aléatoire, dérivé de la graine).
+
+PRENOMS = [
+    'Alice', 'Amélie', 'Antoine', 'Bob', 'Camille', 'Chloé', 'Clément', 'David', 'Élodie', 'Émile', 'Eva',
+    'Félix', 'Gina', 'Hélène', 'Hugo', 'Inès', 'Iris', 'Jérôme', 'Julien', 'Léa', 'Louis', 'Manon', 'Noémie',
+    'Océane', 'Raphaël', 'Sarah', 'Théo', 'Zoé',
+]
+
+NOMS = [
+    'Dupont', 'Martin', 'Durand', 'Petit', 'Moreau', 'Garcia', 'Lemoine', 'Faure', 'Henry', 'Lopez',
+    'Peeters', 'Janssens', 'Maes', 'Jacobs', 'Mertens', 'Willems', 'Claes', 'Goossens', 'Wouters', 'Lambert',
+    'Dubois', 'Lefèvre', 'Dumont', 'Leclercq', 'Renard', 'Simon', 'Laurent', 'Hermans', 'Van den Berg',
+    'De Smet',
+]
+
+VILLES = [
+    ('Namur', '5000'), ('Liège', '4000'), ('Bruxelles', '1000'), ('Charleroi', '6000'), ('Mons', '7000'),
+    ('Wavre', '1300'), ('Verviers', '4800'), ('Arlon', '6700'), ('Tournai', '7500'), ('Dinant', '5500'),
+]
+
+ENSEIGNES = ['Le Spa Zen', 'Beauté Divine', 'Institut Lumière', 'Bulle de Soie', 'Éclat Nature', 'Rose & Lin']
+
+# (type de soin, durée en minutes, prix de base en euros)
+SOINS = [
+    ('Massage Relaxant', 60, 55), ('Soin du Visage Hydratant', 90, 75), ('Manucure Classique', 45, 30),
+    ('Pédicure Complète', 75, 45), ('Épilation Jambes Complètes', 30, 28), ('Réflexologie Plantaire', 60, 50),
+    ('Peeling Doux', 45, 40), ('Soin Anti-Âge Premium', 120, 110), ('Gommage Corporel', 30, 35),
+    ('Coiffure Coupe & Brushing', 60, 45), ('Massage aux Pierres Chaudes', 75, 70), ('Beauté des Mains', 40, 32),
+]
+
+# Horaires hebdomadaires types : {numéro du jour: [(début, fin), ...]}.
+MODELES_HORAIRES = [
+    {j: [(time(9), time(12)), (time(13), time(18))] for j in range(5)},
+    {j: [(time(10), time(14)), (time(15), time(19))] for j in range(1, 6)},
+    {**{j: [(time(9), time(18))] for j in range(6)}},
+    {**{j: [(time(9, 30), time(13)), (time(14), time(19))] for j in range(1, 5)}, 5: [(time(9), time(16))]},
+]
+
+# Jours fériés belges à date fixe (mois, jour) : le salon est fermé.
+JOURS_FERIES = [(1, 1), (5, 1), (7, 21), (8, 15), (11, 1), (11, 11), (12, 25)]
+
+# Veilles de fête : horaires réduits (jour spécial avec une plage spécifique).
+JOURS_REDUITS = [(12, 24), (12, 31)]
+
+# Répartition des rôles des utilisateurs générés.
+PART_PROFESSIONNELS = 0.02
+PART_ELEVES = 0.03
+
+# Pas entre deux heures de début envisagées et part des rendez-vous annulés.
+PAS_CRENEAU = timedelta(minutes=15)
+PART_ANNULES = 0.08
+
+# Nombre maximal de tirages pour trouver un client libre ce jour-là.
+ESSAIS_CLIENT = 5
+
+
+def _dates_du_mois_jour(date_debut, date_fin, mois_jours):
+    for annee in range(date_debut.year, date_fin.year + 1):
+        for mois, jour in mois_jours:
+            candidat = date(annee, mois, jour)
+            if date_debut <= candidat <= date_fin:
+                yield candidat
+
+
+def _initialiser_processus():
+    django.setup()
+
+
+def _generer_rendezvous_salon(parametres):
+    """
+    Génère et insère les rendez-vous d'un salon sur la période, par lots. Chaque employé enchaîne des soins
+    sans chevauchement à l'intérieur des plages effectives du jour : le salon n'a donc jamais plus de
+    rendez-vous simultanés que d'employés. Un client a au plus un rendez-vous par jour dans ce salon, et
+    chaque client n'est servi que par un salon : ses rendez-vous ne se chevauchent jamais.
+    Exécutée dans le processus principal ou dans un processus de travail ; retourne le nombre de lignes.
+    """
+    salon = Salon.objects.get(pk=parametres['salon_id'])
+    rng = random.Random(f"{parametres['graine']}-rendezvous-{parametres['index']}")
+    clients = parametres['clients']
+    details = parametres['details']
+    taux = parametres['taux_occupation']
+    taille_lot = parametres['taille_lot']
+    maintenant = datetime.now()
+
+    if not clients or not details:
+        return 0
+
+    journees = calculer_journees(salon, parametres['date_debut'], parametres['date_fin'])
+    lot = []
+    total = 0
+    for jour in sorted(journees):
+        plages = journees[jour].plages
+        if not plages:
+            continue
+        clients_du_jour = set()
+        for _ in range(salon.nombre_employes):
+            for plage_debut, plage_fin in plages:
+                curseur = datetime.combine(jour, plage_debut)
+                limite = datetime.combine(jour, plage_fin)
+                while curseur < limite:
+                    if rng.random() > taux:
+                        curseur += PAS_CRENEAU * rng.randint(1, 4)
+                        continue
+                    detail_id, duree = rng.choice(details)
+                    fin = curseur + duree + BATTEMENT
+                    if fin > limite:
+                        break
+                    client = next((c for c in (rng.choice(clients) for _ in range(ESSAIS_CLIENT))
+                                   if c not in clients_du_jour), None)
+                    if client is not None:
+                        clients_du_jour.add(client)
+                        if rng.random() < PART_ANNULES:
+                            statut = 'annulé'
+                        else:
+                            statut = 'terminé' if fin <= maintenant else 'prévu'
+                        rendezvous = RendezVous(
+                            utilisateur_id=client, salon_id=salon.pk, soin_detail_id=detail_id, date=jour,
+                            heure_debut=curseur.time(), heure_fin=fin.time(), statut=statut,
+                        )
+                        # bulk_create n'appelle pas save() : les bornes indexées sont calculées ici.
+                        rendezvous.debut, rendezvous.fin = RendezVous.bornes(
+                            jour, rendezvous.heure_debut, rendezvous.heure_fin)
+                        lot.append(rendezvous)
+                    curseur = fin
+        if len(lot) >= taille_lot:
+            RendezVous.objects.bulk_create(lot, batch_size=taille_lot)
+            total += len(lot)
+            lot = []
+    RendezVous.objects.bulk_create(lot, batch_size=taille_lot)
+    return total + len(lot)
+
+
+class Command(BaseCommand):
+    help = ("Génère un jeu de données volumineux et reproductible (utilisateurs, salons, horaires, jours "
+            "spéciaux, fermetures, rendez-vous respectant la capacité des salons) pour reproduire localement "
+            "les pages lentes. Insertion par lots (bulk_create), mot de passe haché une seule fois, "
+            "rendez-vous répartis sur plusieurs processus si demandé.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--graine', type=int, default=42, help="Graine aléatoire : même graine, mêmes données.")
+        parser.add_argument('--utilisateurs', type=int, default=1000, help="Nombre d'utilisateurs à créer.")
+        parser.add_argument('--salons', type=int, default=5, help="Nombre de salons à créer.")
+        parser.add_argument('--jours-passes', type=int, default=365,
+                            help="Profondeur de l'historique de rendez-vous, en jours.")
+        parser.add_argument('--jours-futurs', type=int, default=90,
+                            help="Nombre de jours à venir déjà réservés.")
+        parser.add_argument('--taux-occupation', type=float, default=0.6,
+                            help="Probabilité (0 à 1) qu'un créneau libre d'un employé soit réservé.")
+        parser.add_argument('--lot', type=int, default=5000, help="Nombre de lignes par insertion groupée.")
+        parser.add_argument('--processus', type=int, default=1,
+                            help="Processus générant les rendez-vous en parallèle (PostgreSQL uniquement).")
+        parser.add_argument('--mot-de-passe', default='mdp', help="Mot de passe de tous les comptes générés.")
+        parser.add_argument('--vider', action='store_true',
+                            help="Supprime d'abord toutes les données de l'application (hors superutilisateurs).")
+
+    def handle(self, *args, **options):
+        if not 0 < options['taux_occupation'] <= 1:
+            raise CommandError("--taux-occupation doit être compris entre 0 (exclu) et 1.")
+        if options['salons'] < 1 or options['utilisateurs'] < 1:
+            raise CommandError("Il faut au moins un salon et un utilisateur.")
+
+        if options['vider']:
+            self._vider()
+        elif Salon.objects.exists() or Utilisateur.objects.filter(is_superuser=False).exists():
+            raise CommandError("La base contient déjà des données : relancez avec --vider pour les remplacer.")
+
+        self.rng = random.Random(options['graine'])
+        self.taille_lot = options['lot']
+        aujourd_hui = date.today()
+        date_debut = aujourd_hui - timedelta(days=options['jours_passes'])
+        date_fin = aujourd_hui + timedelta(days=options['jours_futurs'])
+
+        for numero, nom in Jour.JOUR_CHOICES:
+            Jour.objects.get_or_create(numero=numero, defaults={'nom': nom})
+
+        clients = self._etape("Utilisateurs (clients)", self._creer_utilisateurs, options['utilisateurs'],
+                              options['mot_de_passe'])
+        soins = self._etape("Soins", self._creer_soins)
+        salons = self._etape("Salons et horaires", self._creer_salons, options['salons'], soins,
+                             date_debut, date_fin)
+
+        # Clients répartis entre les salons : un client n'est jamais servi par deux salons à la fois.
+        details_par_salon = {}
+        for detail_id, salon_id, duree in SoinSalonDetail.objects.order_by('pk').values_list('pk', 'salon_id', 'duree'):
+            details_par_salon.setdefault(salon_id, []).append((detail_id, duree))
+        taches = [
+            {
+                'salon_id': salon.pk,
+                'index': index,
+                'graine': options['graine'],
+                'clients': clients[index::len(salons)],
+                'details': details_par_salon.get(salon.pk, []),
+                'date_debut': date_debut,
+                'date_fin': date_fin,
+                'taux_occupation': options['taux_occupation'],
+                'taille_lot': self.taille_lot,
+            }
+            for index, salon in enumerate(salons)
+        ]
+        self._etape("Rendez-vous", self._creer_rendezvous, taches, options['processus'])
+
+        # bulk_create n'envoie aucun signal : calendriers matérialisés et cache de référence sont mis à jour ici.
+        self._etape("Calendriers", self._reconstruire_calendriers, salons)
+        cache_reference.invalider(cache_reference.GENERATION_JOURS, cache_reference.GENERATION_CATALOGUE)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Données générées (graine {options['graine']}) : {Utilisateur.objects.count()} utilisateurs, "
+            f"{len(salons)} salons, {RendezVous.objects.count()} rendez-vous du {date_debut:%d/%m/%Y} "
+            f"au {date_fin:%d/%m/%Y}."))
+
+    def _etape(self, titre, fonction, *args):
+        depart = chrono.perf_counter()
+        resultat = fonction(*args)
+        nombre = resultat if isinstance(resultat, int) else len(resultat)
+        self.stdout.write(f"{titre} : {nombre} en {chrono.perf_counter() - depart:.1f} s")
+        return resultat
+
+    def _vider(self):
+        # Les rendez-vous d'abord (suppression directe en une requête), puis les salons avec leurs horaires en
+        # cascade : les reconstructions de calendrier planifiées par les signaux ne trouvent plus de salon.
+        RendezVous.objects.all().delete()
+        Salon.objects.all().delete()
+        Soin.objects.all().delete()
+        Utilisateur.objects.filter(is_superuser=False).delete()
+
+    def _inserer(self, modele, objets):
+        return modele.objects.bulk_create(objets, batch_size=self.taille_lot)
+
+    def _creer_utilisateurs(self, nombre, mot_de_passe):
+        """Crée les utilisateurs par lots et retourne les identifiants des clients, dans l'ordre de création."""
+        # Hachage coûteux (PBKDF2) fait une seule fois pour tous les comptes.
+        mot_de_passe_hache = make_password(mot_de_passe)
+        lot = []
+        for index in range(nombre):
+            prenom, nom = self.rng.choice(PRENOMS), self.rng.choice(NOMS)
+            tirage = self.rng.random()
+            if tirage < PART_PROFESSIONNELS:
+                role = 'professionnel'
+            elif tirage < PART_PROFESSIONNELS + PART_ELEVES:
+                role = 'eleve'
+            else:
+                role = 'client'
+            identifiant = f"{prenom}.{nom}.{index}".lower().replace(' ', '')
+            utilisateur = Utilisateur(
+                username=identifiant[:150],
+                email=f"{identifiant}@exemple.be",
+                first_name=prenom,
+                last_name=nom,
+                password=mot_de_passe_hache,
+                role=role,
+                is_staff=role == 'professionnel',
+                date_de_naissance=date(self.rng.randint(1950, 2008), self.rng.randint(1, 12), self.rng.randint(1, 28)),
+                # Numéros mobiles uniques par construction (jusqu'à dix millions d'utilisateurs).
+                telephone=f"047{index // 1000000 % 10} {index // 10000 % 100:02d} {index // 100 % 100:02d} "
+                          f"{index % 100:02d}",
+            )
+            # bulk_create n'appelle pas save() : colonnes de recherche et coordonnées normalisées calculées ici.
+            utilisateur.calculer_champs_derives()
+            lot.append(utilisateur)
+            if len(lot) >= self.taille_lot:
+                self._inserer(Utilisateur, lot)
+                lot = []
+        self._inserer(Utilisateur, lot)
+        return list(Utilisateur.objects.filter(role='client', is_superuser=False).order_by('pk')
+                    .values_list('pk', flat=True))
+
+    def _creer_soins(self):
+        self._inserer(Soin, [Soin(type_de_soin=nom) for nom, _, _ in SOINS])
+        return list(Soin.objects.order_by('pk'))
+
+    def _creer_salons(self, nombre, soins, date_debut, date_fin):
+        salons = []
+        for index in range(nombre):
+            ville, code_postal = VILLES[index % len(VILLES)]
+            enseigne = ENSEIGNES[index // len(VILLES) % len(ENSEIGNES)]
+            salon = Salon(
+                nom=f"{enseigne} ({ville})" + (f" {index // (len(VILLES) * len(ENSEIGNES)) + 1}"
+                                               if index >= len(VILLES) * len(ENSEIGNES) else ""),
+                nombre_employes=self.rng.randint(2, 8),
+                adresse=f"{self.rng.randint(1, 250)} Rue du Commerce, {code_postal} {ville}",
+                telephone=f"0{self.rng.randint(10, 89)} {self.rng.randint(10, 99)} {self.rng.randint(10, 99)} "
+                          f"{self.rng.randint(10, 99)}",
+                email=f"contact{index}@salon-exemple.be",
+            )
+            # Un salon sur dix n'a ouvert qu'au cours de la période couverte.
+            if self.rng.random() < 0.1:
+                decalage = self.rng.randint(0, (date_fin - date_debut).days // 2)
+                salon.date_debut_periode = date_debut + timedelta(days=decalage)
+            salons.append(salon)
+        self._inserer(Salon, salons)
+        salons = list(Salon.objects.order_by('pk'))
+
+        jours = {jour.numero: jour for jour in Jour.objects.all()}
+        plages, details, jours_speciaux, fermetures = [], [], [], []
+        for salon in salons:
+            for numero, creneaux in self.rng.choice(MODELES_HORAIRES).items():
+                plages.extend(PlageHoraire(salon=salon, jour=jours[numero], heure_debut=debut, heure_fin=fin)
+                              for debut, fin in creneaux)
+
+            for soin in self.rng.sample(soins, self.rng.randint(6, len(soins))):
+                _, duree, prix = next(s for s in SOINS if s[0] == soin.type_de_soin)
+                details.append(SoinSalonDetail(
+                    soin=soin, salon=salon, duree=timedelta(minutes=duree),
+                    prix=(Decimal(prix) * Decimal(self.rng.uniform(0.8, 1.4))).quantize(Decimal('0.01')),
+                    commentaire_specifique=f"{soin.type_de_soin} chez {salon.nom}.",
+                ))
+
+            jours_speciaux.extend(JourSpecial(salon=salon, date=jour, est_ferme=True)
+                                  for jour in _dates_du_mois_jour(date_debut, date_fin, JOURS_FERIES))
+            jours_speciaux.extend(JourSpecial(salon=salon, date=jour, est_ferme=False)
+                                  for jour in _dates_du_mois_jour(date_debut, date_fin, JOURS_REDUITS))
+
+            # Un salon sur deux ferme deux semaines chaque été.
+            if self.rng.random() < 0.5:
+                for annee in range(date_debut.year, date_fin.year + 1):
+                    debut_conges = date(annee, 7, 20) + timedelta(days=self.rng.randint(0, 20))
+                    fermetures.append(PeriodeFermeture(salon=salon, date_debut=debut_conges,
+                                                       date_fin=debut_conges + timedelta(days=13)))
+
+        self._inserer(PlageHoraire, plages)
+        self._inserer(SoinSalonDetail, details)
+        self._inserer(JourSpecial, jours_speciaux)
+        self._inserer(PeriodeFermeture, fermetures)
+        self._inserer(PlageHoraireSpeciale, [
+            PlageHoraireSpeciale(jour_special=jour_special, heure_debut=time(10), heure_fin=time(16))
+            for jour_special in JourSpecial.objects.filter(est_ferme=False).order_by('pk')
+        ])
+        return salons
+
+    def _reconstruire_calendriers(self, salons):
+        for salon in salons:
+            reconstruire_calendrier(salon)
+        return len(salons)
+
+    def _creer_rendezvous(self, taches, processus):
+        if processus > 1 and connection.vendor == 'sqlite':
+            self.stderr.write("SQLite n'accepte qu'un écrivain à la fois : génération sur un seul processus.")
+            processus = 1
+        if processus <= 1:
+            return sum(_generer_rendezvous_salon(tache) for tache in taches)
+
+        # Les connexions ne doivent pas être partagées avec les processus de travail, qui ouvrent les leurs.
+        connections.close_all()
+        with multiprocessing.get_context().Pool(processus, initializer=_initialiser_processus) as pool:
+            return sum(pool.imap_unordered(_generer_rendezvous_salon, taches))
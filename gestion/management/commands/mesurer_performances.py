@@ -0,0 +1,371 @@
+# gestion/management/commands/mesurer_performances.py
+
+import json
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import date
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from gestion import urls as gestion_urls
+from gestion.models import Utilisateur, Salon, SoinSalonDetail, JourSpecial, PlageHoraire, PlageHoraireSpeciale, \
+    RendezVous
+from gestion.services.archives import FORMAT_PARAMETRE_MOIS, mois_suivant
+
+# Les références dépendent de la machine et de la base qui les ont mesurées : elles restent locales, dans un
+# dossier ignoré par git (.gitignore).
+FICHIER_REFERENCES = Path(settings.BASE_DIR) / 'performances' / 'references.json'
+
+# Un scénario = une requête GET mesurée. 'arguments' (paramètres de la route) et 'parametres' (query string)
+# associent un nom à une clé des objets de référence, choisis une fois pour toutes dans la base générée.
+Scenario = namedtuple('Scenario', ['cle', 'route', 'role', 'arguments', 'parametres'], defaults=[{}, {}])
+
+SCENARIOS = [
+    # Pages publiques et pages client
+    Scenario('home', 'home', 'anonyme'),
+    Scenario('login', 'login', 'anonyme'),
+    Scenario('register', 'register', 'anonyme'),
+    Scenario('apropos', 'apropos', 'anonyme'),
+    Scenario('detail_salon', 'detail_salon', 'client', {'pk': 'salon'}),
+    Scenario('choisir_salon_pour_rendezvous', 'choisir_salon_pour_rendezvous', 'client'),
+    Scenario('prendre_rendezvous_personnel', 'prendre_rendezvous_personnel', 'client', {'salon_id': 'salon'}),
+    Scenario('disponibilites_salon', 'disponibilites_salon', 'client', {'salon_id': 'salon'},
+             {'soin_detail': 'soin_detail'}),
+    Scenario('mes_rendezvous', 'mes_rendezvous', 'client'),
+    Scenario('liste_salons', 'liste_salons', 'client'),
+    Scenario('soins', 'soins', 'client'),
+    Scenario('soin_salon_detail_list', 'soin_salon_detail_list', 'client', {'salon_pk': 'salon'}),
+
+    # Agendas et rendez-vous (personnel)
+    Scenario('detail_salon:professionnel', 'detail_salon', 'professionnel', {'pk': 'salon'}),
+    Scenario('anciens_rendezvous', 'anciens_rendezvous', 'professionnel', {'pk': 'salon'}),
+    Scenario('rendezvous_futurs_mois', 'rendezvous_futurs_mois', 'professionnel', {'pk': 'salon'},
+             {'mois': 'mois_suivant'}),
+    Scenario('rendezvous_tous', 'rendezvous_tous', 'professionnel'),
+    Scenario('ajouter_rendezvous', 'ajouter_rendezvous', 'professionnel', {'salon_id': 'salon'}),
+    Scenario('modifier_rendezvous', 'modifier_rendezvous', 'professionnel', {'rendezvous_id': 'rendezvous'}),
+    Scenario('supprimer_rendezvous', 'supprimer_rendezvous', 'professionnel', {'rendezvous_id': 'rendezvous'}),
+    Scenario('modifier_statut_rendezvous', 'modifier_statut_rendezvous', 'professionnel', {'pk': 'rendezvous'}),
+
+    # Utilisateurs (personnel)
+    Scenario('utilisateur_list', 'utilisateur_list', 'professionnel'),
+    Scenario('utilisateur_list:recherche', 'utilisateur_list', 'professionnel', {}, {'q': 'texte_recherche'}),
+    Scenario('utilisateur_recherche', 'utilisateur_recherche', 'professionnel', {}, {'q': 'texte_recherche'}),
+    Scenario('utilisateur_create', 'utilisateur_create', 'professionnel'),
+    Scenario('utilisateur_update', 'utilisateur_update', 'professionnel', {'pk': 'client'}),
+    Scenario('utilisateur_delete', 'utilisateur_delete', 'professionnel', {'pk': 'client'}),
+    Scenario('utilisateur_set_password', 'utilisateur_set_password', 'professionnel', {'pk': 'client'}),
+
+    # Soins et salons (personnel)
+    Scenario('soin_create_general', 'soin_create_general', 'professionnel'),
+    Scenario('soin_update_general', 'soin_update_general', 'professionnel', {'pk': 'soin'}),
+    Scenario('soin_salon_detail_create', 'soin_salon_detail_create', 'professionnel', {'salon_pk': 'salon'}),
+    Scenario('soin_salon_detail_update', 'soin_salon_detail_update', 'professionnel', {'pk': 'soin_detail'}),
+    Scenario('soin_salon_detail_delete', 'soin_salon_detail_delete', 'professionnel', {'pk': 'soin_detail'}),
+    Scenario('ajouter_salon', 'ajouter_salon', 'professionnel'),
+    Scenario('modifier_salon', 'modifier_salon', 'professionnel', {'pk': 'salon'}),
+    Scenario('supprimer_salon', 'supprimer_salon', 'professionnel', {'pk': 'salon'}),
+
+    # Horaires (personnel)
+    Scenario('liste_plages_horaires', 'liste_plages_horaires', 'professionnel', {'pk': 'salon'}),
+    Scenario('ajouter_plage_horaire', 'ajouter_plage_horaire', 'professionnel', {'pk': 'salon'}),
+    Scenario('modifier_plage_horaire', 'modifier_plage_horaire', 'professionnel',
+             {'salon_pk': 'salon', 'plage_pk': 'plage'}),
+    Scenario('supprimer_plage_horaire', 'supprimer_plage_horaire', 'professionnel',
+             {'salon_pk': 'salon', 'plage_pk': 'plage'}),
+    Scenario('liste_jours_speciaux', 'liste_jours_speciaux', 'professionnel', {'pk': 'salon'}),
+    Scenario('ajouter_jour_special', 'ajouter_jour_special', 'professionnel', {'pk': 'salon'}),
+    Scenario('ajouter_periode_vacances', 'ajouter_periode_vacances', 'professionnel', {'pk': 'salon'}),
+    Scenario('modifier_jour_special', 'modifier_jour_special', 'professionnel',
+             {'salon_pk': 'salon', 'jour_special_pk': 'jour_special'}),
+    Scenario('supprimer_jour_special', 'supprimer_jour_special', 'professionnel',
+             {'salon_pk': 'salon', 'jour_special_pk': 'jour_special'}),
+    Scenario('liste_plages_horaires_speciales', 'liste_plages_horaires_speciales', 'professionnel',
+             {'salon_pk': 'salon', 'jour_special_pk': 'jour_special'}),
+    Scenario('ajouter_plage_horaire_speciale', 'ajouter_plage_horaire_speciale', 'professionnel',
+             {'salon_pk': 'salon', 'jour_special_pk': 'jour_special'}),
+    Scenario('modifier_plage_horaire_speciale', 'modifier_plage_horaire_speciale', 'professionnel',
+             {'salon_pk': 'salon', 'jour_special_pk': 'jour_special', 'plage_speciale_pk': 'plage_speciale'}),
+    Scenario('supprimer_plage_horaire_speciale', 'supprimer_plage_horaire_speciale', 'professionnel',
+             {'salon_pk': 'salon', 'jour_special_pk': 'jour_special', 'plage_speciale_pk': 'plage_speciale'}),
+]
+
+# Routes volontairement non mesurées : un GET y modifie l'état ou n'affiche rien.
+ROUTES_NON_MESUREES = {
+    'logout': "ferme la session du compte de mesure",
+    'utilisateur_toggle_active': "un GET active ou désactive le compte",
+    'supprimer_periode_vacances': "POST uniquement, un GET redirige",
+    'soin_delete_general': "pas de page de confirmation en GET (gabarit absent), suppression depuis la liste",
+}
+
+# Métriques comparées aux références. Les temps et la mémoire tolèrent un écart relatif (--seuil) au-delà
+# d'un plancher absolu, pour ne pas échouer sur le bruit de mesure des pages très rapides.
+METRIQUES_TEMPS = ('latence_ms', 'temps_bd_ms')
+
+
+class ChronometreRequetes:
+    """execute_wrapper qui compte les requêtes SQL et cumule leur durée."""
+
+    def __init__(self):
+        self.nombre = 0
+        self.duree = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        depart = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duree += time.perf_counter() - depart
+            self.nombre += 1
+
+
+class Command(BaseCommand):
+    help = ("Mesure chaque page de gestion/urls.py avec le client de test Django (nombre de requêtes SQL, temps "
+            "passé en base, latence totale, pic mémoire) et compare aux références enregistrées. Échoue si une "
+            "page régresse au-delà du seuil. À lancer sur une base remplie par generer_donnees, avec les mêmes "
+            "paramètres que lors de l'enregistrement des références.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fichier', default=str(FICHIER_REFERENCES), help="Fichier JSON des références.")
+        parser.add_argument('--enregistrer', action='store_true',
+                            help="Enregistre les mesures comme nouvelles références au lieu de comparer.")
+        parser.add_argument('--repetitions', type=int, default=5,
+                            help="Nombre de mesures par page (latence et temps en base médians).")
+        parser.add_argument('--seuil', type=float, default=0.25,
+                            help="Écart relatif toléré sur les temps et la mémoire (0.25 = +25 %%).")
+        parser.add_argument('--plancher-ms', type=float, default=5.0,
+                            help="Écart absolu en millisecondes toujours toléré sur les temps.")
+        parser.add_argument('--plancher-memoire-kio', type=float, default=256.0,
+                            help="Écart absolu en Kio toujours toléré sur le pic mémoire.")
+        parser.add_argument('--marge-requetes', type=int, default=0,
+                            help="Nombre de requêtes SQL supplémentaires tolérées par page.")
+        parser.add_argument('--vues', nargs='+', metavar='CLE',
+                            help="Ne mesure que ces scénarios (ex. detail_salon utilisateur_list).")
+
+    def handle(self, *args, **options):
+        if options['repetitions'] < 1:
+            raise CommandError("--repetitions doit être au moins 1.")
+
+        scenarios = SCENARIOS
+        if options['vues']:
+            inconnues = set(options['vues']) - {scenario.cle for scenario in SCENARIOS}
+            if inconnues:
+                raise CommandError(f"Scénarios inconnus : {', '.join(sorted(inconnues))}.")
+            scenarios = [scenario for scenario in SCENARIOS if scenario.cle in options['vues']]
+        else:
+            self._signaler_routes_non_couvertes()
+
+        objets = self._objets_de_reference()
+        comptes = {
+            'professionnel': Utilisateur.objects.filter(role='professionnel', is_active=True).order_by('pk').first(),
+            'client': Utilisateur.objects.filter(pk=objets['client']).first(),
+        }
+        base = {
+            'moteur': connection.vendor,
+            'utilisateurs': Utilisateur.objects.count(),
+            'rendezvous': RendezVous.objects.count(),
+        }
+        self.stdout.write(f"Base : {base['moteur']} - {base['utilisateurs']} utilisateurs, "
+                          f"{base['rendezvous']} rendez-vous\n")
+
+        mesures = {}
+        erreurs = []
+        # Le client de test s'annonce comme 'testserver'. L'instrumentation des requêtes est coupée : elle
+        # journaliserait chaque mesure et ajouterait son propre execute_wrapper.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                               INSTRUMENTATION_TAUX_ECHANTILLONNAGE=0):
+            clients = {}
+            try:
+                for scenario in scenarios:
+                    url = self._url(scenario, objets)
+                    if url is None:
+                        self.stdout.write(self.style.WARNING(f"{scenario.cle} : ignoré, données manquantes."))
+                        continue
+                    client = clients.get(scenario.role)
+                    if client is None:
+                        client = clients[scenario.role] = self._client(scenario.role, comptes)
+                    mesure = self._mesurer(client, url, options['repetitions'])
+                    if mesure['statut'] >= 400:
+                        erreurs.append(f"  {scenario.cle} : {url} a répondu {mesure['statut']}")
+                    else:
+                        mesures[scenario.cle] = mesure
+            finally:
+                for client in clients.values():
+                    client.logout()
+
+        if erreurs:
+            raise CommandError("Pages en erreur, aucune mesure enregistrée ni comparée :\n" + '\n'.join(erreurs))
+
+        chemin = Path(options['fichier'])
+        references = self._lire_references(chemin)
+
+        if options['enregistrer']:
+            references['base'] = base
+            references.setdefault('mesures', {}).update(mesures)
+            chemin.parent.mkdir(parents=True, exist_ok=True)
+            chemin.write_text(json.dumps(references, indent=2, ensure_ascii=False, sort_keys=True) + '\n',
+                              encoding='utf-8')
+            self._afficher(mesures, {})
+            self.stdout.write(self.style.SUCCESS(f"{len(mesures)} références enregistrées dans {chemin}."))
+            return
+
+        if not references:
+            self._afficher(mesures, {})
+            raise CommandError(f"Aucune référence dans {chemin} : relancez avec --enregistrer.")
+        if references.get('base') != base:
+            self.stdout.write(self.style.WARNING(
+                f"Les références ont été mesurées sur une autre base ({references.get('base')}) : "
+                f"les comparaisons sont indicatives."))
+
+        self._afficher(mesures, references['mesures'])
+        regressions = self._regressions(mesures, references['mesures'], options)
+        if regressions:
+            raise CommandError("Régressions de performance :\n" + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"{len(mesures)} pages dans le budget."))
+
+    def _objets_de_reference(self):
+        """
+        Choisit de façon reproductible les objets utilisés dans les URL : le premier salon, son dernier
+        rendez-vous passé et le client concerné, un soin du salon, une plage et une plage spéciale.
+        """
+        salon = Salon.objects.order_by('pk').first()
+        if salon is None:
+            raise CommandError("Aucun salon en base : générez d'abord des données (generer_donnees).")
+
+        rendezvous = (RendezVous.objects.filter(salon=salon, debut__lt=timezone.now(), utilisateur__role='client',
+                                                utilisateur__is_active=True)
+                      .order_by('-debut', '-id').select_related('utilisateur').first())
+        if rendezvous is None:
+            raise CommandError("Aucun rendez-vous client passé dans le premier salon : la base est trop petite.")
+
+        soin_detail = SoinSalonDetail.objects.filter(salon=salon).order_by('pk').first()
+        plage = PlageHoraire.objects.filter(salon=salon).order_by('pk').first()
+        plage_speciale = PlageHoraireSpeciale.objects.filter(jour_special__salon=salon).order_by('pk').first()
+        if plage_speciale:
+            jour_special_id = plage_speciale.jour_special_id
+        else:
+            jour_special_id = (JourSpecial.objects.filter(salon=salon).order_by('pk')
+                               .values_list('pk', flat=True).first())
+
+        return {
+            'salon': salon.pk,
+            'rendezvous': rendezvous.pk,
+            'client': rendezvous.utilisateur_id,
+            'soin_detail': soin_detail and soin_detail.pk,
+            'soin': soin_detail and soin_detail.soin_id,
+            'plage': plage and plage.pk,
+            'jour_special': jour_special_id,
+            'plage_speciale': plage_speciale and plage_speciale.pk,
+            'texte_recherche': rendezvous.utilisateur.last_name,
+            'mois_suivant': mois_suivant(date.today().replace(day=1)).strftime(FORMAT_PARAMETRE_MOIS),
+        }
+
+    @staticmethod
+    def _url(scenario, objets):
+        valeurs = {**scenario.arguments, **scenario.parametres}
+        if any(objets[cle] is None for cle in valeurs.values()):
+            return None
+        url = reverse(scenario.route, kwargs={nom: objets[cle] for nom, cle in scenario.arguments.items()})
+        if scenario.parametres:
+            url += '?' + urlencode({nom: objets[cle] for nom, cle in scenario.parametres.items()})
+        return url
+
+    @staticmethod
+    def _client(role, comptes):
+        # Une page en erreur est signalée par son statut, sans interrompre les autres mesures.
+        client = Client(raise_request_exception=False)
+        if role != 'anonyme':
+            if comptes[role] is None:
+                raise CommandError(f"Aucun compte actif de rôle '{role}' en base.")
+            client.force_login(comptes[role])
+        return client
+
+    @staticmethod
+    def _mesurer(client, url, repetitions):
+        # Première requête hors mesure : compilation des gabarits et caches applicatifs.
+        client.get(url)
+
+        latences, temps_bd, requetes = [], [], 0
+        for _ in range(repetitions):
+            chronometre = ChronometreRequetes()
+            with connection.execute_wrapper(chronometre):
+                depart = time.perf_counter()
+                reponse = client.get(url)
+                latences.append((time.perf_counter() - depart) * 1000)
+            temps_bd.append(chronometre.duree * 1000)
+            requetes = max(requetes, chronometre.nombre)
+
+        # Le pic mémoire est mesuré à part : tracemalloc ralentit fortement l'exécution.
+        tracemalloc.start()
+        try:
+            client.get(url)
+            _, pic = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'statut': reponse.status_code,
+            'requetes': requetes,
+            'temps_bd_ms': round(statistics.median(temps_bd), 2),
+            'latence_ms': round(statistics.median(latences), 2),
+            'memoire_kio': round(pic / 1024, 1),
+        }
+
+    @staticmethod
+    def _lire_references(chemin):
+        if not chemin.exists():
+            return {}
+        try:
+            return json.loads(chemin.read_text(encoding='utf-8'))
+        except ValueError as erreur:
+            raise CommandError(f"Fichier de références illisible ({chemin}) : {erreur}")
+
+    @staticmethod
+    def _regressions(mesures, references, options):
+        regressions = []
+        for cle, mesure in mesures.items():
+            reference = references.get(cle)
+            if reference is None:
+                continue
+            if mesure['requetes'] > reference['requetes'] + options['marge_requetes']:
+                regressions.append(f"  {cle} : {mesure['requetes']} requêtes SQL "
+                                   f"(référence {reference['requetes']})")
+            limites = [(metrique, options['plancher_ms']) for metrique in METRIQUES_TEMPS]
+            limites.append(('memoire_kio', options['plancher_memoire_kio']))
+            for metrique, plancher in limites:
+                limite = max(reference[metrique] * (1 + options['seuil']), reference[metrique] + plancher)
+                if mesure[metrique] > limite:
+                    regressions.append(f"  {cle} : {metrique} = {mesure[metrique]} (référence {reference[metrique]}, "
+                                       f"limite {limite:.1f})")
+        return regressions
+
+    def _afficher(self, mesures, references):
+        self.stdout.write(f"{'Page':<36} {'Requêtes':>12} {'BD (ms)':>16} {'Latence (ms)':>18} {'Mémoire (Kio)':>18}")
+        for cle, mesure in mesures.items():
+            reference = references.get(cle, {})
+
+            def colonne(metrique, largeur):
+                texte = f"{mesure[metrique]:g}"
+                if metrique in reference:
+                    texte += f" ({round(mesure[metrique] - reference[metrique], 2):+g})"
+                return f"{texte:>{largeur}}"
+
+            self.stdout.write(f"{cle:<36} {colonne('requetes', 12)} {colonne('temps_bd_ms', 16)} "
+                              f"{colonne('latence_ms', 18)} {colonne('memoire_kio', 18)}")
+
+    def _signaler_routes_non_couvertes(self):
+        couvertes = {scenario.route for scenario in SCENARIOS} | set(ROUTES_NON_MESUREES)
+        for motif in gestion_urls.urlpatterns:
+            if isinstance(motif, URLPattern) and motif.name not in couvertes:
+                self.stdout.write(self.style.WARNING(f"Route sans scénario de mesure : {motif.name}"))
@@ -0,0 +1,26 @@
+# gestion/management/commands/reconstruire_calendriers.py
+
+from django.core.management.base import BaseCommand
+
+from gestion.models import Salon
+from gestion.services.calendrier import reconstruire_calendrier, HORIZON_JOURS
+
+
+class Command(BaseCommand):
+    help = ("Reconstruit les horaires effectifs matérialisés de chaque salon sur l'horizon glissant. "
+            "À exécuter une fois par jour pour faire avancer l'horizon.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salon', type=int, help="Ne reconstruit que le salon portant cet identifiant.")
+
+    def handle(self, *args, **options):
+        salons = Salon.objects.all()
+        if options['salon']:
+            salons = salons.filter(pk=options['salon'])
+
+        nombre = 0
+        for salon in salons:
+            reconstruire_calendrier(salon)
+            nombre += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Calendrier reconstruit pour {nombre} salon(s) sur {HORIZON_JOURS} jours."))
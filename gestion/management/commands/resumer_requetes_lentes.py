@@ -0,0 +1,103 @@
+# gestion/management/commands/resumer_requetes_lentes.py
+
+import json
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gestion import requetes_lentes
+
+UNITES = {'m': 'minutes', 'h': 'hours', 'j': 'days'}
+_DUREE = re.compile(r'^(\d+)([mhj])$')
+
+# Longueur du SQL affiché par groupe (--complet pour tout afficher).
+LONGUEUR_SQL = 400
+
+
+def lire_instant(texte):
+    """'90m', '24h', '7j' (durée écoulée depuis maintenant) ou date/heure ISO 'AAAA-MM-JJ[THH:MM]'."""
+    correspondance = _DUREE.match(texte)
+    if correspondance:
+        return timezone.now() - timedelta(**{UNITES[correspondance[2]]: int(correspondance[1])})
+    try:
+        instant = datetime.fromisoformat(texte)
+    except ValueError:
+        raise CommandError(f"Période invalide : '{texte}' (ex. 90m, 24h, 7j ou 2025-06-01).")
+    return timezone.make_aware(instant) if timezone.is_naive(instant) else instant
+
+
+class Command(BaseCommand):
+    help = ("Résume le journal des requêtes SQL lentes sur une période : requêtes normalisées regroupées, "
+            "classées par temps cumulé (ou nombre, ou durée maximale), avec leurs sites d'appel et, sur "
+            "PostgreSQL, le dernier plan EXPLAIN capturé.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depuis', default='24h', help="Début de la période : 90m, 24h, 7j ou date ISO.")
+        parser.add_argument('--jusqua', help="Fin de la période (même format, maintenant par défaut).")
+        parser.add_argument('--limite', type=int, default=15, help="Nombre de requêtes affichées.")
+        parser.add_argument('--tri', choices=['total', 'nombre', 'max'], default='total',
+                            help="Classement : temps cumulé, nombre d'occurrences ou durée maximale.")
+        parser.add_argument('--fichier', default=str(requetes_lentes.FICHIER), help="Journal JSON Lines à lire.")
+        parser.add_argument('--explain', action='store_true', help="Affiche le dernier plan capturé.")
+        parser.add_argument('--complet', action='store_true', help="Affiche le SQL sans le tronquer.")
+
+    def handle(self, *args, **options):
+        chemin = Path(options['fichier'])
+        if not chemin.exists():
+            raise CommandError(f"Journal introuvable : {chemin}.")
+        debut = lire_instant(options['depuis'])
+        fin = lire_instant(options['jusqua']) if options['jusqua'] else timezone.now()
+
+        groupes = {}
+        illisibles = 0
+        with chemin.open(encoding='utf-8') as journal:
+            for ligne in journal:
+                try:
+                    entree = json.loads(ligne)
+                    instant = datetime.fromisoformat(entree['horodatage'])
+                except (ValueError, KeyError):
+                    illisibles += 1
+                    continue
+                if not debut <= instant <= fin:
+                    continue
+                groupe = groupes.setdefault(entree['empreinte'], {
+                    'sql': entree['sql'], 'durees': [], 'sites': Counter(), 'vues': Counter(),
+                    'parametres': entree['parametres'], 'explain': None,
+                })
+                groupe['durees'].append(entree['duree_ms'])
+                groupe['sites'][entree['site']] += 1
+                if entree.get('vue'):
+                    groupe['vues'][entree['vue']] += 1
+                if entree.get('explain'):
+                    groupe['explain'] = entree['explain']
+
+        self.stdout.write(f"Période : {timezone.localtime(debut):%d/%m/%Y %H:%M} - "
+                          f"{timezone.localtime(fin):%d/%m/%Y %H:%M}, "
+                          f"{sum(len(groupe['durees']) for groupe in groupes.values())} requêtes lentes, "
+                          f"{len(groupes)} requêtes distinctes.")
+        if illisibles:
+            self.stdout.write(self.style.WARNING(f"{illisibles} lignes illisibles ignorées."))
+
+        cles_tri = {'total': sum, 'nombre': len, 'max': max}
+        classement = sorted(groupes.items(), key=lambda element: cles_tri[options['tri']](element[1]['durees']),
+                            reverse=True)
+        for rang, (cle, groupe) in enumerate(classement[:options['limite']], start=1):
+            durees = sorted(groupe['durees'])
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n#{rang} [{cle}] {len(durees)} fois, {sum(durees):.0f} ms au total, "
+                f"médiane {durees[len(durees) // 2]:.1f} ms, max {durees[-1]:.1f} ms"))
+            sql = groupe['sql']
+            if not options['complet'] and len(sql) > LONGUEUR_SQL:
+                sql = sql[:LONGUEUR_SQL] + ' ...'
+            self.stdout.write(sql)
+            self.stdout.write(f"Paramètres : {groupe['parametres']}")
+            for site, nombre in groupe['sites'].most_common(3):
+                self.stdout.write(f"  site : {site} ({nombre})")
+            for vue, nombre in groupe['vues'].most_common(3):
+                self.stdout.write(f"  vue  : {vue} ({nombre})")
+            if options['explain'] and groupe['explain']:
+                self.stdout.write(groupe['explain'])
@@ -0,0 +1,191 @@
+# gestion/middleware.py
+
+import cProfile
+import json
+import logging
+import pstats
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.shortcuts import render
+from django.template.base import Template
+from django.utils import timezone
+
+from gestion.profilage import RequetesParSiteAppel, arbre_appels, est_requete_outillage
+
+logger = logging.getLogger('gestion.instrumentation')
+
+# Paramètre d'URL qui déclenche le profilage d'une requête (?profiler=1), réservé au personnel.
+PARAMETRE_PROFILAGE = 'profiler'
+
+# Mesure de la requête HTTP en cours, lue par le rendu des gabarits (None hors requête échantillonnée).
+_mesure_courante = ContextVar('mesure_courante', default=None)
+
+_rendu_original = Template.render
+
+
+class MesureRequete:
+    """
+    Compteurs d'une requête HTTP. Sert d'execute_wrapper sur les connexions : chaque requête SQL est comptée
+    et chronométrée, en isolant celles lancées pendant le rendu d'un gabarit (querysets évalués paresseusement).
+    """
+
+    def __init__(self):
+        self.requetes = 0
+        self.duree_bd = 0.0
+        self.duree_bd_gabarits = 0.0
+        self.duree_gabarits = 0.0
+        self.en_rendu = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if est_requete_outillage():
+            return execute(sql, params, many, context)
+        depart = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duree = time.perf_counter() - depart
+            self.requetes += 1
+            self.duree_bd += duree
+            if self.en_rendu:
+                self.duree_bd_gabarits += duree
+
+
+def _rendu_mesure(self, context):
+    mesure = _mesure_courante.get()
+    # Les gabarits inclus ({% include %}) sont déjà couverts par le chronomètre du gabarit principal.
+    if mesure is None or mesure.en_rendu:
+        return _rendu_original(self, context)
+    mesure.en_rendu = True
+    depart = time.perf_counter()
+    try:
+        return _rendu_original(self, context)
+    finally:
+        mesure.duree_gabarits += time.perf_counter() - depart
+        mesure.en_rendu = False
+
+
+def _ms(secondes):
+    return round(secondes * 1000, 2)
+
+
+class InstrumentationMiddleware:
+    """
+    Mesure chaque requête échantillonnée : nombre de requêtes SQL et temps en base, temps de rendu des gabarits
+    (hors SQL) et temps Python de la vue (le reste). Les mesures sont journalisées en JSON sur le logger
+    'gestion.instrumentation', avec le nom de la route ('detail_salon', 'ajouter_rendezvous', ...), et
+    renvoyées dans l'en-tête Server-Timing (onglet Réseau du navigateur) au personnel seulement, ou à tous en
+    DEBUG : le temps en base d'une page comme login aiderait sinon à deviner quels comptes existent.
+
+    Réglages : INSTRUMENTATION_TAUX_ECHANTILLONNAGE (part des requêtes mesurées, de 0.0 à 1.0) et
+    INSTRUMENTATION_SERVER_TIMING (ajout de l'en-tête). Une requête non échantillonnée ne coûte qu'un tirage.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.taux = getattr(settings, 'INSTRUMENTATION_TAUX_ECHANTILLONNAGE', 1.0)
+        self.server_timing = getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', True)
+        # Le chronomètre des gabarits ne fait rien en dehors d'une requête mesurée.
+        Template.render = _rendu_mesure
+
+    def __call__(self, request):
+        if self.taux <= 0 or (self.taux < 1 and random.random() >= self.taux):
+            return self.get_response(request)
+
+        mesure = MesureRequete()
+        jeton = _mesure_courante.set(mesure)
+        depart = time.perf_counter()
+        try:
+            with ExitStack() as wrappers:
+                for alias in connections:
+                    wrappers.enter_context(connections[alias].execute_wrapper(mesure))
+                response = self.get_response(request)
+        finally:
+            _mesure_courante.reset(jeton)
+        total = time.perf_counter() - depart
+
+        gabarits = mesure.duree_gabarits - mesure.duree_bd_gabarits
+        resolver_match = getattr(request, 'resolver_match', None)
+        donnees = {
+            'url_name': resolver_match.view_name if resolver_match else None,
+            'methode': request.method,
+            'statut': response.status_code,
+            'requetes': mesure.requetes,
+            'bd_ms': _ms(mesure.duree_bd),
+            'gabarits_ms': _ms(gabarits),
+            'vue_ms': _ms(total - mesure.duree_bd - gabarits),
+            'total_ms': _ms(total),
+        }
+
+        if self.server_timing and self._server_timing_autorise(request):
+            response['Server-Timing'] = ', '.join([
+                f'sql;dur={donnees["bd_ms"]};desc="{mesure.requetes} requetes"',
+                f'tpl;dur={donnees["gabarits_ms"]}',
+                f'vue;dur={donnees["vue_ms"]}',
+                f'total;dur={donnees["total_ms"]}',
+            ])
+        logger.info(json.dumps(donnees, ensure_ascii=False), extra={'instrumentation': donnees})
+        return response
+
+    @staticmethod
+    def _server_timing_autorise(request):
+        if settings.DEBUG:
+            return True
+        utilisateur = getattr(request, 'user', None)
+        return utilisateur is not None and utilisateur.is_staff
+
+
+class ProfilageMiddleware:
+    """
+    Profilage à la demande : un membre du personnel (is_staff) ajoute ?profiler=1 à n'importe quelle URL. La
+    requête est exécutée sous cProfile, le profil est enregistré dans PROFILAGE_DOSSIER (fichier .prof à ouvrir
+    avec snakeviz ou python -m pstats) et la page est remplacée par un rapport : arbre d'appels et requêtes SQL
+    regroupées par site d'appel. Placé après AuthenticationMiddleware, qui fournit request.user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.dossier = Path(getattr(settings, 'PROFILAGE_DOSSIER', Path(settings.BASE_DIR) / 'profils'))
+
+    def __call__(self, request):
+        if request.GET.get(PARAMETRE_PROFILAGE) != '1' or not request.user.is_staff:
+            return self.get_response(request)
+
+        requetes = RequetesParSiteAppel()
+        profil = cProfile.Profile()
+        depart = time.perf_counter()
+        with ExitStack() as wrappers:
+            for alias in connections:
+                wrappers.enter_context(connections[alias].execute_wrapper(requetes))
+            profil.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profil.disable()
+        duree = time.perf_counter() - depart
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        url_name = resolver_match.view_name if resolver_match else 'inconnue'
+        self.dossier.mkdir(parents=True, exist_ok=True)
+        fichier = self.dossier / f"{timezone.localtime():%Y%m%d-%H%M%S-%f}-{url_name.replace(':', '-')}.prof"
+        profil.dump_stats(fichier)
+
+        parametres = request.GET.copy()
+        del parametres[PARAMETRE_PROFILAGE]
+        groupes_sql = requetes.groupes()
+        return render(request, 'gestion/profilage/rapport.html', {
+            'url_name': url_name,
+            'url_page': request.path + (f"?{parametres.urlencode()}" if parametres else ''),
+            'statut': response.status_code,
+            'duree_ms': round(duree * 1000, 2),
+            'fichier': fichier,
+            'lignes': arbre_appels(pstats.Stats(profil)),
+            'groupes_sql': groupes_sql,
+            'nombre_requetes': sum(groupe.nombre for groupe in groupes_sql),
+            'duree_bd_ms': round(sum(groupe.duree_ms for groupe in groupes_sql), 2),
+        })
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0007_salon_date_debut_periode_salon_date_fin_periode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HoraireEffectif',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('heure_debut', models.TimeField(blank=True, null=True)),
+                ('heure_fin', models.TimeField(blank=True, null=True)),
+                ('jour_special', models.BooleanField(default=False)),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horaires_effectifs', to='gestion.salon')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['salon', 'date'], name='horaire_effectif_salon_date')],
+            },
+        ),
+    ]
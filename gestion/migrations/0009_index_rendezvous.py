@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0008_horaireeffectif'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['salon', 'date', 'heure_debut'], name='rdv_salon_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(condition=models.Q(('statut', 'annulé'), _negated=True), fields=['salon', 'date', 'heure_debut', 'heure_fin'], name='rdv_salon_actifs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(condition=models.Q(('statut', 'annulé'), _negated=True), fields=['utilisateur', 'date', 'heure_debut', 'heure_fin'], name='rdv_client_actifs_idx'),
+        ),
+    ]
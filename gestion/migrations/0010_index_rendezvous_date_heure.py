@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0009_index_rendezvous'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['date', 'heure_debut', 'id'], name='rdv_date_heure_idx'),
+        ),
+    ]
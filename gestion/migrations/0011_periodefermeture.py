@@ -0,0 +1,66 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:08
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def regrouper_fermetures(apps, schema_editor):
+    """Remplace les JourSpecial fermés par des périodes : une par suite de dates consécutives d'un salon."""
+    JourSpecial = apps.get_model('gestion', 'JourSpecial')
+    PeriodeFermeture = apps.get_model('gestion', 'PeriodeFermeture')
+
+    periodes = []
+    courante = None
+    fermetures = JourSpecial.objects.filter(est_ferme=True).order_by('salon_id', 'date')
+    for salon_id, jour in fermetures.values_list('salon_id', 'date').iterator():
+        if courante and courante.salon_id == salon_id and jour == courante.date_fin + timedelta(days=1):
+            courante.date_fin = jour
+        else:
+            courante = PeriodeFermeture(salon_id=salon_id, date_debut=jour, date_fin=jour)
+            periodes.append(courante)
+
+    PeriodeFermeture.objects.bulk_create(periodes, batch_size=500)
+    fermetures.delete()
+
+
+def detailler_fermetures(apps, schema_editor):
+    """Retour arrière : un JourSpecial fermé par date de chaque période, sans écraser un jour spécial existant."""
+    JourSpecial = apps.get_model('gestion', 'JourSpecial')
+    PeriodeFermeture = apps.get_model('gestion', 'PeriodeFermeture')
+
+    existants = set(JourSpecial.objects.values_list('salon_id', 'date'))
+    jours = []
+    for periode in PeriodeFermeture.objects.iterator():
+        jour = periode.date_debut
+        while jour <= periode.date_fin:
+            if (periode.salon_id, jour) not in existants:
+                jours.append(JourSpecial(salon_id=periode.salon_id, date=jour, est_ferme=True))
+            jour += timedelta(days=1)
+    JourSpecial.objects.bulk_create(jours, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0010_index_rendezvous_date_heure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodeFermeture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_debut', models.DateField()),
+                ('date_fin', models.DateField()),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='periodes_fermeture', to='gestion.salon')),
+            ],
+            options={
+                'ordering': ['date_debut'],
+                'indexes': [models.Index(fields=['salon', 'date_debut', 'date_fin'], name='periode_fermeture_salon_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('date_fin__gte', models.F('date_debut'))), name='periode_fermeture_dates_ordonnees')],
+            },
+        ),
+        migrations.RunPython(regrouper_fermetures, detailler_fermetures),
+    ]
@@ -0,0 +1,81 @@
+from django.db import migrations
+
+# Un client ne peut pas avoir deux rendez-vous actifs (non annulés) qui se chevauchent. La règle est
+# imposée par la base pour fermer la course entre deux soumissions simultanées : contrainte d'exclusion
+# sur PostgreSQL, déclencheurs sur SQLite. Les deux signalent la violation sous le nom
+# 'rdv_client_chevauchement', que gestion/services/reservation.py traduit en message pour le formulaire.
+# Un rendez-vous dont heure_fin <= heure_debut se termine le lendemain.
+
+POSTGRESQL_AVANT = "CREATE EXTENSION IF NOT EXISTS btree_gist;"
+
+POSTGRESQL = """
+ALTER TABLE gestion_rendezvous ADD CONSTRAINT rdv_client_chevauchement
+EXCLUDE USING gist (
+    utilisateur_id WITH =,
+    tsrange(
+        date + heure_debut,
+        date + heure_fin + CASE WHEN heure_fin <= heure_debut THEN interval '1 day' ELSE interval '0' END,
+        '[)'
+    ) WITH &&
+) WHERE (statut <> 'annulé');
+"""
+
+POSTGRESQL_RETOUR = "ALTER TABLE gestion_rendezvous DROP CONSTRAINT IF EXISTS rdv_client_chevauchement;"
+
+SQLITE_CONDITION = """
+WHEN NEW.statut <> 'annulé' AND EXISTS (
+    SELECT 1 FROM gestion_rendezvous AS r
+    WHERE r.utilisateur_id = NEW.utilisateur_id
+      AND r.id IS NOT NEW.id
+      AND r.statut <> 'annulé'
+      AND r.date BETWEEN date(NEW.date, '-1 day') AND date(NEW.date, '+1 day')
+      AND datetime(r.date || ' ' || r.heure_debut) < datetime(NEW.date || ' ' || NEW.heure_fin,
+            CASE WHEN NEW.heure_fin <= NEW.heure_debut THEN '+1 day' ELSE '+0 day' END)
+      AND datetime(r.date || ' ' || r.heure_fin,
+            CASE WHEN r.heure_fin <= r.heure_debut THEN '+1 day' ELSE '+0 day' END)
+          > datetime(NEW.date || ' ' || NEW.heure_debut)
+)
+BEGIN
+    SELECT RAISE(ABORT, 'rdv_client_chevauchement');
+END;
+"""
+
+SQLITE = [
+    "CREATE TRIGGER rdv_client_chevauchement_insert BEFORE INSERT ON gestion_rendezvous" + SQLITE_CONDITION,
+    "CREATE TRIGGER rdv_client_chevauchement_update BEFORE UPDATE ON gestion_rendezvous" + SQLITE_CONDITION,
+]
+
+SQLITE_RETOUR = [
+    "DROP TRIGGER IF EXISTS rdv_client_chevauchement_insert;",
+    "DROP TRIGGER IF EXISTS rdv_client_chevauchement_update;",
+]
+
+
+def creer_contrainte(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(POSTGRESQL_AVANT)
+        schema_editor.execute(POSTGRESQL)
+    elif vendor == 'sqlite':
+        for instruction in SQLITE:
+            schema_editor.execute(instruction)
+
+
+def supprimer_contrainte(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(POSTGRESQL_RETOUR)
+    elif vendor == 'sqlite':
+        for instruction in SQLITE_RETOUR:
+            schema_editor.execute(instruction)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0011_periodefermeture'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_contrainte, supprimer_contrainte),
+    ]
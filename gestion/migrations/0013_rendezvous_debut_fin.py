@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Ajoute les colonnes debut / fin (datetimes complets) à RendezVous, les remplit à partir de
+# date / heure_debut / heure_fin, remplace les index sur ces trois colonnes par des index sur debut / fin,
+# et réécrit la règle de non-chevauchement des rendez-vous d'un client (migration 0012) sur ces colonnes.
+#
+# Sur SQLite, la modification d'une colonne reconstruit la table et supprime ses déclencheurs : toute
+# migration future qui reconstruit gestion_rendezvous doit les recréer comme ci-dessous.
+
+TAILLE_LOT = 1000
+
+POSTGRESQL = """
+ALTER TABLE gestion_rendezvous ADD CONSTRAINT rdv_client_chevauchement
+EXCLUDE USING gist (utilisateur_id WITH =, tstzrange(debut, fin, '[)') WITH &&)
+WHERE (statut <> 'annulé');
+"""
+
+POSTGRESQL_0012 = """
+ALTER TABLE gestion_rendezvous ADD CONSTRAINT rdv_client_chevauchement
+EXCLUDE USING gist (
+    utilisateur_id WITH =,
+    tsrange(
+        date + heure_debut,
+        date + heure_fin + CASE WHEN heure_fin <= heure_debut THEN interval '1 day' ELSE interval '0' END,
+        '[)'
+    ) WITH &&
+) WHERE (statut <> 'annulé');
+"""
+
+POSTGRESQL_SUPPRESSION = "ALTER TABLE gestion_rendezvous DROP CONSTRAINT IF EXISTS rdv_client_chevauchement;"
+
+SQLITE_CONDITION = """
+WHEN NEW.statut <> 'annulé' AND EXISTS (
+    SELECT 1 FROM gestion_rendezvous AS r
+    WHERE r.utilisateur_id = NEW.utilisateur_id
+      AND r.id IS NOT NEW.id
+      AND r.statut <> 'annulé'
+      AND r.debut < NEW.fin
+      AND r.fin > NEW.debut
+)
+BEGIN
+    SELECT RAISE(ABORT, 'rdv_client_chevauchement');
+END;
+"""
+
+SQLITE_CONDITION_0012 = """
+WHEN NEW.statut <> 'annulé' AND EXISTS (
+    SELECT 1 FROM gestion_rendezvous AS r
+    WHERE r.utilisateur_id = NEW.utilisateur_id
+      AND r.id IS NOT NEW.id
+      AND r.statut <> 'annulé'
+      AND r.date BETWEEN date(NEW.date, '-1 day') AND date(NEW.date, '+1 day')
+      AND datetime(r.date || ' ' || r.heure_debut) < datetime(NEW.date || ' ' || NEW.heure_fin,
+            CASE WHEN NEW.heure_fin <= NEW.heure_debut THEN '+1 day' ELSE '+0 day' END)
+      AND datetime(r.date || ' ' || r.heure_fin,
+            CASE WHEN r.heure_fin <= r.heure_debut THEN '+1 day' ELSE '+0 day' END)
+          > datetime(NEW.date || ' ' || NEW.heure_debut)
+)
+BEGIN
+    SELECT RAISE(ABORT, 'rdv_client_chevauchement');
+END;
+"""
+
+SQLITE_SUPPRESSION = [
+    "DROP TRIGGER IF EXISTS rdv_client_chevauchement_insert;",
+    "DROP TRIGGER IF EXISTS rdv_client_chevauchement_update;",
+]
+
+
+def _creer(schema_editor, postgresql, sqlite_condition):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(postgresql)
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE TRIGGER rdv_client_chevauchement_insert BEFORE INSERT ON gestion_rendezvous" + sqlite_condition)
+        schema_editor.execute(
+            "CREATE TRIGGER rdv_client_chevauchement_update BEFORE UPDATE ON gestion_rendezvous" + sqlite_condition)
+
+
+def supprimer_contrainte(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(POSTGRESQL_SUPPRESSION)
+    elif vendor == 'sqlite':
+        for instruction in SQLITE_SUPPRESSION:
+            schema_editor.execute(instruction)
+
+
+def creer_contrainte(apps, schema_editor):
+    _creer(schema_editor, POSTGRESQL, SQLITE_CONDITION)
+
+
+def creer_contrainte_0012(apps, schema_editor):
+    _creer(schema_editor, POSTGRESQL_0012, SQLITE_CONDITION_0012)
+
+
+def remplir_debut_fin(apps, schema_editor):
+    RendezVous = apps.get_model('gestion', 'RendezVous')
+    lot = []
+    for rendezvous in RendezVous.objects.only('date', 'heure_debut', 'heure_fin').iterator(chunk_size=TAILLE_LOT):
+        debut = datetime.combine(rendezvous.date, rendezvous.heure_debut)
+        fin = datetime.combine(rendezvous.date, rendezvous.heure_fin)
+        if fin <= debut:
+            fin += timedelta(days=1)
+        rendezvous.debut = timezone.make_aware(debut)
+        rendezvous.fin = timezone.make_aware(fin)
+        lot.append(rendezvous)
+        if len(lot) >= TAILLE_LOT:
+            RendezVous.objects.bulk_update(lot, ['debut', 'fin'])
+            lot = []
+    RendezVous.objects.bulk_update(lot, ['debut', 'fin'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0012_rendezvous_client_sans_chevauchement'),
+    ]
+
+    operations = [
+        migrations.RunPython(supprimer_contrainte, creer_contrainte_0012),
+        migrations.AddField(
+            model_name='rendezvous',
+            name='debut',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='rendezvous',
+            name='fin',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(remplir_debut_fin, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='rendezvous',
+            name='debut',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='rendezvous',
+            name='fin',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.RemoveIndex(
+            model_name='rendezvous',
+            name='rdv_salon_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='rendezvous',
+            name='rdv_salon_actifs_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='rendezvous',
+            name='rdv_client_actifs_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='rendezvous',
+            name='rdv_date_heure_idx',
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['salon', 'debut'], name='rdv_salon_debut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['debut', 'id'], name='rdv_debut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['utilisateur', 'debut'], name='rdv_client_debut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(condition=models.Q(('statut', 'annulé'), _negated=True),
+                               fields=['salon', 'debut', 'fin'], name='rdv_salon_actifs_idx'),
+        ),
+        migrations.RunPython(creer_contrainte, supprimer_contrainte),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:19
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('gestion', '0013_rendezvous_debut_fin'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='utilisateur',
+            index=models.Index(django.db.models.functions.text.Lower('last_name'), django.db.models.functions.text.Lower('first_name'), name='utilisateur_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='utilisateur',
+            index=models.Index(django.db.models.functions.text.Lower('first_name'), name='utilisateur_prenom_idx'),
+        ),
+    ]
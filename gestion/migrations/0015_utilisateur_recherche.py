@@ -0,0 +1,99 @@
+from django.db import migrations, models
+
+from gestion.normalisation import normaliser_texte
+
+# Colonne de recherche normalisée des utilisateurs (nom, prénom, nom d'utilisateur, email sans accents ni
+# majuscules) et son index plein texte, propre à chaque base :
+# - PostgreSQL : index GIN pg_trgm, utilisé par les filtres LIKE '%mot%' et le classement par similarité ;
+# - SQLite : table FTS5 à contenu externe 'gestion_utilisateur_fts', tenue à jour par des déclencheurs.
+#
+# Sur SQLite, toute migration qui reconstruit gestion_utilisateur supprime ces déclencheurs : elle doit les
+# recréer et reconstruire la table FTS5 comme ci-dessous.
+
+TAILLE_LOT = 1000
+
+POSTGRESQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    "CREATE INDEX utilisateur_recherche_trgm_idx ON gestion_utilisateur USING gin (recherche gin_trgm_ops);",
+]
+
+POSTGRESQL_RETOUR = ["DROP INDEX IF EXISTS utilisateur_recherche_trgm_idx;"]
+
+SQLITE = [
+    """
+    CREATE VIRTUAL TABLE gestion_utilisateur_fts USING fts5(
+        recherche, content='gestion_utilisateur', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    );
+    """,
+    """
+    CREATE TRIGGER utilisateur_fts_insert AFTER INSERT ON gestion_utilisateur BEGIN
+        INSERT INTO gestion_utilisateur_fts (rowid, recherche) VALUES (NEW.id, NEW.recherche);
+    END;
+    """,
+    """
+    CREATE TRIGGER utilisateur_fts_delete AFTER DELETE ON gestion_utilisateur BEGIN
+        INSERT INTO gestion_utilisateur_fts (gestion_utilisateur_fts, rowid, recherche)
+        VALUES ('delete', OLD.id, OLD.recherche);
+    END;
+    """,
+    """
+    CREATE TRIGGER utilisateur_fts_update AFTER UPDATE OF recherche ON gestion_utilisateur BEGIN
+        INSERT INTO gestion_utilisateur_fts (gestion_utilisateur_fts, rowid, recherche)
+        VALUES ('delete', OLD.id, OLD.recherche);
+        INSERT INTO gestion_utilisateur_fts (rowid, recherche) VALUES (NEW.id, NEW.recherche);
+    END;
+    """,
+    "INSERT INTO gestion_utilisateur_fts (gestion_utilisateur_fts) VALUES ('rebuild');",
+]
+
+SQLITE_RETOUR = [
+    "DROP TRIGGER IF EXISTS utilisateur_fts_insert;",
+    "DROP TRIGGER IF EXISTS utilisateur_fts_delete;",
+    "DROP TRIGGER IF EXISTS utilisateur_fts_update;",
+    "DROP TABLE IF EXISTS gestion_utilisateur_fts;",
+]
+
+
+def _executer(schema_editor, postgresql, sqlite):
+    vendor = schema_editor.connection.vendor
+    instructions = {'postgresql': postgresql, 'sqlite': sqlite}.get(vendor, [])
+    for instruction in instructions:
+        schema_editor.execute(instruction)
+
+
+def creer_index(apps, schema_editor):
+    _executer(schema_editor, POSTGRESQL, SQLITE)
+
+
+def supprimer_index(apps, schema_editor):
+    _executer(schema_editor, POSTGRESQL_RETOUR, SQLITE_RETOUR)
+
+
+def remplir_recherche(apps, schema_editor):
+    Utilisateur = apps.get_model('gestion', 'Utilisateur')
+    champs = ('last_name', 'first_name', 'username', 'email')
+    lot = []
+    for utilisateur in Utilisateur.objects.only(*champs).iterator(chunk_size=TAILLE_LOT):
+        utilisateur.recherche = normaliser_texte(' '.join(getattr(utilisateur, champ) or '' for champ in champs))
+        lot.append(utilisateur)
+        if len(lot) >= TAILLE_LOT:
+            Utilisateur.objects.bulk_update(lot, ['recherche'])
+            lot = []
+    Utilisateur.objects.bulk_update(lot, ['recherche'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0014_utilisateur_index_nom'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='utilisateur',
+            name='recherche',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(remplir_recherche, migrations.RunPython.noop),
+        migrations.RunPython(creer_index, supprimer_index),
+    ]
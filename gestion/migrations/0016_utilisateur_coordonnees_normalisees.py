@@ -0,0 +1,66 @@
+import gestion.models
+from django.db import migrations, models
+
+from gestion.normalisation import normaliser_telephone, normaliser_email
+
+# Téléphone E.164 et email sans casse, uniques lorsqu'ils sont renseignés. Les comptes existants sont
+# parcourus par ordre d'ancienneté : en cas de doublon (même numéro écrit autrement, même adresse à la casse
+# près), le compte le plus ancien garde la valeur normalisée et les suivants restent à NULL, à corriger à la
+# main ; Utilisateur.save() les y laisse tant que le doublon existe. Les colonnes sont nullables sans valeur par défaut et les contraintes partielles : sous SQLite, rien
+# ne reconstruit la table, ce qui préserve les déclencheurs FTS5 de la migration 0015.
+
+TAILLE_LOT = 1000
+
+
+def remplir_coordonnees(apps, schema_editor):
+    Utilisateur = apps.get_model('gestion', 'Utilisateur')
+    telephones, emails = set(), set()
+    lot = []
+    for utilisateur in Utilisateur.objects.only('telephone', 'email').order_by('pk').iterator(chunk_size=TAILLE_LOT):
+        telephone = normaliser_telephone(utilisateur.telephone)
+        email = normaliser_email(utilisateur.email)
+        utilisateur.telephone_normalise = telephone if telephone not in telephones else None
+        utilisateur.email_normalise = email if email not in emails else None
+        telephones.add(telephone)
+        emails.add(email)
+        lot.append(utilisateur)
+        if len(lot) >= TAILLE_LOT:
+            Utilisateur.objects.bulk_update(lot, ['telephone_normalise', 'email_normalise'])
+            lot = []
+    Utilisateur.objects.bulk_update(lot, ['telephone_normalise', 'email_normalise'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('gestion', '0015_utilisateur_recherche'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='utilisateur',
+            managers=[
+                ('objects', gestion.models.UtilisateurManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='utilisateur',
+            name='email_normalise',
+            field=models.CharField(blank=True, editable=False, max_length=254, null=True),
+        ),
+        migrations.AddField(
+            model_name='utilisateur',
+            name='telephone_normalise',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.RunPython(remplir_coordonnees, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='utilisateur',
+            constraint=models.UniqueConstraint(condition=models.Q(('telephone_normalise__isnull', False)), fields=('telephone_normalise',), name='utilisateur_telephone_normalise_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='utilisateur',
+            constraint=models.UniqueConstraint(condition=models.Q(('email_normalise__isnull', False)), fields=('email_normalise',), name='utilisateur_email_normalise_unique'),
+        ),
+    ]
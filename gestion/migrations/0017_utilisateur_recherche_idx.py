@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+# Les suggestions de bénéficiaires cherchent le préfixe dans la colonne normalisée (sans accents) au lieu de
+# LOWER(nom) / LOWER(prénom), que SQLite n'applique qu'aux lettres ASCII. L'index sur LOWER(first_name) ne
+# sert plus. Ajouter ou retirer un index ne reconstruit pas la table sous SQLite : les déclencheurs FTS5 de la
+# migration 0015 sont conservés.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0016_utilisateur_coordonnees_normalisees'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='utilisateur',
+            name='utilisateur_prenom_idx',
+        ),
+        migrations.AddIndex(
+            model_name='utilisateur',
+            index=models.Index(fields=['recherche'], name='utilisateur_recherche_idx'),
+        ),
+    ]
@@ -2,9 +2,13 @@
 
 from datetime import time, date, datetime, timedelta
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import RegexValidator
 
+from gestion.normalisation import normaliser_texte, normaliser_telephone, normaliser_email
+
 # Définition du RegexValidator pour les numéros de téléphone européens
 phone_regex = RegexValidator(
     regex=r'^\+?[\d\s\-\(\)]{7,15}$',
@@ -13,6 +17,30 @@ phone_regex = RegexValidator(
 )
 
 
+class UtilisateurManager(UserManager):
+    def get_by_natural_key(self, username):
+        """
+        Connexion par email sans tenir compte de la casse : une seule lecture sur l'index unique de
+        email_normalise. Les comptes dont l'adresse n'a pas pu être normalisée (doublon à la casse près,
+        voir migration 0016) restent accessibles avec leur adresse exacte.
+        """
+        try:
+            return self.get(email_normalise=normaliser_email(username))
+        except self.model.DoesNotExist:
+            return self.get(**{self.model.USERNAME_FIELD: username})
+
+    def par_email(self, email):
+        """Utilisateurs dont l'adresse correspond à l'adresse donnée sans tenir compte de la casse (index unique)."""
+        return self.filter(email_normalise=normaliser_email(email)) if email else self.none()
+
+    def par_telephone(self, telephone):
+        """Utilisateurs dont le numéro correspond au numéro donné, quel que soit son format (index unique)."""
+        telephone_normalise = normaliser_telephone(telephone)
+        if telephone_normalise is None:
+            return self.none()
+        return self.filter(telephone_normalise=telephone_normalise)
+
+
 class Utilisateur(AbstractUser):
     # AbstractUser fournit déjà :
     # username
@@ -41,6 +69,17 @@ class Utilisateur(AbstractUser):
     ]
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='client')
 
+    # Nom, prénom, nom d'utilisateur et email normalisés (sans accents ni majuscules), tenus à jour par save()
+    # et indexés pour la recherche plein texte (trigrammes sous PostgreSQL, FTS5 sous SQLite, voir migration 0015).
+    recherche = models.TextField(editable=False, default='')
+
+    # Téléphone au format E.164 et email sans distinction de casse, tenus à jour par save() : une recherche
+    # par numéro (quel que soit le format saisi) ou par email est une seule lecture d'index unique.
+    telephone_normalise = models.CharField(max_length=16, null=True, blank=True, editable=False)
+    email_normalise = models.CharField(max_length=254, null=True, blank=True, editable=False)
+
+    objects = UtilisateurManager()
+
     # Définis l'email comme champ de connexion principal
     USERNAME_FIELD = 'email'
     # Champs requis lors de la création d'un superutilisateur (en plus de l'email et du mot de passe)
@@ -52,6 +91,76 @@ class Utilisateur(AbstractUser):
     class Meta:
         verbose_name = 'Utilisateur'
         verbose_name_plural = 'Utilisateurs'
+        indexes = [
+            # Tri alphabétique de la liste des utilisateurs sans tenir compte de la casse.
+            models.Index(Lower('last_name'), Lower('first_name'), name='utilisateur_nom_idx'),
+            # Suggestions par préfixe de la colonne normalisée, triées dans son ordre (services/recherche.py).
+            models.Index(fields=['recherche'], name='utilisateur_recherche_idx'),
+        ]
+        constraints = [
+            # Partielles (valeurs non nulles) : créées comme simples index uniques, y compris sous SQLite
+            # où une contrainte d'unicité ordinaire reconstruirait la table et ses déclencheurs (migration 0015).
+            models.UniqueConstraint(
+                fields=['telephone_normalise'], condition=models.Q(telephone_normalise__isnull=False),
+                name='utilisateur_telephone_normalise_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['email_normalise'], condition=models.Q(email_normalise__isnull=False),
+                name='utilisateur_email_normalise_unique',
+            ),
+        ]
+
+    # Champs dont dépend la colonne de recherche.
+    CHAMPS_RECHERCHE = ('last_name', 'first_name', 'username', 'email')
+
+    def texte_recherche(self):
+        return normaliser_texte(' '.join(getattr(self, champ) or '' for champ in self.CHAMPS_RECHERCHE))
+
+    # Colonnes calculées par save() et champs dont elles dépendent.
+    CHAMPS_DERIVES = {
+        'recherche': CHAMPS_RECHERCHE,
+        'telephone_normalise': ('telephone',),
+        'email_normalise': ('email',),
+    }
+
+    def calculer_champs_derives(self):
+        """Met à jour les colonnes calculées ; à appeler explicitement avant un bulk_create, qui ignore save()."""
+        self.recherche = self.texte_recherche()
+        self.telephone_normalise = normaliser_telephone(self.telephone)
+        self.email_normalise = normaliser_email(self.email)
+
+    # Colonnes normalisées couvertes par un index unique partiel (voir Meta.constraints).
+    CHAMPS_NORMALISES_UNIQUES = ('telephone_normalise', 'email_normalise')
+
+    def _ecarter_coordonnees_prises(self, champs_ecrits=None):
+        """
+        Laisse à NULL un téléphone ou un email normalisé déjà porté par un autre compte (doublon écarté par
+        la migration 0016, à corriger à la main) : l'enregistrement du compte, pour le désactiver ou changer
+        son mot de passe, ne doit pas se heurter à l'index unique. Une requête, et seulement si l'une de ces
+        colonnes est écrite.
+        """
+        valeurs = {
+            champ: getattr(self, champ) for champ in self.CHAMPS_NORMALISES_UNIQUES
+            if getattr(self, champ) is not None and (champs_ecrits is None or champ in champs_ecrits)
+        }
+        if not valeurs:
+            return
+        condition = models.Q()
+        for champ, valeur in valeurs.items():
+            condition |= models.Q(**{champ: valeur})
+        for ligne in Utilisateur.objects.filter(condition).exclude(pk=self.pk).values_list(*valeurs):
+            for champ, valeur in zip(valeurs, ligne):
+                if valeur == valeurs[champ]:
+                    setattr(self, champ, None)
+
+    def save(self, *args, **kwargs):
+        self.calculer_champs_derives()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *(
+                derive for derive, sources in self.CHAMPS_DERIVES.items() if set(sources) & set(update_fields))}
+        self._ecarter_coordonnees_prises(kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
 
     def __str__(self):
         # Utilise les noms de champs de AbstractUser et ajoute le rôle
@@ -199,6 +308,71 @@ class PlageHoraireSpeciale(models.Model):
                 f"{self.heure_fin.strftime('%H:%M')}")
 
 
+class PeriodeFermetureQuerySet(models.QuerySet):
+    def contenant(self, jour):
+        """Périodes qui couvrent la date donnée (bornes incluses)."""
+        return self.filter(date_debut__lte=jour, date_fin__gte=jour)
+
+    def chevauchant(self, date_debut, date_fin):
+        """Périodes qui ont au moins un jour en commun avec l'intervalle [date_debut, date_fin]."""
+        return self.filter(date_debut__lte=date_fin, date_fin__gte=date_debut)
+
+
+class PeriodeFermeture(models.Model):
+    """
+    Fermeture complète d'un salon du date_debut au date_fin inclus (vacances, congés...), enregistrée
+    en une seule ligne quelle que soit sa durée. Un JourSpecial à une date de la période reste prioritaire,
+    ce qui permet une ouverture exceptionnelle pendant des vacances.
+    """
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='periodes_fermeture')
+    date_debut = models.DateField()
+    date_fin = models.DateField()
+
+    objects = PeriodeFermetureQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['date_debut']
+        indexes = [
+            # « Le salon est-il fermé le jour D ? » : un seul parcours d'intervalle sur l'index.
+            models.Index(fields=['salon', 'date_debut', 'date_fin'], name='periode_fermeture_salon_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(date_fin__gte=models.F('date_debut')),
+                                   name='periode_fermeture_dates_ordonnees'),
+        ]
+
+    def __str__(self):
+        if self.date_debut == self.date_fin:
+            return f"{self.salon.nom} - fermé le {self.date_debut}"
+        return f"{self.salon.nom} - fermé du {self.date_debut} au {self.date_fin}"
+
+
+class HoraireEffectif(models.Model):
+    """
+    Horaires d'ouverture effectifs d'un salon pour une date donnée, matérialisés à partir des plages
+    régulières, des jours spéciaux, des périodes de fermeture et de la période d'activité
+    (voir gestion/services/calendrier.py).
+    Une date où le salon est fermé est représentée par une seule ligne sans heures.
+    """
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='horaires_effectifs')
+    date = models.DateField()
+    heure_debut = models.TimeField(null=True, blank=True)
+    heure_fin = models.TimeField(null=True, blank=True)
+    # Vrai si les horaires de cette date proviennent d'un JourSpecial ou d'une PeriodeFermeture.
+    jour_special = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['salon', 'date'], name='horaire_effectif_salon_date'),
+        ]
+
+    def __str__(self):
+        if self.heure_debut is None:
+            return f"{self.salon.nom} - {self.date} : fermé"
+        return (f"{self.salon.nom} - {self.date} : {self.heure_debut.strftime('%H:%M')} - "
+                f"{self.heure_fin.strftime('%H:%M')}")
+
+
 STATUT_CHOICES = [
     ('prévu', 'Prévu'),
     ('terminé', 'Terminé'),
@@ -206,6 +380,24 @@ STATUT_CHOICES = [
 ]
 
 
+class RendezVousQuerySet(models.QuerySet):
+    def actifs(self):
+        """Rendez-vous qui occupent réellement un créneau (les rendez-vous annulés ne comptent pas)."""
+        return self.exclude(statut='annulé')
+
+    def pour_liste(self):
+        """
+        Rendez-vous prêts à être affichés dans une liste ou un agenda : client, salon et soin sont chargés
+        dans la même requête (jointures) et seules les colonnes utilisées par les templates sont lues.
+        """
+        return self.select_related('utilisateur', 'salon', 'soin_detail__soin').only(
+            'date', 'heure_debut', 'heure_fin', 'debut', 'fin', 'statut',
+            'utilisateur__first_name', 'utilisateur__last_name',
+            'salon__nom',
+            'soin_detail__soin__type_de_soin',
+        )
+
+
 class RendezVous(models.Model):
     utilisateur = models.ForeignKey(Utilisateur, on_delete=models.CASCADE)
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE)
@@ -216,6 +408,44 @@ class RendezVous(models.Model):
     heure_fin = models.TimeField()
     statut = models.CharField(max_length=20, choices=STATUT_CHOICES)
 
+    # Début et fin complets du rendez-vous, dérivés de date / heure_debut / heure_fin à chaque save()
+    # (une heure de fin inférieure ou égale à l'heure de début tombe le lendemain). Les requêtes sur une
+    # fenêtre de temps ou la séparation passé/futur se font sur ces colonnes indexées.
+    debut = models.DateTimeField(editable=False)
+    fin = models.DateTimeField(editable=False)
+
+    objects = RendezVousQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Agendas d'un salon (detail_salon, anciens_rendezvous) : salon + fenêtre de temps, triée.
+            models.Index(fields=['salon', 'debut'], name='rdv_salon_debut_idx'),
+            # Liste de tous les rendez-vous, paginée par clé sur (debut, id).
+            models.Index(fields=['debut', 'id'], name='rdv_debut_idx'),
+            # Rendez-vous d'un client (mes_rendezvous), séparés en passés / à venir.
+            models.Index(fields=['utilisateur', 'debut'], name='rdv_client_debut_idx'),
+            # Contrôles de capacité (réservation, disponibilités) : index partiel limité aux rendez-vous
+            # non annulés, qui sont les seuls à occuper un créneau.
+            models.Index(fields=['salon', 'debut', 'fin'], name='rdv_salon_actifs_idx',
+                         condition=~models.Q(statut='annulé')),
+        ]
+
+    @staticmethod
+    def bornes(jour, heure_debut, heure_fin):
+        """Retourne (debut, fin) en datetimes du fuseau courant ; la fin passe au lendemain si besoin."""
+        debut = datetime.combine(jour, heure_debut)
+        fin = datetime.combine(jour, heure_fin)
+        if fin <= debut:
+            fin += timedelta(days=1)
+        return timezone.make_aware(debut), timezone.make_aware(fin)
+
+    def save(self, *args, **kwargs):
+        self.debut, self.fin = self.bornes(self.date, self.heure_debut, self.heure_fin)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'heure_debut', 'heure_fin'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'debut', 'fin'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return (f"RDV {self.utilisateur.first_name} {self.utilisateur.last_name} - "  # Utilise first_name/last_name
                 f"{self.soin_detail.soin.type_de_soin} ({self.date} à {self.heure_debut.strftime('%H:%M')})")
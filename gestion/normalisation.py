@@ -0,0 +1,63 @@
+# gestion/normalisation.py
+
+import re
+import unicodedata
+
+from django.conf import settings
+
+# Indicatif pays ajouté aux numéros saisis au format national (0471 23 45 67 -> +32471234567).
+INDICATIF_PAR_DEFAUT = getattr(settings, 'INDICATIF_TELEPHONE_PAR_DEFAUT', '32')
+
+# Un numéro E.164 compte au plus 15 chiffres, indicatif compris.
+CHIFFRES_E164_MIN = 8
+CHIFFRES_E164_MAX = 15
+
+_ESPACES = re.compile(r'\s+')
+_MOTS = re.compile(r'\w+')
+
+
+def normaliser_texte(texte):
+    """
+    Forme de comparaison d'un texte : sans accents, sans distinction de casse et avec des espaces simples
+    (« Élodie  Müller » -> « elodie muller »). Utilisée pour la colonne de recherche des utilisateurs.
+    """
+    if not texte:
+        return ''
+    decompose = unicodedata.normalize('NFKD', texte)
+    sans_accents = ''.join(caractere for caractere in decompose if not unicodedata.combining(caractere))
+    return _ESPACES.sub(' ', sans_accents.casefold()).strip()
+
+
+def mots_normalises(texte):
+    """Mots (lettres et chiffres) du texte normalisé, dans l'ordre : « Dupont-Élodie » -> ['dupont', 'elodie']."""
+    return _MOTS.findall(normaliser_texte(texte))
+
+
+def normaliser_telephone(telephone, indicatif=None):
+    """
+    Numéro au format E.164 (« +32471234567 ») quel que soit le format saisi : espaces, tirets, parenthèses,
+    préfixe international 00 ou numéro national commençant par 0 (indicatif par défaut : Belgique).
+    Retourne None si le texte est vide ou ne peut pas être un numéro E.164.
+    """
+    if not telephone:
+        return None
+    texte = telephone.strip()
+    chiffres = re.sub(r'\D', '', texte)
+    if texte.startswith('+'):
+        pass
+    elif chiffres.startswith('00'):
+        chiffres = chiffres[2:]
+    elif chiffres.startswith('0'):
+        chiffres = (indicatif or INDICATIF_PAR_DEFAUT) + chiffres[1:]
+    else:
+        chiffres = (indicatif or INDICATIF_PAR_DEFAUT) + chiffres
+    if not CHIFFRES_E164_MIN <= len(chiffres) <= CHIFFRES_E164_MAX or chiffres.startswith('0'):
+        return None
+    return f'+{chiffres}'
+
+
+def normaliser_email(email):
+    """Adresse e-mail sans espaces autour et sans distinction de casse, ou None si elle est vide."""
+    if not email:
+        return None
+    return email.strip().casefold() or None
@@ -0,0 +1,146 @@
+# gestion/profilage.py
+
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+RACINE_PROJET = str(Path(settings.BASE_DIR)) + os.sep
+BIBLIOTHEQUE_STANDARD = sysconfig.get_paths()['stdlib'] + os.sep
+
+# Fichiers de l'outillage lui-même, jamais retenus comme site d'appel d'une requête SQL.
+FICHIERS_OUTILLAGE = {
+    str(Path(__file__).with_name(nom)) for nom in ('profilage.py', 'middleware.py', 'requetes_lentes.py')
+}
+
+# Vrai pendant les requêtes SQL lancées par l'outillage lui-même (EXPLAIN du journal des requêtes lentes) :
+# elles ne sont comptées ni dans les mesures de la requête HTTP ni dans le profil.
+_outillage = threading.local()
+
+# Site d'appel : première fonction du code du projet sur la pile (vue, méthode de formulaire, service...).
+SiteAppel = namedtuple('SiteAppel', ['fichier', 'ligne', 'fonction'])
+
+# Ligne de l'arbre d'appels, dans l'ordre d'affichage (parcours en profondeur).
+LigneArbre = namedtuple('LigneArbre', ['profondeur', 'fonction', 'appels', 'cumul_ms', 'propre_ms', 'pourcentage'])
+
+# Requêtes SQL d'un même site d'appel.
+GroupeSQL = namedtuple('GroupeSQL', ['site', 'nombre', 'duree_ms', 'sql'])
+
+
+@contextmanager
+def requetes_outillage():
+    """Marque les requêtes SQL exécutées dans le bloc comme propres à l'outillage."""
+    _outillage.actif = True
+    try:
+        yield
+    finally:
+        _outillage.actif = False
+
+
+def est_requete_outillage():
+    return getattr(_outillage, 'actif', False)
+
+
+def _est_code_projet(fichier):
+    return (fichier.startswith(RACINE_PROJET) and 'site-packages' not in fichier
+            and fichier not in FICHIERS_OUTILLAGE)
+
+
+def pile_appels(limite=None):
+    """
+    Cadres du code du projet présents sur la pile, du plus profond (ex. RendezVousForm.clean) au plus haut
+    (la vue), hors bibliothèques (Django, pilotes SQL). Parcourt directement les cadres : bien moins coûteux
+    que traceback.extract_stack, qui lit les sources.
+    """
+    pile = []
+    cadre = sys._getframe(1)
+    while cadre is not None and (limite is None or len(pile) < limite):
+        fichier = cadre.f_code.co_filename
+        if _est_code_projet(fichier):
+            pile.append(SiteAppel(os.path.relpath(fichier, RACINE_PROJET), cadre.f_lineno, cadre.f_code.co_name))
+        cadre = cadre.f_back
+    return pile
+
+
+def site_appel():
+    """Premier cadre du code du projet sur la pile, ou None."""
+    pile = pile_appels(limite=1)
+    return pile[0] if pile else None
+
+
+def libelle_site(site):
+    if site is None:
+        return "(hors code du projet)"
+    return f"{site.fichier}:{site.ligne} ({site.fonction})"
+
+
+class RequetesParSiteAppel:
+    """execute_wrapper qui regroupe les requêtes SQL par site d'appel (nombre, durée cumulée, exemple de SQL)."""
+
+    def __init__(self):
+        self.sites = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if est_requete_outillage():
+            return execute(sql, params, many, context)
+        depart = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duree = time.perf_counter() - depart
+            entree = self.sites.setdefault(site_appel(), [0, 0.0, sql])
+            entree[0] += 1
+            entree[1] += duree
+
+    def groupes(self):
+        """Groupes du plus coûteux au moins coûteux."""
+        groupes = [GroupeSQL(libelle_site(site), nombre, round(duree * 1000, 2), sql)
+                   for site, (nombre, duree, sql) in self.sites.items()]
+        return sorted(groupes, key=lambda groupe: groupe.duree_ms, reverse=True)
+
+
+def _libelle_fonction(fonction):
+    fichier, ligne, nom = fonction
+    if fichier == '~':  # fonction intégrée (len, méthodes des objets C...)
+        return nom
+    if fichier.startswith(RACINE_PROJET):
+        fichier = os.path.relpath(fichier, RACINE_PROJET)
+    elif 'site-packages' + os.sep in fichier:
+        fichier = fichier.split('site-packages' + os.sep, 1)[1]
+    elif fichier.startswith(BIBLIOTHEQUE_STANDARD):
+        fichier = os.path.relpath(fichier, BIBLIOTHEQUE_STANDARD)
+    return f"{fichier}:{ligne} ({nom})"
+
+
+def arbre_appels(stats, seuil=0.01, profondeur_max=40):
+    """
+    Déplie un profil cProfile (pstats.Stats) en arbre d'appels depuis ses racines. Les branches sous le seuil
+    (part du temps total) sont élaguées ; une fonction déjà présente sur le chemin (récursion) n'est pas
+    redépliée. Retourne la liste des LigneArbre dans l'ordre d'affichage.
+    """
+    stats.calc_callees()
+    racines = [(fonction, valeurs) for fonction, valeurs in stats.stats.items() if not valeurs[4]]
+    total = sum(valeurs[3] for _, valeurs in racines) or 1e-9
+    lignes = []
+
+    def deplier(fonction, appels, propre, cumul, profondeur, chemin):
+        lignes.append(LigneArbre(profondeur, _libelle_fonction(fonction), appels, round(cumul * 1000, 2),
+                                 round(propre * 1000, 2), round(100 * cumul / total, 1)))
+        if profondeur >= profondeur_max:
+            return
+        # Valeurs propres à l'arc appelant -> appelé : (appels, appels primitifs, temps propre, temps cumulé).
+        enfants = sorted(stats.all_callees.get(fonction, {}).items(), key=lambda arc: arc[1][3], reverse=True)
+        for enfant, (nombre, _, propre_arc, cumul_arc) in enfants:
+            if cumul_arc / total >= seuil and enfant not in chemin:
+                deplier(enfant, nombre, propre_arc, cumul_arc, profondeur + 1, chemin | {enfant})
+
+    for fonction, (_, nombre, propre, cumul, _) in sorted(racines, key=lambda racine: racine[1][3], reverse=True):
+        if cumul / total >= seuil:
+            deplier(fonction, nombre, propre, cumul, 0, {fonction})
+    return lignes
@@ -0,0 +1,168 @@
+# gestion/requetes_lentes.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils import timezone
+
+from gestion.profilage import est_requete_outillage, libelle_site, pile_appels, requetes_outillage
+
+# Journal des requêtes SQL lentes : chaque requête plus lente que REQUETES_LENTES_SEUIL_MS est ajoutée au
+# fichier REQUETES_LENTES_FICHIER (une ligne JSON par requête), avec son SQL normalisé, la forme de ses
+# paramètres et les sites d'appel du projet (méthode de formulaire, service, vue). Sur PostgreSQL, le plan
+# EXPLAIN (ANALYZE, BUFFERS) des SELECT lents est capturé, au plus une fois par requête normalisée et par
+# intervalle REQUETES_LENTES_EXPLAIN_INTERVALLE. Résumé : manage.py resumer_requetes_lentes.
+
+SEUIL_MS = getattr(settings, 'REQUETES_LENTES_SEUIL_MS', 0)
+FICHIER = Path(getattr(settings, 'REQUETES_LENTES_FICHIER', Path(settings.BASE_DIR) / 'requetes_lentes.jsonl'))
+EXPLAIN_INTERVALLE = getattr(settings, 'REQUETES_LENTES_EXPLAIN_INTERVALLE', 300)
+
+# Nombre de cadres du projet conservés par entrée (du plus profond à la vue).
+PROFONDEUR_PILE = 6
+DOSSIER_VUES = os.path.join('gestion', 'views') + os.sep
+
+_CHAINES = re.compile(r"'(?:[^']|'')*'")
+_NOMBRES = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTES = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_LISTES_REPETEES = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_ESPACES = re.compile(r'\s+')
+
+_ecriture = threading.Lock()
+_dernier_explain = {}
+
+
+def normaliser_sql(sql):
+    """
+    Forme canonique d'une requête : littéraux remplacés par '?', listes de paramètres (IN, VALUES des
+    insertions groupées) réduites à '(...)' et espaces simplifiés. Deux exécutions de la même requête avec
+    des valeurs ou des tailles de lot différentes ont ainsi la même forme.
+    """
+    sql = _CHAINES.sub('?', sql)
+    sql = _NOMBRES.sub('?', sql)
+    sql = _LISTES.sub('(...)', sql)
+    sql = _LISTES_REPETEES.sub('(...)', sql)
+    return _ESPACES.sub(' ', sql).strip()
+
+
+def empreinte(sql_normalise):
+    return hashlib.sha1(sql_normalise.encode('utf-8')).hexdigest()[:12]
+
+
+def _compresser(types):
+    """['int', 'int', 'str'] -> ['int×2', 'str']"""
+    forme = []
+    for nom in types:
+        if forme and forme[-1][0] == nom:
+            forme[-1][1] += 1
+        else:
+            forme.append([nom, 1])
+    return [nom if nombre == 1 else f"{nom}×{nombre}" for nom, nombre in forme]
+
+
+def forme_parametres(params, many=False):
+    """Types des paramètres, sans leurs valeurs (aucune donnée personnelle dans le journal)."""
+    if params is None:
+        return None
+    if many:
+        lots = list(params)
+        return {'lots': len(lots), 'forme': forme_parametres(lots[0]) if lots else None}
+    if isinstance(params, dict):
+        return {cle: type(valeur).__name__ for cle, valeur in params.items()}
+    return _compresser(type(valeur).__name__ for valeur in params)
+
+
+def _expliquer(connexion, sql, params):
+    """
+    EXPLAIN (ANALYZE, BUFFERS) dans un savepoint : un échec ne doit pas interrompre la transaction en cours.
+    Ses propres requêtes (savepoint, EXPLAIN) sont marquées comme outillage : elles ne sont ni journalisées ni
+    comptées dans les mesures de la requête HTTP (InstrumentationMiddleware) ou de son profil.
+    """
+    with requetes_outillage():
+        try:
+            with transaction.atomic(using=connexion.alias):
+                with connexion.cursor() as curseur:
+                    curseur.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+                    return '\n'.join(ligne[0] for ligne in curseur.fetchall())
+        except DatabaseError as erreur:
+            return f"EXPLAIN impossible : {erreur}"
+
+
+def _doit_expliquer(connexion, sql, many, cle):
+    if connexion.vendor != 'postgresql' or many or not EXPLAIN_INTERVALLE:
+        return False
+    # ANALYZE exécute réellement la requête : uniquement les lectures.
+    if sql.lstrip()[:6].upper() != 'SELECT':
+        return False
+    maintenant = time.monotonic()
+    if maintenant - _dernier_explain.get(cle, float('-inf')) < EXPLAIN_INTERVALLE:
+        return False
+    _dernier_explain[cle] = maintenant
+    return True
+
+
+def _ecrire(entree):
+    ligne = json.dumps(entree, ensure_ascii=False, default=str) + '\n'
+    with _ecriture:
+        FICHIER.parent.mkdir(parents=True, exist_ok=True)
+        with FICHIER.open('a', encoding='utf-8') as journal:
+            journal.write(ligne)
+
+
+def journaliser_requetes_lentes(execute, sql, params, many, context):
+    """execute_wrapper installé sur chaque connexion : chronomètre la requête et journalise si elle est lente."""
+    if est_requete_outillage():
+        return execute(sql, params, many, context)
+
+    erreur = None
+    depart = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    except Exception as exception:
+        erreur = type(exception).__name__
+        raise
+    finally:
+        duree_ms = (time.perf_counter() - depart) * 1000
+        if duree_ms >= SEUIL_MS:
+            connexion = context['connection']
+            sql_normalise = normaliser_sql(sql)
+            cle = empreinte(sql_normalise)
+            pile = pile_appels(limite=PROFONDEUR_PILE)
+            vue = next((site for site in pile if site.fichier.startswith(DOSSIER_VUES)), None)
+            entree = {
+                'horodatage': timezone.now().isoformat(timespec='milliseconds'),
+                'duree_ms': round(duree_ms, 2),
+                'base': connexion.alias,
+                'empreinte': cle,
+                'sql': sql_normalise,
+                'parametres': forme_parametres(params, many),
+                'site': libelle_site(pile[0] if pile else None),
+                'vue': libelle_site(vue) if vue else None,
+                'pile': [libelle_site(site) for site in pile],
+                'erreur': erreur,
+                'explain': None,
+            }
+            if erreur is None and _doit_expliquer(connexion, sql, many, cle):
+                entree['explain'] = _expliquer(connexion, sql, params)
+            _ecrire(entree)
+
+
+@receiver(connection_created)
+def installer_journal(sender, connection, **kwargs):
+    """
+    Ajoute le journal aux execute_wrappers de chaque nouvelle connexion (une seule fois par connexion). Il est
+    placé en tête de liste, car connection.execute_wrapper(), qui retire le dernier élément en sortie, ne doit
+    pas l'enlever si la connexion s'ouvre pendant son bloc. Django appliquant les wrappers en ordre inverse, il
+    est donc le plus extérieur : ses durées comprennent le coût des autres wrappers actifs (mesures de
+    l'instrumentation, pile d'appels du profilage), négligeable devant le seuil sauf sous profilage.
+    """
+    if SEUIL_MS and journaliser_requetes_lentes not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, journaliser_requetes_lentes)
@@ -0,0 +1 @@
+# gestion/services/__init__.py
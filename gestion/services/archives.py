@@ -0,0 +1,49 @@
+# gestion/services/archives.py
+
+from collections import namedtuple
+from datetime import date, datetime
+
+from django.db.models import Count, DateField
+from django.db.models.functions import TruncMonth
+
+from gestion.services.calendrier import debut_de_journee
+
+# Entrée de l'index mensuel : premier jour du mois et nombre de rendez-vous qu'il contient.
+MoisArchive = namedtuple('MoisArchive', ['mois', 'nombre'])
+
+FORMAT_PARAMETRE_MOIS = '%Y-%m'
+
+
+def index_par_mois(rendezvous, decroissant=True):
+    """
+    Regroupe les rendez-vous par mois (heure locale) directement en base et retourne la liste
+    des MoisArchive, du plus récent au plus ancien par défaut. Aucun rendez-vous n'est chargé.
+    """
+    ordre = '-mois' if decroissant else 'mois'
+    lignes = (
+        rendezvous.order_by()
+        .annotate(mois=TruncMonth('debut', output_field=DateField()))
+        .values('mois')
+        .annotate(nombre=Count('id'))
+        .order_by(ordre)
+    )
+    return [MoisArchive(ligne['mois'], ligne['nombre']) for ligne in lignes]
+
+
+def lire_mois(texte):
+    """Convertit un paramètre 'AAAA-MM' en premier jour du mois, ou None s'il est absent ou invalide."""
+    if not texte:
+        return None
+    try:
+        return datetime.strptime(texte, FORMAT_PARAMETRE_MOIS).date()
+    except ValueError:
+        return None
+
+
+def mois_suivant(mois):
+    return date(mois.year + (mois.month == 12), mois.month % 12 + 1, 1)
+
+
+def du_mois(rendezvous, mois):
+    """Restreint les rendez-vous à ceux qui commencent dans le mois donné (bornes indexées sur debut)."""
+    return rendezvous.filter(debut__gte=debut_de_journee(mois), debut__lt=debut_de_journee(mois_suivant(mois)))
@@ -0,0 +1,94 @@
+# gestion/services/cache_reference.py
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from gestion.models import Jour, Salon, SoinSalonDetail
+
+# Données de référence (jours de la semaine, catalogue des salons et de leurs soins) : lues à chaque page,
+# modifiées quelques fois par mois. Chaque entrée est rangée sous une clé qui contient un compteur de
+# génération ; une modification incrémente le compteur au lieu d'effacer les entrées, si bien que tous
+# les workers qui partagent le cache passent à la nouvelle version dès leur lecture suivante.
+
+DUREE = getattr(settings, 'CACHE_REFERENCE_DUREE', 24 * 60 * 60)
+PREFIXE = 'reference'
+
+GENERATION_JOURS = 'jours'
+GENERATION_CATALOGUE = 'catalogue'
+
+
+def generation_salon(salon_id):
+    return f'salon:{salon_id}'
+
+
+def _cle_generation(nom):
+    return f'{PREFIXE}:generation:{nom}'
+
+
+def _generation(nom):
+    cle = _cle_generation(nom)
+    generation = cache.get(cle)
+    if generation is None:
+        # Compteur absent (premier démarrage, cache vidé ou entrée évincée) : on repart d'une valeur
+        # horodatée, forcément différente de toutes celles déjà servies, pour ne jamais relire une
+        # entrée périmée. add() évite d'écraser le compteur qu'un autre worker vient de créer.
+        cache.add(cle, time.time_ns(), timeout=None)
+        generation = cache.get(cle)
+    return generation
+
+
+def _incrementer(nom):
+    try:
+        cache.incr(_cle_generation(nom))
+    except ValueError:
+        # Pas encore de compteur : la prochaine lecture en créera un neuf.
+        pass
+
+
+def invalider(*noms):
+    """Passe les données de référence nommées à une nouvelle génération, après validation de la transaction."""
+    def incrementer():
+        for nom in noms:
+            _incrementer(nom)
+
+    transaction.on_commit(incrementer)
+
+
+def _lire(nom, charger):
+    cle = f'{PREFIXE}:{nom}:{_generation(nom)}'
+    valeur = cache.get(cle)
+    if valeur is None:
+        valeur = charger()
+        cache.set(cle, valeur, DUREE)
+    return valeur
+
+
+def jours():
+    """Les sept Jour, triés par numéro."""
+    return _lire(GENERATION_JOURS, lambda: list(Jour.objects.order_by('numero')))
+
+
+def catalogue_salons():
+    """Tous les salons triés par nom, avec leurs SoinSalonDetail (et le Soin associé) préchargés."""
+    return _lire(GENERATION_CATALOGUE, lambda: list(Salon.objects.order_by('nom').prefetch_related(
+        Prefetch('soinsalondetail_set',
+                 queryset=SoinSalonDetail.objects.select_related('soin').order_by('soin__type_de_soin'))
+    )))
+
+
+def soins_du_salon(salon_id):
+    """Les SoinSalonDetail d'un salon (avec leur Soin), triés par type de soin."""
+    return _lire(generation_salon(salon_id), lambda: list(
+        SoinSalonDetail.objects.filter(salon_id=salon_id).select_related('soin').order_by('soin__type_de_soin')
+    ))
+
+
+def prechauffer():
+    """Charge dans le cache les données de référence les plus lues (appelé au démarrage d'un worker)."""
+    jours()
+    for salon in catalogue_salons():
+        soins_du_salon(salon.pk)
@@ -0,0 +1,142 @@
+# gestion/services/calendrier.py
+
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from gestion.models import Salon, PlageHoraire, JourSpecial, PeriodeFermeture, HoraireEffectif
+
+# Nombre de jours à venir pour lesquels les horaires effectifs sont matérialisés.
+HORIZON_JOURS = getattr(settings, 'CALENDRIER_HORIZON_JOURS', 180)
+
+# Horaires effectifs d'une date : liste triée de (heure_debut, heure_fin) et origine JourSpecial ou non.
+Journee = namedtuple('Journee', ['plages', 'jour_special'])
+
+JOURNEE_FERMEE = Journee([], False)
+
+
+def debut_de_journee(jour):
+    """Minuit (heure locale) de la date donnée, en datetime conscient du fuseau : borne des requêtes sur debut/fin."""
+    return timezone.make_aware(datetime.combine(jour, time.min))
+
+
+def _dates(date_debut, date_fin):
+    jour = date_debut
+    while jour <= date_fin:
+        yield jour
+        jour += timedelta(days=1)
+
+
+def calculer_journees(salon, date_debut, date_fin):
+    """
+    Calcule directement à partir des tables sources les horaires effectifs de chaque date de la période :
+    un JourSpecial remplace les plages régulières du jour de la semaine, une PeriodeFermeture ferme
+    les autres dates qu'elle couvre, et toute date hors de la période d'activité du salon est fermée.
+    Retourne {date: Journee}.
+    """
+    journees = {jour: JOURNEE_FERMEE for jour in _dates(date_debut, date_fin)}
+
+    if salon.date_debut_periode:
+        date_debut = max(date_debut, salon.date_debut_periode)
+    if salon.date_fin_periode:
+        date_fin = min(date_fin, salon.date_fin_periode)
+    if date_debut > date_fin:
+        return journees
+
+    plages_par_jour_semaine = defaultdict(list)
+    for numero, heure_debut, heure_fin in PlageHoraire.objects.filter(salon=salon).values_list(
+            'jour__numero', 'heure_debut', 'heure_fin'):
+        plages_par_jour_semaine[numero].append((heure_debut, heure_fin))
+
+    jours_speciaux = {
+        js.date: js for js in JourSpecial.objects.filter(
+            salon=salon, date__range=(date_debut, date_fin)
+        ).prefetch_related('plages_specifiques')
+    }
+
+    periodes_fermeture = list(PeriodeFermeture.objects.filter(salon=salon).chevauchant(
+        date_debut, date_fin).values_list('date_debut', 'date_fin'))
+
+    for jour in _dates(date_debut, date_fin):
+        jour_special = jours_speciaux.get(jour)
+        if jour_special:
+            if jour_special.est_ferme:
+                journees[jour] = Journee([], True)
+            else:
+                journees[jour] = Journee(
+                    sorted((p.heure_debut, p.heure_fin) for p in jour_special.plages_specifiques.all()), True)
+        elif any(debut <= jour <= fin for debut, fin in periodes_fermeture):
+            journees[jour] = Journee([], True)
+        else:
+            journees[jour] = Journee(sorted(plages_par_jour_semaine.get(jour.weekday(), [])), False)
+    return journees
+
+
+def journees_effectives(salon, date_debut, date_fin):
+    """
+    Retourne {date: Journee} pour la période en une seule lecture indexée de la table HoraireEffectif.
+    Les dates qui ne sont pas (encore) matérialisées, par exemple au-delà de l'horizon, sont calculées
+    à la volée à partir des tables sources.
+    """
+    journees = {}
+    for jour, heure_debut, heure_fin, jour_special in HoraireEffectif.objects.filter(
+            salon=salon, date__range=(date_debut, date_fin)
+    ).order_by('date', 'heure_debut').values_list('date', 'heure_debut', 'heure_fin', 'jour_special'):
+        journee = journees.setdefault(jour, Journee([], jour_special))
+        if heure_debut is not None:
+            journee.plages.append((heure_debut, heure_fin))
+
+    manquantes = [jour for jour in _dates(date_debut, date_fin) if jour not in journees]
+    if manquantes:
+        calculees = calculer_journees(salon, manquantes[0], manquantes[-1])
+        for jour in manquantes:
+            journees[jour] = calculees[jour]
+    return journees
+
+
+def reconstruire_calendrier(salon, date_debut=None, date_fin=None):
+    """
+    Recalcule et enregistre les horaires effectifs du salon entre deux dates, limitées à l'horizon
+    [aujourd'hui, aujourd'hui + HORIZON_JOURS]. Sans dates, tout l'horizon est reconstruit et les
+    dates passées sont purgées.
+    """
+    aujourd_hui = date.today()
+    horizon = aujourd_hui + timedelta(days=HORIZON_JOURS)
+    reconstruction_complete = date_debut is None and date_fin is None
+    date_debut = max(date_debut or aujourd_hui, aujourd_hui)
+    date_fin = min(date_fin or horizon, horizon)
+
+    lignes = []
+    if date_debut <= date_fin:
+        for jour, journee in calculer_journees(salon, date_debut, date_fin).items():
+            if journee.plages:
+                lignes.extend(
+                    HoraireEffectif(salon=salon, date=jour, heure_debut=debut, heure_fin=fin,
+                                    jour_special=journee.jour_special)
+                    for debut, fin in journee.plages
+                )
+            else:
+                lignes.append(HoraireEffectif(salon=salon, date=jour, jour_special=journee.jour_special))
+
+    with transaction.atomic():
+        if reconstruction_complete:
+            HoraireEffectif.objects.filter(salon=salon).delete()
+        else:
+            HoraireEffectif.objects.filter(salon=salon, date__range=(date_debut, date_fin)).delete()
+        HoraireEffectif.objects.bulk_create(lignes)
+
+
+def planifier_reconstruction(salon_id, date_debut=None, date_fin=None):
+    """
+    Programme la reconstruction du calendrier d'un salon à la validation de la transaction en cours,
+    pour travailler sur des données enregistrées (et ignorer un salon supprimé entre-temps).
+    """
+    def reconstruire():
+        salon = Salon.objects.filter(pk=salon_id).first()
+        if salon is not None:
+            reconstruire_calendrier(salon, date_debut, date_fin)
+
+    transaction.on_commit(reconstruire)
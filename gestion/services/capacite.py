@@ -0,0 +1,66 @@
+# gestion/services/capacite.py
+
+from bisect import bisect_left, bisect_right
+
+
+def _evenements(intervalles):
+    """
+    Transforme des intervalles [debut, fin) en événements (instant, +1/-1) triés.
+    À instant égal, les fins (-1) passent avant les débuts (+1) : deux rendez-vous
+    qui se suivent exactement ne sont pas considérés comme simultanés.
+    """
+    evenements = []
+    for debut, fin in intervalles:
+        if fin > debut:
+            evenements.append((debut, 1))
+            evenements.append((fin, -1))
+    evenements.sort()
+    return evenements
+
+
+def pic_concurrence(intervalles, debut, fin):
+    """
+    Retourne le nombre maximal d'intervalles qui se chevauchent réellement à un même instant
+    dans la fenêtre [debut, fin), par balayage des débuts et fins de rendez-vous.
+
+    Contrairement à un simple comptage des rendez-vous qui touchent la fenêtre, trois rendez-vous
+    qui se suivent ne comptent que pour une personne occupée.
+    """
+    pic = courant = 0
+    for instant, delta in _evenements(
+            (max(i_debut, debut), min(i_fin, fin)) for i_debut, i_fin in intervalles):
+        courant += delta
+        pic = max(pic, courant)
+    return pic
+
+
+def pics_concurrence(intervalles, fenetres):
+    """
+    Version groupée de pic_concurrence : calcule le pic pour chaque fenêtre (debut, fin)
+    en un seul tri des événements, y compris pour des fenêtres réparties sur plusieurs jours.
+
+    Le balayage construit d'abord le profil d'occupation en escalier (instant -> nombre de
+    rendez-vous en cours), puis chaque fenêtre y est localisée par recherche dichotomique.
+    Retourne une liste de pics dans l'ordre des fenêtres reçues.
+    """
+    instants = []
+    charges = []
+    courant = 0
+    for instant, delta in _evenements(intervalles):
+        courant += delta
+        if instants and instants[-1] == instant:
+            charges[-1] = courant
+        else:
+            instants.append(instant)
+            charges.append(courant)
+
+    pics = []
+    for debut, fin in fenetres:
+        # Charge en vigueur au début de la fenêtre, puis tous les paliers qui commencent avant sa fin.
+        premier = bisect_right(instants, debut) - 1
+        dernier = bisect_left(instants, fin)
+        pic = charges[premier] if premier >= 0 else 0
+        for index in range(premier + 1, dernier):
+            pic = max(pic, charges[index])
+        pics.append(pic)
+    return pics
@@ -0,0 +1,82 @@
+# gestion/services/disponibilites.py
+
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from gestion.models import RendezVous
+from gestion.services.calendrier import debut_de_journee, journees_effectives
+from gestion.services.capacite import pics_concurrence
+
+# Temps de battement ajouté après chaque soin avant le rendez-vous suivant.
+BATTEMENT = timedelta(minutes=10)
+
+# Intervalle entre deux heures de début proposées au client.
+PAS_PAR_DEFAUT = timedelta(minutes=15)
+
+
+def duree_totale(soin_detail):
+    """
+    Retourne la durée réellement bloquée dans l'agenda pour un soin (soin + battement).
+    """
+    return soin_detail.duree + BATTEMENT
+
+
+def calculer_creneaux_disponibles(salon, soin_detail, date_debut, date_fin, pas=PAS_PAR_DEFAUT):
+    """
+    Calcule toutes les heures de début réservables pour un soin dans un salon entre deux dates (incluses).
+
+    Toutes les données nécessaires sont chargées en un nombre fixe de requêtes, quelle que soit la longueur
+    de la période : horaires effectifs (calendrier matérialisé) et rendez-vous existants.
+    Retourne un dictionnaire {date: [heure_debut, ...]} contenant chaque date de la période.
+    """
+    creneaux = {}
+    jour = date_debut
+    while jour <= date_fin:
+        creneaux[jour] = []
+        jour += timedelta(days=1)
+
+    # La période d'activité du salon restreint les dates à examiner.
+    if salon.date_debut_periode:
+        date_debut = max(date_debut, salon.date_debut_periode)
+    if salon.date_fin_periode:
+        date_fin = min(date_fin, salon.date_fin_periode)
+    if date_debut > date_fin or salon.nombre_employes <= 0:
+        return creneaux
+
+    # Requête 1 : horaires effectifs de chaque date, lus dans le calendrier matérialisé.
+    journees = journees_effectives(salon, date_debut, date_fin)
+
+    # Requête 2 : rendez-vous non annulés du salon qui touchent la période, y compris ceux de la veille
+    # qui débordent après minuit. Les bornes sont ramenées à l'heure locale, comme les créneaux candidats.
+    rendezvous = [
+        (timezone.make_naive(debut), timezone.make_naive(fin))
+        for debut, fin in RendezVous.objects.actifs().filter(
+            salon=salon,
+            debut__lt=debut_de_journee(date_fin + timedelta(days=1)),
+            fin__gt=debut_de_journee(date_debut),
+        ).values_list('debut', 'fin')
+    ]
+
+    duree = duree_totale(soin_detail)
+    maintenant = datetime.now()
+
+    candidats = []
+    jour = date_debut
+    while jour <= date_fin:
+        for heure_debut_plage, heure_fin_plage in journees[jour].plages:
+            debut = datetime.combine(jour, heure_debut_plage)
+            limite = datetime.combine(jour, heure_fin_plage)
+            while debut + duree <= limite:
+                if debut >= maintenant:
+                    candidats.append((debut, debut + duree))
+                debut += pas
+        jour += timedelta(days=1)
+
+    # Un seul balayage des rendez-vous de la période pour tous les créneaux candidats.
+    pics = pics_concurrence(rendezvous, candidats)
+    for (debut, _), pic in zip(candidats, pics):
+        if pic < salon.nombre_employes:
+            creneaux[debut.date()].append(debut.time())
+
+    return creneaux
@@ -0,0 +1,54 @@
+# gestion/services/fermetures.py
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+
+from gestion.models import PeriodeFermeture
+from gestion.services.calendrier import planifier_reconstruction
+
+
+def ajouter_periode_fermeture(salons, date_debut, date_fin):
+    """
+    Ferme chacun des salons du date_debut au date_fin inclus, en un nombre fixe de requêtes quel que
+    soit le nombre de salons ou la longueur de la période.
+
+    Les périodes existantes qui chevauchent ou touchent l'intervalle sont fusionnées avec lui : l'opération
+    est idempotente (la rejouer ne crée ni doublon ni ligne supplémentaire) et chaque salon garde des
+    périodes disjointes. Retourne {salon_id: PeriodeFermeture enregistrée}.
+    """
+    salon_ids = {salon.pk for salon in salons}
+
+    with transaction.atomic():
+        # Une seule lecture : toutes les périodes des salons concernés qui chevauchent ou touchent l'intervalle.
+        existantes = PeriodeFermeture.objects.select_for_update().filter(salon_id__in=salon_ids).chevauchant(
+            date_debut - timedelta(days=1), date_fin + timedelta(days=1))
+        voisines = defaultdict(list)
+        for periode in existantes:
+            voisines[periode.salon_id].append(periode)
+
+        resultat = {}
+        a_supprimer = []
+        a_creer = []
+        for salon_id in salon_ids:
+            periodes = voisines[salon_id]
+            if len(periodes) == 1 and periodes[0].date_debut <= date_debut and periodes[0].date_fin >= date_fin:
+                # Déjà fermé sur tout l'intervalle : rien à écrire.
+                resultat[salon_id] = periodes[0]
+                continue
+            a_supprimer.extend(periode.pk for periode in periodes)
+            a_creer.append(PeriodeFermeture(
+                salon_id=salon_id,
+                date_debut=min([date_debut] + [periode.date_debut for periode in periodes]),
+                date_fin=max([date_fin] + [periode.date_fin for periode in periodes]),
+            ))
+
+        if a_supprimer:
+            PeriodeFermeture.objects.filter(pk__in=a_supprimer).delete()
+        for periode in PeriodeFermeture.objects.bulk_create(a_creer):
+            resultat[periode.salon_id] = periode
+            # bulk_create n'envoie pas post_save : le calendrier est recalculé explicitement.
+            planifier_reconstruction(periode.salon_id, periode.date_debut, periode.date_fin)
+
+    return resultat
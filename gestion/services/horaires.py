@@ -0,0 +1,63 @@
+# gestion/services/horaires.py
+
+from collections import namedtuple
+
+from django.db.models import Prefetch
+
+from gestion.models import Jour, PlageHoraire, JourSpecial, PlageHoraireSpeciale, PeriodeFermeture
+
+# Horaires d'un salon prêts pour l'affichage :
+# - horaires_par_jour : {nom du jour: [PlageHoraire, ...]} pour les sept jours, dans l'ordre de la semaine ;
+# - grouped_jours_speciaux : périodes de fermeture et jours spéciaux, dans l'ordre chronologique.
+HorairesSalon = namedtuple('HorairesSalon', ['horaires_par_jour', 'grouped_jours_speciaux'])
+
+
+def jours_speciaux_avec_plages(salon):
+    """Jours spéciaux du salon triés par date, avec leurs plages spécifiques préchargées (deux requêtes)."""
+    return JourSpecial.objects.filter(salon=salon).order_by('date').prefetch_related(
+        Prefetch('plages_specifiques', queryset=PlageHoraireSpeciale.objects.order_by('heure_debut'))
+    )
+
+
+def regrouper_jours_speciaux(jours_speciaux, periodes_fermeture):
+    """
+    Fusionne, dans l'ordre chronologique, les périodes de fermeture ('period_ferme') et les jours
+    spéciaux ('single_jour', avec leurs plages déjà chargées) pour les listes des templates.
+    """
+    elements = [{
+        'type': 'period_ferme',
+        'periode': periode,
+        'date_debut': periode.date_debut,
+        'date_fin': periode.date_fin,
+        'est_ferme': True,
+    } for periode in periodes_fermeture]
+    elements.extend({
+        'type': 'single_jour',
+        'jour_special': js,
+        'date_debut': js.date,
+        'est_ferme': js.est_ferme,
+        'plages_speciales': list(js.plages_specifiques.all()),
+    } for js in jours_speciaux)
+
+    # Tri stable : à date égale, la période précède l'ouverture exceptionnelle qu'elle contient.
+    elements.sort(key=lambda element: element['date_debut'])
+    return elements
+
+
+def charger_jours_speciaux(salon):
+    """Périodes de fermeture et jours spéciaux du salon, regroupés pour l'affichage (trois requêtes)."""
+    return regrouper_jours_speciaux(jours_speciaux_avec_plages(salon),
+                                    PeriodeFermeture.objects.filter(salon=salon))
+
+
+def charger_horaires_salon(salon):
+    """
+    Charge en un nombre fixe de requêtes les plages régulières, les périodes de fermeture, les jours
+    spéciaux et leurs plages spécifiques d'un salon, quel que soit le nombre de jours ou de plages.
+    """
+    horaires_par_jour = {nom: [] for _, nom in Jour.JOUR_CHOICES}
+    noms_jours = dict(Jour.JOUR_CHOICES)
+    for plage in PlageHoraire.objects.filter(salon=salon).select_related('jour').order_by('heure_debut'):
+        horaires_par_jour[noms_jours[plage.jour.numero]].append(plage)
+
+    return HorairesSalon(horaires_par_jour, charger_jours_speciaux(salon))
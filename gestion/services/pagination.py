@@ -0,0 +1,126 @@
+# gestion/services/pagination.py
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+TAILLE_PAGE_PAR_DEFAUT = 50
+
+
+class PageCurseur:
+    """
+    Page de résultats d'une pagination par clé (keyset). Les curseurs sont des chaînes opaques à
+    renvoyer dans les paramètres 'apres' / 'avant' ; ils valent None lorsqu'il n'y a pas de page
+    dans cette direction.
+    """
+
+    def __init__(self, objets, curseur_suivant, curseur_precedent):
+        self.objets = objets
+        self.curseur_suivant = curseur_suivant
+        self.curseur_precedent = curseur_precedent
+
+    def __iter__(self):
+        return iter(self.objets)
+
+    def __len__(self):
+        return len(self.objets)
+
+    def __bool__(self):
+        return bool(self.objets)
+
+
+def encoder_curseur(valeurs):
+    texte = json.dumps(valeurs, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texte.encode()).decode().rstrip('=')
+
+
+def decoder_curseur(queryset, noms, curseur):
+    """
+    Décode un curseur en valeurs Python typées selon les champs du modèle ou des annotations du queryset.
+    Lève ValueError si le curseur est illisible ou ne correspond pas aux champs attendus.
+    """
+    try:
+        valeurs = json.loads(base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as erreur:
+        raise ValueError("Curseur de pagination invalide.") from erreur
+    if not isinstance(valeurs, list) or len(valeurs) != len(noms):
+        raise ValueError("Curseur de pagination invalide.")
+
+    resultat = []
+    for nom, valeur in zip(noms, valeurs):
+        try:
+            champ = queryset.model._meta.get_field(nom)
+        except FieldDoesNotExist:
+            # Annotation (par exemple un score ou un nom en minuscules) : typée selon son champ de sortie.
+            annotation = queryset.query.annotations.get(nom)
+            if annotation is None:
+                raise ValueError("Curseur de pagination invalide.")
+            champ = annotation.output_field
+        try:
+            valeur = champ.to_python(valeur)
+        except (ValidationError, TypeError) as erreur:
+            raise ValueError("Curseur de pagination invalide.") from erreur
+        # Les champs de tri ne sont jamais nuls : None ne peut pas servir de borne de comparaison.
+        if valeur is None:
+            raise ValueError("Curseur de pagination invalide.")
+        resultat.append(valeur)
+    return resultat
+
+
+def _condition_apres(noms, valeurs, operateur):
+    """
+    Construit (a > x) OU (a = x ET b > y) OU ... : tout ce qui se trouve strictement après
+    le tuple de valeurs dans l'ordre de tri, ce qui permet un parcours d'index sans OFFSET.
+    """
+    condition = Q()
+    egalites = {}
+    for nom, valeur in zip(noms, valeurs):
+        condition |= Q(**egalites, **{f'{nom}__{operateur}': valeur})
+        egalites[nom] = valeur
+    return condition
+
+
+def paginer_par_curseur(queryset, champs, apres=None, avant=None, taille=TAILLE_PAGE_PAR_DEFAUT):
+    """
+    Pagine un queryset par clé sur les champs donnés (tous croissants, ou tous décroissants avec '-').
+    Le dernier champ doit être unique (en général 'id') pour que les curseurs soient stables.
+
+    Contrairement à OFFSET, le coût d'une page ne dépend pas de sa profondeur dans l'historique.
+    Un curseur invalide est ignoré et renvoie la première page.
+    """
+    decroissant = champs[0].startswith('-')
+    noms = [champ.lstrip('-') for champ in champs]
+
+    curseur, en_arriere = (avant, True) if avant else (apres, False)
+    valeurs = None
+    if curseur:
+        try:
+            valeurs = decoder_curseur(queryset, noms, curseur)
+        except ValueError:
+            curseur, en_arriere = None, False
+
+    # Parcourir vers l'arrière revient à inverser l'ordre de tri puis à remettre la page à l'endroit.
+    sens_decroissant = decroissant != en_arriere
+    ordre = [f'-{nom}' if sens_decroissant else nom for nom in noms]
+    if valeurs is not None:
+        queryset = queryset.filter(_condition_apres(noms, valeurs, 'lt' if sens_decroissant else 'gt'))
+
+    objets = list(queryset.order_by(*ordre)[:taille + 1])
+    encore = len(objets) > taille
+    objets = objets[:taille]
+    if en_arriere:
+        objets.reverse()
+
+    def curseur_de(objet):
+        return encoder_curseur([getattr(objet, nom) for nom in noms])
+
+    if not objets:
+        return PageCurseur([], None, None)
+    if en_arriere:
+        return PageCurseur(objets, curseur_de(objets[-1]), curseur_de(objets[0]) if encore else None)
+    return PageCurseur(objets, curseur_de(objets[-1]) if encore else None,
+                       curseur_de(objets[0]) if curseur else None)
@@ -0,0 +1,139 @@
+# gestion/services/recherche.py
+
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+from gestion.models import Utilisateur
+from gestion.normalisation import mots_normalises, normaliser_telephone, normaliser_texte
+
+# Nombre maximal de suggestions renvoyées par la recherche de bénéficiaires.
+LIMITE_SUGGESTIONS = 20
+
+# En dessous de ce nombre de caractères, la recherche ne renvoie rien (trop de correspondances).
+LONGUEUR_MINIMALE = 2
+
+# Saisie qui ne contient qu'un numéro de téléphone (chiffres et séparateurs usuels).
+_TELEPHONE = re.compile(r'^\+?[\d\s\-().\/]+$')
+
+
+def telephone_recherche(texte):
+    """Numéro E.164 si la saisie est un numéro de téléphone complet, sinon None."""
+    if not texte or not _TELEPHONE.match(texte.strip()):
+        return None
+    return normaliser_telephone(texte)
+
+
+def _prefixe(champ, texte):
+    """
+    Équivalent de « champ LIKE 'texte%' » écrit comme l'intervalle [texte, texte suivant) : contrairement
+    à LIKE, cette forme parcourt un index B-tree aussi bien sous SQLite que sous PostgreSQL.
+    """
+    borne = texte[:-1] + chr(ord(texte[-1]) + 1)
+    return Q(**{f'{champ}__gte': texte, f'{champ}__lt': borne})
+
+
+def _debuts_de_mots(mots):
+    """
+    Utilisateurs dont la colonne de recherche contient un mot commençant par chacun des mots donnés, dans
+    n'importe quel ordre : préfixes FTS5 sous SQLite, expression régulière servie par l'index pg_trgm sous
+    PostgreSQL.
+    """
+    if connection.vendor == 'sqlite':
+        return Q(id__in=RawSQL(_CORRESPONDANCES_FTS5, [' '.join(f'"{mot}"*' for mot in mots)]))
+    condition = Q()
+    for mot in mots:
+        condition &= Q(recherche__regex=rf'(^|\s){re.escape(mot)}')
+    return condition
+
+
+def suggerer_utilisateurs(texte, limite=LIMITE_SUGGESTIONS):
+    """
+    Utilisateurs actifs dont le nom, le prénom (ou un mot du nom d'utilisateur ou de l'email) commence par le
+    texte saisi, sans tenir compte des accents ni de la casse (« elo » trouve « Élodie »), triés par nom puis
+    prénom et limités à `limite` résultats. Avec plusieurs mots, « dupont ma » cherche aussi bien nom + prénom
+    que prénom + nom. Un numéro de téléphone complet, quel que soit son format, est cherché tel quel dans
+    l'index unique des numéros normalisés.
+    """
+    telephone = telephone_recherche(texte)
+    if telephone:
+        return Utilisateur.objects.filter(is_active=True, telephone_normalise=telephone).only(
+            'first_name', 'last_name', 'email')
+
+    saisie = normaliser_texte(texte)
+    mots = mots_normalises(texte)
+    if len(saisie) < LONGUEUR_MINIMALE or not mots:
+        return Utilisateur.objects.none()
+
+    # La colonne normalisée commence par « nom prénom » : un intervalle sur son index B-tree trouve le nom
+    # (ponctuation comprise, « o'br ») ; l'index plein texte trouve les autres mots (prénom, ordre inversé).
+    return (
+        Utilisateur.objects.filter(is_active=True)
+        .filter(_prefixe('recherche', saisie) | _debuts_de_mots(mots))
+        .order_by('recherche', 'id')
+        .only('first_name', 'last_name', 'email')[:limite]
+    )
+
+
+def libelle_utilisateur(utilisateur):
+    """Texte affiché pour un bénéficiaire dans le sélecteur : « Nom Prénom (email) »."""
+    return f"{utilisateur.last_name} {utilisateur.first_name} ({utilisateur.email})"
+
+
+# Recherche dans la colonne normalisée Utilisateur.recherche, avec l'index plein texte de chaque base
+# (migration 0015). Les résultats portent une annotation 'pertinence' : plus elle est grande, meilleur
+# est le résultat.
+
+_CORRESPONDANCES_FTS5 = 'SELECT rowid FROM gestion_utilisateur_fts WHERE gestion_utilisateur_fts MATCH %s'
+
+_RANG_FTS5 = (
+    '(SELECT -rank FROM gestion_utilisateur_fts '
+    'WHERE gestion_utilisateur_fts MATCH %s AND rowid = gestion_utilisateur.id)'
+)
+
+
+def _contenant_tous(mots):
+    condition = Q()
+    for mot in mots:
+        condition &= Q(recherche__contains=mot)
+    return condition
+
+
+def _rechercher_sqlite(utilisateurs, mots):
+    # Chaque mot est un préfixe obligatoire ; le classement est celui de FTS5 (bm25, négatif : on l'inverse).
+    requete = ' '.join(f'"{mot}"*' for mot in mots)
+    return utilisateurs.filter(id__in=RawSQL(_CORRESPONDANCES_FTS5, [requete])).annotate(
+        pertinence=RawSQL(_RANG_FTS5, [requete], output_field=FloatField()))
+
+
+def _rechercher_postgresql(utilisateurs, mots):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    # LIKE '%mot%' sur la colonne normalisée est servi par l'index GIN pg_trgm ; la similarité par trigrammes
+    # classe les résultats. Le Cast en double précision garde des curseurs de pagination exacts.
+    return utilisateurs.filter(_contenant_tous(mots)).annotate(
+        pertinence=Cast(TrigramWordSimilarity(' '.join(mots), 'recherche'), FloatField()))
+
+
+def rechercher_utilisateurs(utilisateurs, texte):
+    """
+    Filtre les utilisateurs sur tous les mots du texte (nom, prénom, nom d'utilisateur ou email, sans tenir
+    compte des accents ni de la casse) et les annote d'une 'pertinence'. À paginer sur ('-pertinence', '-id').
+    Un numéro de téléphone complet est une seule lecture de l'index unique des numéros normalisés.
+    """
+    telephone = telephone_recherche(texte)
+    if telephone:
+        return utilisateurs.filter(telephone_normalise=telephone).annotate(
+            pertinence=Value(1.0, output_field=FloatField()))
+
+    mots = mots_normalises(texte)
+    if not mots:
+        return utilisateurs.annotate(pertinence=Value(0.0, output_field=FloatField()))
+    if connection.vendor == 'sqlite':
+        return _rechercher_sqlite(utilisateurs, mots)
+    if connection.vendor == 'postgresql':
+        return _rechercher_postgresql(utilisateurs, mots)
+    return utilisateurs.filter(_contenant_tous(mots)).annotate(pertinence=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,101 @@
+# gestion/services/reservation.py
+
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction, IntegrityError, OperationalError
+from django.utils import timezone
+
+from gestion.models import RendezVous
+from gestion.services.validation import MESSAGE_CHEVAUCHEMENT_CLIENT, est_chevauchement_client
+
+# Nombre de tentatives lorsque la base signale un conflit passager (verrou, sérialisation).
+MAX_TENTATIVES = 3
+# Attente avant la deuxième tentative, doublée à chaque nouvel essai (en secondes).
+DELAI_TENTATIVE = 0.05
+
+# Repli pour les bases sans verrou consultatif (SQLite en développement) : un tableau fixe de verrous
+# du processus, choisi par hachage du couple (salon, date). Deux couples peuvent partager un verrou (attente
+# inutile mais sans risque) ; la mémoire ne grandit pas avec les dates réservées. SQLite sérialise de toute
+# façon les écritures entre processus (voir transaction_mode dans settings.py).
+NOMBRE_VERROUS_LOCAUX = 64
+_verrous_locaux = [threading.Lock() for _ in range(NOMBRE_VERROUS_LOCAUX)]
+
+
+def jours_couverts(rendezvous):
+    """
+    Dates occupées par le créneau [debut, fin) du rendez-vous, dans l'ordre : deux pour un rendez-vous qui
+    passe minuit, qui consomme aussi la capacité du lendemain.
+    """
+    _, fin = RendezVous.bornes(rendezvous.date, rendezvous.heure_debut, rendezvous.heure_fin)
+    dernier = (timezone.localtime(fin) - timedelta(microseconds=1)).date()
+    return [rendezvous.date + timedelta(days=decalage) for decalage in range((dernier - rendezvous.date).days + 1)]
+
+
+@contextmanager
+def _verrou_local(salon_id, jours):
+    if connection.vendor == 'postgresql':
+        yield
+        return
+    # Toujours dans le même ordre (et chaque verrou une seule fois) : deux réservations ne s'attendent
+    # jamais mutuellement.
+    indices = sorted({hash((salon_id, jour)) % NOMBRE_VERROUS_LOCAUX for jour in jours})
+    with ExitStack() as verrous:
+        for indice in indices:
+            verrous.enter_context(_verrous_locaux[indice])
+        yield
+
+
+def _verrou_base(salon_id, jours):
+    """
+    Prend, sur PostgreSQL, un verrou consultatif de transaction par couple (salon, date), dans l'ordre
+    des dates. Ils sont libérés automatiquement à la fin de la transaction et ne bloquent pas les autres
+    salons ni les autres dates du même salon.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for jour in jours:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [salon_id, jour.toordinal()])
+
+
+def enregistrer_rendezvous(form, **valeurs):
+    """
+    Enregistre le rendez-vous d'un RendezVousForm déjà valide de façon atomique : sous des verrous
+    limités au salon et aux dates du créneau, la disponibilité est vérifiée une dernière fois puis le
+    rendez-vous est inséré dans la même transaction. Deux réservations simultanées ne peuvent donc plus dépasser
+    le nombre d'employés du salon. Un chevauchement avec un autre rendez-vous du client est refusé par
+    la base elle-même et rapporté avec le message habituel.
+
+    Les valeurs nommées (salon, utilisateur...) sont affectées au rendez-vous avant l'enregistrement.
+    Retourne le rendez-vous enregistré, ou None si le créneau a été pris entre-temps ; l'erreur est
+    alors ajoutée au formulaire.
+    """
+    rendezvous = form.save(commit=False)
+    rendezvous.heure_fin = form.cleaned_data['heure_fin']
+    for champ, valeur in valeurs.items():
+        setattr(rendezvous, champ, valeur)
+
+    jours = jours_couverts(rendezvous)
+    for tentative in range(1, MAX_TENTATIVES + 1):
+        try:
+            with _verrou_local(rendezvous.salon_id, jours):
+                with transaction.atomic():
+                    _verrou_base(rendezvous.salon_id, jours)
+                    form.verifier_disponibilite()
+                    rendezvous.save()
+            return rendezvous
+        except ValidationError as erreur:
+            form.add_error(None, erreur)
+            return None
+        except IntegrityError as erreur:
+            if not est_chevauchement_client(erreur):
+                raise
+            form.add_error(None, MESSAGE_CHEVAUCHEMENT_CLIENT)
+            return None
+        except OperationalError:
+            if tentative == MAX_TENTATIVES:
+                raise
+            time.sleep(DELAI_TENTATIVE * 2 ** (tentative - 1))
@@ -0,0 +1,90 @@
+# gestion/services/validation.py
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from gestion.models import RendezVous
+from gestion.services.calendrier import journees_effectives
+from gestion.services.capacite import pic_concurrence
+
+# Toutes les règles d'un rendez-vous sont évaluées en mémoire à partir de deux lectures au plus :
+# le calendrier matérialisé du jour et les rendez-vous actifs du salon qui chevauchent le créneau.
+# Chaque fonction retourne la liste complète des erreurs (vide si tout est valide) au lieu de s'arrêter
+# à la première.
+
+# Nom sous lequel la base signale qu'un client aurait deux rendez-vous actifs qui se chevauchent
+# (contrainte d'exclusion PostgreSQL ou déclencheur SQLite, voir la migration 0012).
+CONTRAINTE_CHEVAUCHEMENT_CLIENT = 'rdv_client_chevauchement'
+
+MESSAGE_CHEVAUCHEMENT_CLIENT = (
+    "Ce client a déjà un rendez-vous qui chevauche cette plage horaire. "
+    "Veuillez choisir un autre créneau."
+)
+
+
+def est_chevauchement_client(erreur):
+    """Vrai si l'IntegrityError provient de la règle de non-chevauchement des rendez-vous d'un client."""
+    return CONTRAINTE_CHEVAUCHEMENT_CLIENT in str(erreur)
+
+
+def erreurs_disponibilite(salon, jour, heure_debut, heure_fin, exclure_pk=None):
+    """
+    Vérifie que les employés du salon sont libres sur le créneau (une requête). Utilisée seule par le
+    service de réservation, sous verrou, juste avant l'enregistrement.
+
+    La disponibilité du client n'est pas lue ici : la base refuse elle-même un chevauchement pour un
+    même client, et le service de réservation traduit ce refus en MESSAGE_CHEVAUCHEMENT_CLIENT.
+    """
+    if salon.nombre_employes <= 0:
+        return [ValidationError("Ce salon ne dispose pas d'employés enregistrés pour prendre des rendez-vous.")]
+
+    debut, fin = RendezVous.bornes(jour, heure_debut, heure_fin)
+    concurrents = RendezVous.objects.actifs().filter(salon=salon, debut__lt=fin, fin__gt=debut)
+    if exclure_pk:
+        concurrents = concurrents.exclude(pk=exclure_pk)
+
+    # On ne compte pas les rendez-vous qui touchent le créneau, mais le nombre maximal
+    # de rendez-vous réellement simultanés à l'intérieur de celui-ci.
+    nombre_employes_occupes = pic_concurrence(list(concurrents.values_list('debut', 'fin')), debut, fin)
+    if nombre_employes_occupes >= salon.nombre_employes:
+        return [ValidationError(
+            "Désolé, tous les employés sont occupés à cette heure. Veuillez choisir un autre créneau.")]
+    return []
+
+
+def erreurs_rendezvous(salon, jour, heure_debut, heure_fin, exclure_pk=None):
+    """
+    Évalue les règles d'un rendez-vous (période d'activité, date passée, heures d'ouverture, disponibilité
+    des employés) en deux requêtes et retourne toutes les erreurs trouvées.
+    """
+    erreurs = []
+    # Bornes complètes : un créneau qui déborde sur le lendemain (23:30 - 00:30) finit après toute fermeture.
+    debut, fin = RendezVous.bornes(jour, heure_debut, heure_fin)
+
+    hors_periode = False
+    if salon.date_debut_periode and jour < salon.date_debut_periode:
+        erreurs.append(ValidationError("Le salon n'est pas encore en période d'activité à cette date."))
+        hors_periode = True
+    if salon.date_fin_periode and jour > salon.date_fin_periode:
+        erreurs.append(ValidationError("Le salon ne sera plus en période d'activité à cette date."))
+        hors_periode = True
+
+    if debut < timezone.now():
+        erreurs.append(ValidationError("Le rendez-vous ne peut pas être pris dans le passé."))
+
+    # Hors période d'activité, le calendrier est fermé : l'erreur de période suffit.
+    if not hors_periode:
+        journee = journees_effectives(salon, jour, jour)[jour]
+        if journee.jour_special and not journee.plages:
+            erreurs.append(ValidationError("Le salon est entièrement fermé ce jour spécial."))
+        elif not any(
+                ouverture <= debut and fin <= fermeture
+                for ouverture, fermeture in (RendezVous.bornes(jour, *plage) for plage in journee.plages)
+        ):
+            erreurs.append(ValidationError(
+                f"Le rendez-vous ({heure_debut.strftime('%H:%M')} - {heure_fin.strftime('%H:%M')}) "
+                "n'est pas entièrement compris dans les heures d'ouverture du salon pour cette date."
+            ))
+
+    erreurs.extend(erreurs_disponibilite(salon, jour, heure_debut, heure_fin, exclure_pk))
+    return erreurs
@@ -0,0 +1,126 @@
+# gestion/signals.py
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from gestion.models import (
+    Salon, PlageHoraire, JourSpecial, PlageHoraireSpeciale, PeriodeFermeture, Jour, Soin, SoinSalonDetail
+)
+from gestion.services import cache_reference
+from gestion.services.calendrier import planifier_reconstruction
+
+
+# --- Maintien du calendrier des horaires effectifs (HoraireEffectif) ---
+
+@receiver(pre_save, sender=Salon)
+def memoriser_periode_salon(sender, instance, **kwargs):
+    """Garde la période d'activité enregistrée pour détecter sa modification après la sauvegarde."""
+    ancien = Salon.objects.filter(pk=instance.pk).values(
+        'date_debut_periode', 'date_fin_periode').first() if instance.pk else None
+    instance._periode_precedente = (
+        (ancien['date_debut_periode'], ancien['date_fin_periode']) if ancien else None
+    )
+
+
+@receiver(post_save, sender=Salon)
+def salon_enregistre(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    periode = (instance.date_debut_periode, instance.date_fin_periode)
+    if created or getattr(instance, '_periode_precedente', None) != periode:
+        planifier_reconstruction(instance.pk)
+
+
+@receiver(post_save, sender=PlageHoraire)
+@receiver(post_delete, sender=PlageHoraire)
+def plage_horaire_modifiee(sender, instance, raw=False, **kwargs):
+    # Une plage régulière concerne toutes les dates de ce jour de la semaine : tout l'horizon est recalculé.
+    if not raw:
+        planifier_reconstruction(instance.salon_id)
+
+
+@receiver(pre_save, sender=JourSpecial)
+def memoriser_date_jour_special(sender, instance, **kwargs):
+    """Garde la date enregistrée pour recalculer aussi l'ancienne date si elle change."""
+    instance._date_precedente = JourSpecial.objects.filter(pk=instance.pk).values_list(
+        'date', flat=True).first() if instance.pk else None
+
+
+@receiver(post_save, sender=JourSpecial)
+def jour_special_enregistre(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    planifier_reconstruction(instance.salon_id, instance.date, instance.date)
+    date_precedente = getattr(instance, '_date_precedente', None)
+    if date_precedente and date_precedente != instance.date:
+        planifier_reconstruction(instance.salon_id, date_precedente, date_precedente)
+
+
+@receiver(post_delete, sender=JourSpecial)
+def jour_special_supprime(sender, instance, **kwargs):
+    planifier_reconstruction(instance.salon_id, instance.date, instance.date)
+
+
+@receiver(post_save, sender=PlageHoraireSpeciale)
+@receiver(post_delete, sender=PlageHoraireSpeciale)
+def plage_horaire_speciale_modifiee(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    jour_special = JourSpecial.objects.filter(pk=instance.jour_special_id).values('salon_id', 'date').first()
+    # Lors d'une suppression en cascade, le JourSpecial parent s'en charge lui-même.
+    if jour_special:
+        planifier_reconstruction(jour_special['salon_id'], jour_special['date'], jour_special['date'])
+
+
+@receiver(pre_save, sender=PeriodeFermeture)
+def memoriser_dates_periode_fermeture(sender, instance, **kwargs):
+    """Garde les dates enregistrées pour recalculer aussi l'ancien intervalle s'il change."""
+    instance._dates_precedentes = PeriodeFermeture.objects.filter(pk=instance.pk).values_list(
+        'date_debut', 'date_fin').first() if instance.pk else None
+
+
+@receiver(post_save, sender=PeriodeFermeture)
+def periode_fermeture_enregistree(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    planifier_reconstruction(instance.salon_id, instance.date_debut, instance.date_fin)
+    dates_precedentes = getattr(instance, '_dates_precedentes', None)
+    if dates_precedentes and dates_precedentes != (instance.date_debut, instance.date_fin):
+        planifier_reconstruction(instance.salon_id, *dates_precedentes)
+
+
+@receiver(post_delete, sender=PeriodeFermeture)
+def periode_fermeture_supprimee(sender, instance, **kwargs):
+    planifier_reconstruction(instance.salon_id, instance.date_debut, instance.date_fin)
+
+
+# --- Invalidation du cache des données de référence (gestion/services/cache_reference.py) ---
+
+@receiver(post_save, sender=Jour)
+@receiver(post_delete, sender=Jour)
+def jour_modifie(sender, instance, **kwargs):
+    cache_reference.invalider(cache_reference.GENERATION_JOURS)
+
+
+@receiver(post_save, sender=Salon)
+@receiver(post_delete, sender=Salon)
+def salon_modifie(sender, instance, **kwargs):
+    cache_reference.invalider(cache_reference.GENERATION_CATALOGUE, cache_reference.generation_salon(instance.pk))
+
+
+@receiver(post_save, sender=SoinSalonDetail)
+@receiver(post_delete, sender=SoinSalonDetail)
+def soin_salon_detail_modifie(sender, instance, **kwargs):
+    cache_reference.invalider(cache_reference.GENERATION_CATALOGUE,
+                              cache_reference.generation_salon(instance.salon_id))
+
+
+@receiver(post_save, sender=Soin)
+def soin_modifie(sender, instance, created, **kwargs):
+    # Le nom du soin apparaît dans le catalogue de chaque salon qui le propose. Un soin supprimé
+    # entraîne la suppression de ses SoinSalonDetail, qui invalident eux-mêmes leurs salons.
+    if created:
+        return
+    salon_ids = SoinSalonDetail.objects.filter(soin=instance).values_list('salon_id', flat=True)
+    cache_reference.invalider(cache_reference.GENERATION_CATALOGUE,
+                              *(cache_reference.generation_salon(salon_id) for salon_id in salon_ids))
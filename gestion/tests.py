@@ -0,0 +1,449 @@
+# gestion/tests.py
+
+import threading
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from gestion.forms.rendezvous_forms import RendezVousForm
+from gestion.middleware import MesureRequete
+from gestion.models import Utilisateur, Salon, Soin, SoinSalonDetail, Jour, PlageHoraire, PeriodeFermeture, RendezVous
+from gestion.profilage import RequetesParSiteAppel, requetes_outillage
+from gestion.services.calendrier import journees_effectives
+from gestion.services.capacite import pic_concurrence, pics_concurrence
+from gestion.services.fermetures import ajouter_periode_fermeture
+from gestion.services.pagination import encoder_curseur
+from gestion.services.recherche import suggerer_utilisateurs
+from gestion.services.reservation import enregistrer_rendezvous, jours_couverts
+from gestion.services.validation import erreurs_disponibilite
+
+
+def creer_jours():
+    for numero, nom in Jour.JOUR_CHOICES:
+        Jour.objects.get_or_create(numero=numero, defaults={'nom': nom})
+
+
+def creer_salon(nombre_employes=2, plages=((time(9), time(18)),), nom="Salon de test"):
+    """Salon ouvert tous les jours sur les plages données, avec un soin de 50 minutes."""
+    creer_jours()
+    salon = Salon.objects.create(nom=nom, nombre_employes=nombre_employes)
+    for jour in Jour.objects.all():
+        for heure_debut, heure_fin in plages:
+            PlageHoraire.objects.create(salon=salon, jour=jour, heure_debut=heure_debut, heure_fin=heure_fin)
+    soin = Soin.objects.create(type_de_soin=f"Soin {nom}")
+    soin_detail = SoinSalonDetail.objects.create(soin=soin, salon=salon, prix=50, duree=timedelta(minutes=50))
+    return salon, soin_detail
+
+
+def creer_client(numero, **champs):
+    return Utilisateur.objects.create_user(
+        username=f"client-{numero}", email=f"client-{numero}@exemple.be", password='mdp', role='client',
+        first_name=champs.pop('first_name', 'Client'), last_name=champs.pop('last_name', f"Test {numero}"),
+        **champs)
+
+
+def creer_rendezvous(client, salon, soin_detail, jour, heure_debut=time(10), statut='prévu'):
+    heure_fin = (datetime.combine(jour, heure_debut) + soin_detail.duree).time()
+    return RendezVous.objects.create(utilisateur=client, salon=salon, soin_detail=soin_detail, date=jour,
+                                     heure_debut=heure_debut, heure_fin=heure_fin, statut=statut)
+
+
+def creer_professionnel():
+    return Utilisateur.objects.create_user(username='pro', email='pro@exemple.be', password='mdp',
+                                           role='professionnel', is_staff=True)
+
+
+class ReservationsConcurrentesTests(TransactionTestCase):
+    """
+    De nombreux threads réservent simultanément le même créneau : le verrou (salon, date) de
+    enregistrer_rendezvous ne doit jamais laisser passer plus de rendez-vous que d'employés. Sous PostgreSQL,
+    c'est le verrou consultatif qui est éprouvé ; sous SQLite, le repli (verrou du processus et transactions
+    IMMEDIATE).
+    """
+
+    NOMBRE_THREADS = 30
+    NOMBRE_EMPLOYES = 3
+
+    def test_aucun_surbooking(self):
+        salon, soin_detail = creer_salon(nombre_employes=self.NOMBRE_EMPLOYES)
+        clients = [creer_client(numero) for numero in range(self.NOMBRE_THREADS)]
+        jour = date.today() + timedelta(days=1)
+        depart = threading.Barrier(self.NOMBRE_THREADS)
+        resultats = []
+
+        def reserver(client):
+            try:
+                form = RendezVousForm(
+                    {'utilisateur': client.pk, 'soin_detail': soin_detail.pk, 'date': jour.isoformat(),
+                     'heure_debut': '10:00', 'statut': 'prévu'},
+                    salon=salon, user=client, for_self_appointment=True,
+                )
+                valide = form.is_valid()
+                # Tous les threads ont validé le formulaire avant que le premier n'enregistre.
+                depart.wait()
+                resultats.append(bool(valide and enregistrer_rendezvous(form, utilisateur=client, salon=salon)))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reserver, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        enregistres = RendezVous.objects.filter(salon=salon).count()
+        self.assertEqual(enregistres, self.NOMBRE_EMPLOYES)
+        self.assertEqual(sum(resultats), enregistres)
+
+
+def a(heure, minute=0, jour=1):
+    """Instant de référence : a(10, 30) est le 1er janvier 2030 à 10:30."""
+    return datetime(2030, 1, jour, heure, minute)
+
+
+class CapaciteTests(SimpleTestCase):
+    """Pic de rendez-vous réellement simultanés, par balayage des débuts et fins."""
+
+    # Trois rendez-vous courts qui se suivent : une seule personne occupée à la fois.
+    A_LA_SUITE = [(a(10), a(10, 30)), (a(10, 30), a(11)), (a(11), a(11, 30))]
+
+    def test_rendezvous_a_la_suite(self):
+        self.assertEqual(pic_concurrence(self.A_LA_SUITE, a(10), a(11, 30)), 1)
+
+    def test_chevauchement_reel(self):
+        intervalles = self.A_LA_SUITE + [(a(10, 15), a(10, 45))]
+        self.assertEqual(pic_concurrence(intervalles, a(10), a(11, 30)), 2)
+
+    def test_hors_fenetre(self):
+        # Le rendez-vous qui finit quand la fenêtre commence ne compte pas.
+        self.assertEqual(pic_concurrence([(a(9), a(10))], a(10), a(11)), 0)
+        self.assertEqual(pic_concurrence([(a(9), a(10, 1))], a(10), a(11)), 1)
+
+    def test_pics_groupes(self):
+        intervalles = self.A_LA_SUITE + [(a(10, 15), a(10, 45)), (a(10), a(11))]
+        fenetres = [
+            (a(10), a(11, 30)),                    # 10:15 - 10:45 : trois rendez-vous en cours
+            (a(10, 30), a(10, 45)),                # une fin et un début à 10:30 : toujours trois, pas quatre
+            (a(10, 45), a(11, 30)),                # deux en cours au début de la fenêtre
+            (a(11), a(11, 30)),                    # débute sur deux fins et un début
+            (a(11, 30), a(12)),                    # débute sur la dernière fin
+            (a(9), a(10)),                         # finit sur les premiers débuts
+            (a(10, jour=2), a(11, 30, jour=2)),    # autre jour
+        ]
+        self.assertEqual(pics_concurrence(intervalles, fenetres), [3, 3, 2, 1, 0, 0, 0])
+        self.assertEqual(pics_concurrence(intervalles, fenetres),
+                         [pic_concurrence(intervalles, debut, fin) for debut, fin in fenetres])
+
+    def test_pics_sans_rendezvous(self):
+        self.assertEqual(pics_concurrence([], [(a(10), a(11))]), [0])
+
+
+class CapaciteSalonTests(TestCase):
+    """Un salon de deux employés accepte un long soin à côté de trois rendez-vous courts qui se suivent."""
+
+    def test_long_creneau_disponible(self):
+        salon, soin_detail = creer_salon(nombre_employes=2)
+        jour = date.today() + timedelta(days=1)
+        # 10:00 - 10:50, 11:00 - 11:50, 12:00 - 12:50 : un seul employé occupé à tout instant.
+        for numero, heure_debut in enumerate((time(10), time(11), time(12))):
+            creer_rendezvous(creer_client(numero), salon, soin_detail, jour, heure_debut)
+        self.assertEqual(erreurs_disponibilite(salon, jour, time(10), time(13)), [])
+        # Un quatrième rendez-vous à 11:30 occupe le second employé.
+        creer_rendezvous(creer_client(3), salon, soin_detail, jour, time(11, 30))
+        self.assertEqual(len(erreurs_disponibilite(salon, jour, time(10), time(13))), 1)
+
+class PeriodesFermetureTests(TestCase):
+    """ajouter_periode_fermeture est idempotente et garde des périodes disjointes pour chaque salon."""
+
+    def setUp(self):
+        self.salon, _ = creer_salon()
+        self.autre_salon, _ = creer_salon(nom="Autre salon")
+        self.debut = date.today() + timedelta(days=10)
+
+    def jour(self, decalage):
+        return self.debut + timedelta(days=decalage)
+
+    def periodes(self, salon):
+        return list(PeriodeFermeture.objects.filter(salon=salon).values_list('date_debut', 'date_fin'))
+
+    def test_idempotente(self):
+        periode = ajouter_periode_fermeture([self.salon], self.jour(0), self.jour(6))[self.salon.pk]
+        # Rejouée ou incluse dans la période existante : la même ligne est renvoyée, rien n'est réécrit.
+        for debut, fin in ((0, 6), (2, 4)):
+            resultat = ajouter_periode_fermeture([self.salon], self.jour(debut), self.jour(fin))
+            self.assertEqual(resultat[self.salon.pk].pk, periode.pk)
+        self.assertEqual(self.periodes(self.salon), [(self.jour(0), self.jour(6))])
+
+    def test_fusion_chevauchement_et_contiguite(self):
+        ajouter_periode_fermeture([self.salon], self.jour(0), self.jour(3))
+        ajouter_periode_fermeture([self.salon], self.jour(10), self.jour(12))
+        # Chevauche la première période et touche la seconde (jour 9 puis jour 10) : une seule période.
+        ajouter_periode_fermeture([self.salon], self.jour(2), self.jour(9))
+        self.assertEqual(self.periodes(self.salon), [(self.jour(0), self.jour(12))])
+
+    def test_periodes_disjointes_conservees(self):
+        ajouter_periode_fermeture([self.salon], self.jour(0), self.jour(3))
+        ajouter_periode_fermeture([self.salon], self.jour(5), self.jour(6))
+        self.assertEqual(self.periodes(self.salon), [(self.jour(0), self.jour(3)), (self.jour(5), self.jour(6))])
+
+    def test_plusieurs_salons(self):
+        ajouter_periode_fermeture([self.autre_salon], self.jour(4), self.jour(8))
+        with self.captureOnCommitCallbacks(execute=True):
+            resultat = ajouter_periode_fermeture([self.salon, self.autre_salon], self.jour(0), self.jour(5))
+        self.assertEqual(set(resultat), {self.salon.pk, self.autre_salon.pk})
+        self.assertEqual(self.periodes(self.salon), [(self.jour(0), self.jour(5))])
+        self.assertEqual(self.periodes(self.autre_salon), [(self.jour(0), self.jour(8))])
+        # Le calendrier des deux salons est recalculé : aucune plage d'ouverture pendant la fermeture.
+        for salon in (self.salon, self.autre_salon):
+            journees = journees_effectives(salon, self.jour(0), self.jour(5))
+            self.assertTrue(all(not journees[self.jour(decalage)].plages for decalage in range(6)))
+            self.assertTrue(journees_effectives(salon, self.jour(9), self.jour(9))[self.jour(9)].plages)
+
+
+class HeuresOuvertureTests(TestCase):
+    """Le créneau complet (fin éventuellement au lendemain) doit tenir dans une plage d'ouverture du jour."""
+
+    def setUp(self):
+        self.salon, self.soin_detail = creer_salon(plages=((time(10), time(14)), (time(15), time(19))))
+        self.client_rv = creer_client(1)
+        self.jour = date.today() + timedelta(days=1)
+
+    def formulaire(self, heure_debut):
+        return RendezVousForm(
+            {'utilisateur': self.client_rv.pk, 'soin_detail': self.soin_detail.pk, 'date': self.jour.isoformat(),
+             'heure_debut': heure_debut, 'statut': 'prévu'},
+            salon=self.salon, user=self.client_rv, for_self_appointment=True,
+        )
+
+    def test_creneau_dans_une_plage(self):
+        self.assertTrue(self.formulaire('15:00').is_valid())
+
+    def test_creneau_apres_fermeture(self):
+        self.assertFalse(self.formulaire('18:30').is_valid())
+
+    def test_creneau_passant_minuit(self):
+        # 23:30 + 50 min de soin + battement finit à 00:30 : les heures seules (23:30 >= 15:00, 00:30 <= 19:00)
+        # laissaient passer ce créneau.
+        form = self.formulaire('23:30')
+        self.assertFalse(form.is_valid())
+        self.assertIn("heures d'ouverture", ' '.join(form.non_field_errors()))
+        self.assertFalse(RendezVous.objects.exists())
+
+
+class CoordonneesEnDoubleTests(TestCase):
+    """
+    Un compte dont l'email ou le téléphone normalisé a été laissé à NULL par la migration 0016 (doublon d'un
+    compte plus ancien) peut toujours être enregistré : désactivé, ou son mot de passe changé.
+    """
+
+    def setUp(self):
+        self.ancien = creer_client(1, telephone='0471 23 45 67')
+        self.doublon = creer_client(2)
+        # État laissé par la migration : même adresse à la casse près, même numéro écrit autrement.
+        Utilisateur.objects.filter(pk=self.doublon.pk).update(
+            email='CLIENT-1@exemple.be', email_normalise=None, telephone='+32 471 23 45 67', telephone_normalise=None)
+        self.client.force_login(creer_professionnel())
+
+    def verifier_coordonnees(self):
+        self.doublon.refresh_from_db()
+        self.ancien.refresh_from_db()
+        self.assertIsNone(self.doublon.email_normalise)
+        self.assertIsNone(self.doublon.telephone_normalise)
+        self.assertEqual(self.ancien.email_normalise, 'client-1@exemple.be')
+        self.assertEqual(self.ancien.telephone_normalise, '+32471234567')
+
+    def test_desactivation(self):
+        response = self.client.post(reverse('utilisateur_toggle_active', kwargs={'pk': self.doublon.pk}))
+        self.assertRedirects(response, reverse('utilisateur_list'), fetch_redirect_response=False)
+        self.assertFalse(Utilisateur.objects.get(pk=self.doublon.pk).is_active)
+        self.verifier_coordonnees()
+
+    def test_nouveau_mot_de_passe(self):
+        response = self.client.post(reverse('utilisateur_set_password', kwargs={'pk': self.doublon.pk}),
+                                    {'new_password1': 'Nouveau-mdp-2030', 'new_password2': 'Nouveau-mdp-2030'})
+        self.assertEqual(response.status_code, 302)
+        self.verifier_coordonnees()
+        self.assertTrue(Utilisateur.objects.get(pk=self.doublon.pk).check_password('Nouveau-mdp-2030'))
+
+    def test_doublon_corrige(self):
+        # Une fois l'adresse corrigée, la valeur normalisée est de nouveau enregistrée.
+        self.doublon.refresh_from_db()
+        self.doublon.email = 'autre@exemple.be'
+        self.doublon.save()
+        self.doublon.refresh_from_db()
+        self.assertEqual(self.doublon.email_normalise, 'autre@exemple.be')
+
+
+class SuggestionsTests(TestCase):
+    """Les suggestions de bénéficiaires ignorent accents et casse, sur le nom comme sur le prénom."""
+
+    def setUp(self):
+        self.elodie = creer_client(1, first_name='Élodie', last_name='Dupont')
+        creer_client(2, first_name='Mélodie', last_name='Martin')
+
+    def suggestions(self, texte):
+        return list(suggerer_utilisateurs(texte))
+
+    def test_initiale_accentuee(self):
+        for texte in ('Élo', 'élo', 'elo', 'ELO'):
+            with self.subTest(texte=texte):
+                self.assertEqual(self.suggestions(texte), [self.elodie])
+
+    def test_nom_et_prenom(self):
+        for texte in ('dup', 'Dupont élo', 'élodie dup'):
+            with self.subTest(texte=texte):
+                self.assertEqual(self.suggestions(texte), [self.elodie])
+
+
+class JoursCouvertsTests(SimpleTestCase):
+    """Un rendez-vous qui passe minuit verrouille aussi le lendemain, dont il consomme la capacité."""
+
+    def jours(self, heure_debut, heure_fin):
+        jour = date(2030, 1, 1)
+        return jours_couverts(RendezVous(date=jour, heure_debut=heure_debut, heure_fin=heure_fin))
+
+    def test_meme_jour(self):
+        self.assertEqual(self.jours(time(10), time(11)), [date(2030, 1, 1)])
+        # Fin exactement à minuit : le lendemain n'est pas entamé.
+        self.assertEqual(self.jours(time(23), time(0)), [date(2030, 1, 1)])
+
+    def test_passage_minuit(self):
+        self.assertEqual(self.jours(time(23, 30), time(0, 30)), [date(2030, 1, 1), date(2030, 1, 2)])
+
+
+class CurseurInvalideTests(TestCase):
+    """Un curseur illisible ou mal typé, y compris sur une annotation, renvoie la première page."""
+
+    def setUp(self):
+        self.martin = creer_client(1, first_name='Paul', last_name='Martin')
+        self.client.force_login(creer_professionnel())
+
+    def afficher(self, **parametres):
+        response = self.client.get(reverse('utilisateur_list'), parametres)
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['page'])
+
+    def test_curseurs_invalides(self):
+        for curseur in (encoder_curseur(['abc', 1]), encoder_curseur([None, 1]), encoder_curseur([[1], 1]),
+                        encoder_curseur([0.5]), 'pas-un-curseur'):
+            with self.subTest(curseur=curseur):
+                self.assertEqual(self.afficher(q='martin', apres=curseur), [self.martin])
+                self.assertEqual(self.afficher(q='martin', avant=curseur), [self.martin])
+        self.assertEqual(self.afficher(apres=encoder_curseur(['a', {}, 'x'])), self.afficher())
+
+
+class RendezVousTousFenetreTests(TestCase):
+    """La fenêtre par défaut de rendezvous_tous s'applique aussi quand l'URL porte d'autres paramètres."""
+
+    def setUp(self):
+        self.salon, self.soin_detail = creer_salon()
+        client = creer_client(1)
+        self.proche = creer_rendezvous(client, self.salon, self.soin_detail, date.today() + timedelta(days=1))
+        self.lointain = creer_rendezvous(client, self.salon, self.soin_detail, date.today() + timedelta(days=90))
+        self.client.force_login(creer_professionnel())
+
+    def afficher(self, **parametres):
+        response = self.client.get(reverse('rendezvous_tous'), parametres)
+        self.assertEqual(response.status_code, 200)
+        return [rendezvous.pk for rendezvous in response.context['rendezvous_list']]
+
+    def test_fenetre_par_defaut(self):
+        self.assertEqual(self.afficher(), [self.proche.pk])
+
+    def test_fenetre_conservee_avec_parametres(self):
+        # Formulaire lié (filtre de salon, lien de pagination) sans du/au : même fenêtre.
+        self.assertEqual(self.afficher(salon=self.salon.pk), [self.proche.pk])
+        self.assertEqual(self.afficher(apres=''), [self.proche.pk])
+
+    def test_fenetre_elargie_explicitement(self):
+        au = (date.today() + timedelta(days=120)).isoformat()
+        self.assertEqual(self.afficher(au=au), [self.proche.pk, self.lointain.pk])
+
+
+class NombreDeRequetesTests(TestCase):
+    """
+    Les listes de rendez-vous chargent client, salon et soin avec les rendez-vous : le nombre de requêtes
+    est le même pour quelques lignes et pour beaucoup. Une requête par ligne (N+1) fait échouer ces tests.
+    """
+
+    PEU = 2
+    BEAUCOUP = 25
+
+    def setUp(self):
+        # Le cache de référence survit d'un test à l'autre : on repart toujours d'un cache vide.
+        cache.clear()
+        self.salon, self.soin_detail = creer_salon(nombre_employes=self.BEAUCOUP)
+        self.professionnel = creer_professionnel()
+        self.moi = creer_client('moi')
+
+    def peupler(self, nombre):
+        aujourd_hui = date.today()
+        for numero in range(nombre):
+            autre = creer_client(numero)
+            # Aujourd'hui (agenda du mois de detail_salon), demain (fenêtre de rendezvous_tous) et avant-hier
+            # (archives), plus un rendez-vous passé et un à venir pour le client connecté.
+            creer_rendezvous(autre, self.salon, self.soin_detail, aujourd_hui)
+            creer_rendezvous(autre, self.salon, self.soin_detail, aujourd_hui + timedelta(days=1))
+            creer_rendezvous(autre, self.salon, self.soin_detail, aujourd_hui - timedelta(days=2), statut='terminé')
+            creer_rendezvous(self.moi, self.salon, self.soin_detail, aujourd_hui + timedelta(days=numero + 1))
+            creer_rendezvous(self.moi, self.salon, self.soin_detail, aujourd_hui - timedelta(days=numero + 1))
+
+    def verifier(self, nombre_requetes, utilisateur, nom_url, **kwargs):
+        url = reverse(nom_url, kwargs=kwargs)
+        self.client.force_login(utilisateur)
+        for nombre in (self.PEU, self.BEAUCOUP - self.PEU):
+            self.peupler(nombre)
+            cache.clear()
+            with self.subTest(lignes=RendezVous.objects.count()), self.assertNumQueries(nombre_requetes):
+                self.assertEqual(self.client.get(url).status_code, 200)
+            RendezVous.objects.all().delete()
+            Utilisateur.objects.filter(username__startswith='client-').exclude(pk=self.moi.pk).delete()
+
+    def test_mes_rendezvous(self):
+        self.verifier(4, self.moi, 'mes_rendezvous')
+
+    def test_rendezvous_tous(self):
+        self.verifier(5, self.professionnel, 'rendezvous_tous')
+
+    def test_detail_salon(self):
+        self.verifier(8, self.professionnel, 'detail_salon', pk=self.salon.pk)
+
+    def test_anciens_rendezvous(self):
+        self.verifier(5, self.professionnel, 'anciens_rendezvous', pk=self.salon.pk)
+
+
+class ServerTimingTests(TestCase):
+    """L'en-tête Server-Timing est réservé au personnel (ou à DEBUG) ; la mesure est journalisée pour tous."""
+
+    def afficher(self):
+        with self.assertLogs('gestion.instrumentation', 'INFO') as journal:
+            response = self.client.get(reverse('login'))
+        self.assertEqual(len(journal.records), 1)
+        return response
+
+    def test_anonyme(self):
+        self.assertNotIn('Server-Timing', self.afficher())
+
+    def test_personnel(self):
+        self.client.force_login(creer_professionnel())
+        self.assertIn('sql;dur=', self.afficher()['Server-Timing'])
+
+    @override_settings(DEBUG=True)
+    def test_debug(self):
+        self.assertIn('Server-Timing', self.afficher())
+
+
+class RequetesOutillageTests(TestCase):
+    """Les requêtes de l'outillage (EXPLAIN des requêtes lentes) ne faussent pas les mesures de la requête HTTP."""
+
+    def test_requetes_exclues(self):
+        mesure, profil = MesureRequete(), RequetesParSiteAppel()
+        with connection.execute_wrapper(mesure), connection.execute_wrapper(profil):
+            Utilisateur.objects.count()
+            with requetes_outillage():
+                Utilisateur.objects.count()
+        self.assertEqual(mesure.requetes, 1)
+        self.assertEqual(sum(groupe.nombre for groupe in profil.groupes()), 1)
@@ -18,6 +18,7 @@ urlpatterns = [
 
     # Routes utilisateurs (utilisateur_views.py)
     path('utilisateurs/', utilisateur_views.utilisateur_list, name='utilisateur_list'),
+    path('utilisateurs/recherche/', utilisateur_views.utilisateur_recherche, name='utilisateur_recherche'),
     path('utilisateurs/create/', utilisateur_views.utilisateur_create, name='utilisateur_create'),
     path('utilisateurs/<int:pk>/update/', utilisateur_views.utilisateur_update, name='utilisateur_update'),
     path('utilisateurs/<int:pk>/delete/', utilisateur_views.utilisateur_delete, name='utilisateur_delete'),
@@ -42,6 +43,7 @@ urlpatterns = [
     path('salons/', salon_views.liste_salons, name='liste_salons'),
     path('salons/<int:pk>/', salon_views.detail_salon, name='detail_salon'),
     path('salons/<int:pk>/rendezvous-anciens/', salon_views.anciens_rendezvous, name='anciens_rendezvous'),
+    path('salons/<int:pk>/rendezvous-futurs/', salon_views.rendezvous_futurs_mois, name='rendezvous_futurs_mois'),
     path('salons/<int:pk>/modifier/', salon_views.modifier_salon, name='modifier_salon'),
     path('salons/<int:pk>/supprimer/', salon_views.supprimer_salon, name='supprimer_salon'),
     path('salons/ajouter/', salon_views.ajouter_salon, name='ajouter_salon'),
@@ -95,4 +97,6 @@ urlpatterns = [
          name='choisir_salon_pour_rendezvous'),
     path('rendezvous/prendre/salon/<int:salon_id>/', rendezvous.prendre_rendezvous_personnel,
          name='prendre_rendezvous_personnel'),
+    path('rendezvous/prendre/salon/<int:salon_id>/disponibilites/', rendezvous.disponibilites_salon,
+         name='disponibilites_salon'),
 ]
@@ -2,11 +2,13 @@
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from gestion.models import Salon, PlageHoraire, JourSpecial, PlageHoraireSpeciale
+from gestion.models import Salon, PlageHoraire, JourSpecial, PlageHoraireSpeciale, PeriodeFermeture
 from gestion.forms.horaire_forms import PlageHoraireForm, JourSpecialForm, PlageHoraireSpecialeForm, PeriodeVacancesForm
 from django.contrib.auth.decorators import login_required
 from gestion.decorateurs import professionnel_required
-from datetime import date, timedelta
+from gestion.services.fermetures import ajouter_periode_fermeture
+from gestion.services.horaires import charger_jours_speciaux
+from datetime import date
 
 
 # --- Vues pour les Plages Horaires régulières ---
@@ -95,48 +97,8 @@ def supprimer_plage_horaire(request, salon_pk, plage_pk):  # pk du salon et pk d
 @professionnel_required
 def liste_jours_speciaux(request, pk):
     salon = get_object_or_404(Salon, pk=pk)
-    # Récupère tous les jours spéciaux, triés par date
-    all_jours_speciaux = JourSpecial.objects.filter(salon=salon).order_by('date')
-
-    grouped_jours_speciaux = []
-    current_period = None
-
-    for js in all_jours_speciaux:
-        # Si le jour spécial est une fermeture complète
-        if js.est_ferme:
-            if (current_period and current_period['type'] == 'period_ferme' and js.date == current_period['date_fin'] +
-                    timedelta(days=1)):
-                # Prolonge la période actuelle si le jour est consécutif et est aussi une fermeture
-                current_period['date_fin'] = js.date
-                current_period['ids'].append(js.id)
-            else:
-                # Commence une nouvelle période de fermeture
-                if current_period:  # Ajoute la période précédente si elle existait
-                    grouped_jours_speciaux.append(current_period)
-                current_period = {
-                    'type': 'period_ferme',
-                    'date_debut': js.date,
-                    'date_fin': js.date,
-                    'est_ferme': True,
-                    'ids': [js.id]  # Garde une liste des IDs des jours spéciaux individuels qui composent la période
-                }
-        else:
-            # Si le jour spécial n'est pas une fermeture complète
-            if current_period:  # Ajoute la période précédente si elle existait
-                grouped_jours_speciaux.append(current_period)
-            # Ajoute ce jour non-fermé comme un élément individuel
-            grouped_jours_speciaux.append({
-                'type': 'single_jour',
-                'jour_special': js,
-                'est_ferme': False,
-                # C'est la ligne suivante qui est corrigée :
-                'plages_speciales': list(js.plages_specifiques.all())  # <-- CORRIGÉ ICI !
-            })
-            current_period = None  # Réinitialise la période actuelle
-
-    # Ajoute la dernière période si elle existe
-    if current_period:
-        grouped_jours_speciaux.append(current_period)
+    # Périodes de fermeture et jours spéciaux (avec leurs plages préchargées), triés par date
+    grouped_jours_speciaux = charger_jours_speciaux(salon)
 
     context = {
         'nom_entreprise': 'Saint Jolie',
@@ -301,30 +263,22 @@ def supprimer_plage_horaire_speciale(request, salon_pk, jour_special_pk, plage_s
 def ajouter_periode_vacances(request, pk):
     salon = get_object_or_404(Salon, pk=pk)
     if request.method == 'POST':
-        form = PeriodeVacancesForm(request.POST)  # Utilise le nouveau formulaire
+        form = PeriodeVacancesForm(request.POST, salon=salon)  # Utilise le nouveau formulaire
         if form.is_valid():
             date_debut = form.cleaned_data['date_debut']
             date_fin = form.cleaned_data['date_fin']
+            salons = [salon, *form.cleaned_data['salons']]
+
+            # Une seule ligne par salon pour toute la période, fusionnée avec les fermetures qu'elle touche.
+            # Les jours spéciaux déjà définis dans l'intervalle restent prioritaires sur la fermeture.
+            ajouter_periode_fermeture(salons, date_debut, date_fin)
 
-            current_date = date_debut
-            count_added = 0
-
-            while current_date <= date_fin:
-                # Vérifier si un JourSpecial existe déjà pour cette date et ce salon
-                # afin d'éviter les doublons et de ne pas écraser une configuration existante.
-                if not JourSpecial.objects.filter(salon=salon, date=current_date).exists():
-                    JourSpecial.objects.create(
-                        salon=salon,
-                        date=current_date,
-                        est_ferme=True  # Toujours fermé pour ce type de période
-                    )
-                    count_added += 1
-                current_date += timedelta(days=1)
-
-            messages.success(request, f"✅ {count_added} jours de fermeture ajoutés pour la période sélectionnée.")
+            nombre_jours = (date_fin - date_debut).days + 1
+            messages.success(request, f"✅ Période de fermeture de {nombre_jours} jour(s) ajoutée "
+                                      f"pour {len(salons)} salon(s).")
             return redirect('liste_jours_speciaux', pk=salon.id)
     else:
-        form = PeriodeVacancesForm()
+        form = PeriodeVacancesForm(salon=salon)
 
     context = {
         'nom_entreprise': 'Saint Jolie',
@@ -339,14 +293,13 @@ def ajouter_periode_vacances(request, pk):
 def supprimer_periode_vacances(request, salon_pk):
     salon = get_object_or_404(Salon, pk=salon_pk)
     if request.method == 'POST':
-        ids_to_delete_str = request.POST.get('ids_to_delete', '')
-        ids_to_delete = [int(id) for id in ids_to_delete_str.split(',') if id]
-
-        # Vérification de sécurité
-        jours_speciaux_a_supprimer = JourSpecial.objects.filter(id__in=ids_to_delete, salon=salon)
+        periode_id = request.POST.get('periode_id', '')
+        # Vérification de sécurité : la période doit appartenir au salon
+        periode = PeriodeFermeture.objects.filter(
+            pk=int(periode_id) if periode_id.isdigit() else None, salon=salon).first()
 
-        if jours_speciaux_a_supprimer.count() == len(ids_to_delete):
-            jours_speciaux_a_supprimer.delete()
+        if periode:
+            periode.delete()
             messages.success(request, "La période de fermeture a été supprimée avec succès.")
         else:
             messages.error(request, "Erreur lors de la suppression de la période.")
@@ -1,21 +1,39 @@
 # GestionClient/gestion/views/rendezvous.py
 
-from datetime import datetime
+from datetime import date, timedelta
+from django.db import transaction, IntegrityError
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Prefetch
 from django.utils import timezone
 from django.urls import reverse
 
 from gestion.models import RendezVous, Salon, Soin, Utilisateur, SoinSalonDetail
-from gestion.forms.rendezvous_forms import RendezVousForm, ModifierStatutForm
+from gestion.forms.rendezvous_forms import RendezVousForm, ModifierStatutForm, FiltreRendezVousForm
 from gestion.decorateurs import professionnel_required, eleve_or_professionnel_required
+from gestion.services import cache_reference
+from gestion.services.calendrier import debut_de_journee
+from gestion.services.disponibilites import calculer_creneaux_disponibles
+from gestion.services.pagination import paginer_par_curseur
+from gestion.services.reservation import enregistrer_rendezvous
+from gestion.services.validation import MESSAGE_CHEVAUCHEMENT_CLIENT, est_chevauchement_client
+
+# Nombre maximal de jours couverts par une seule demande de disponibilités.
+DISPONIBILITES_JOURS_MAX = 31
+
+# Fenêtre par défaut de la liste de tous les rendez-vous, en jours autour d'aujourd'hui.
+RENDEZVOUS_TOUS_JOURS_AVANT = 7
+RENDEZVOUS_TOUS_JOURS_APRES = 30
+
+# Nombre maximal de rendez-vous à venir affichés dans « Mes rendez-vous » ; l'historique est paginé.
+MES_RENDEZVOUS_FUTURS_MAX = 50
+MES_RENDEZVOUS_PASSES_PAR_PAGE = 20
 
 
 @login_required
 def rendezvous_view(request):
-    rendezvous = RendezVous.objects.all().order_by('date', 'heure_debut')
+    rendezvous = RendezVous.objects.pour_liste().order_by('debut')
     context = {
         'nom_entreprise': 'Saint Jolie',
         'rendezvous': rendezvous,
@@ -29,13 +47,8 @@ def ajouter_rendezvous(request, salon_id):
     salon = get_object_or_404(Salon, id=salon_id)
     if request.method == 'POST':
         form = RendezVousForm(request.POST, salon=salon, user=request.user)
-        if form.is_valid():
-            rendezvous = form.save(commit=False)
-            # --- LA LIGNE MANQUANTE ICI POUR ajouter_rendezvous ---
-            rendezvous.heure_fin = form.cleaned_data['heure_fin']  # Récupérer heure_fin calculée
-            # --- FIN DE LA LIGNE MANQUANTE ---
-            rendezvous.salon = salon
-            rendezvous.save()
+        # Vérification finale et insertion atomiques, sous verrou (salon, date)
+        if form.is_valid() and enregistrer_rendezvous(form, salon=salon):
             messages.success(request, "✅ Rendez-vous ajouté avec succès.")
             return redirect('detail_salon', pk=salon.id)
         else:
@@ -74,10 +87,7 @@ def modifier_rendezvous(request, rendezvous_id):
             user=request.user,
             for_self_appointment=is_personal_appointment
         )
-        if form.is_valid():
-            rendezvous = form.save(commit=False)
-            rendezvous.heure_fin = form.cleaned_data['heure_fin']
-            rendezvous.save()
+        if form.is_valid() and enregistrer_rendezvous(form):
             messages.success(request, "✅ Rendez-vous modifié avec succès.")
             if request.user.is_professional:
                 return redirect('rendezvous_tous')
@@ -129,23 +139,19 @@ def supprimer_rendezvous(request, rendezvous_id):
 
 @login_required
 def mes_rendezvous_view(request):
-    # Récupère tous les rendez-vous de l'utilisateur connecté, triés par date et heure
-    rendezvous_all = RendezVous.objects.filter(utilisateur=request.user).order_by('date', 'heure_debut')
-
-    # Obtient la date et l'heure actuelles
-    maintenant = datetime.now()
-
-    # Crée des listes pour les rendez-vous futurs et passés
-    rendezvous_futurs = []
-    rendezvous_passes = []
-
-    # Parcourt les rendez-vous et les trie en fonction de la date et de l'heure de fin
-    for rv in rendezvous_all:
-        rendezvous_fin = datetime.combine(rv.date, rv.heure_fin)
-        if rendezvous_fin > maintenant:
-            rendezvous_futurs.append(rv)
-        else:
-            rendezvous_passes.append(rv)
+    # Séparation à venir / passés faite par la base sur la colonne fin (index client + debut) :
+    # deux requêtes bornées, quelle que soit la longueur de l'historique du client.
+    rendezvous_client = RendezVous.objects.pour_liste().filter(utilisateur=request.user)
+    maintenant = timezone.now()
+    rendezvous_futurs = list(
+        rendezvous_client.filter(fin__gt=maintenant).order_by('debut', 'id')[:MES_RENDEZVOUS_FUTURS_MAX])
+
+    # Historique du plus récent au plus ancien, paginé par clé sur (debut, id).
+    rendezvous_passes = paginer_par_curseur(
+        rendezvous_client.filter(fin__lte=maintenant), ['-debut', '-id'],
+        apres=request.GET.get('apres'), avant=request.GET.get('avant'),
+        taille=MES_RENDEZVOUS_PASSES_PAR_PAGE,
+    )
 
     # Le dictionnaire de contexte contient maintenant les deux listes
     context = {
@@ -160,10 +166,41 @@ def mes_rendezvous_view(request):
 
 @eleve_or_professionnel_required
 def rendezvous_tous_view(request):
-    rendezvous_list = RendezVous.objects.all().order_by('date', 'heure_debut')
+    # Fenêtre affichée par défaut autour d'aujourd'hui, élargissable avec les filtres de dates.
+    du_defaut = date.today() - timedelta(days=RENDEZVOUS_TOUS_JOURS_AVANT)
+    au_defaut = date.today() + timedelta(days=RENDEZVOUS_TOUS_JOURS_APRES)
+
+    # La fenêtre s'applique dès que du/au sont absents de l'URL, y compris sur les pages suivantes, dont les
+    # liens ne portent que le curseur : sans elle, chaque page balaierait toute la table.
+    donnees = request.GET.copy()
+    donnees.setdefault('du', du_defaut.isoformat())
+    donnees.setdefault('au', au_defaut.isoformat())
+    filtres = FiltreRendezVousForm(donnees)
+    criteres = filtres.cleaned_data if filtres.is_valid() else {'du': du_defaut, 'au': au_defaut}
+
+    rendezvous_list = RendezVous.objects.pour_liste()
+    if criteres.get('salon'):
+        rendezvous_list = rendezvous_list.filter(salon=criteres['salon'])
+    if criteres.get('du'):
+        rendezvous_list = rendezvous_list.filter(debut__gte=debut_de_journee(criteres['du']))
+    if criteres.get('au'):
+        rendezvous_list = rendezvous_list.filter(debut__lt=debut_de_journee(criteres['au'] + timedelta(days=1)))
+    if criteres.get('statut'):
+        rendezvous_list = rendezvous_list.filter(statut=criteres['statut'])
+    if criteres.get('soin'):
+        rendezvous_list = rendezvous_list.filter(soin_detail__soin=criteres['soin'])
+
+    # Pagination par clé sur (debut, id) : le coût d'une page ne dépend pas de sa profondeur.
+    page = paginer_par_curseur(
+        rendezvous_list, ['debut', 'id'],
+        apres=request.GET.get('apres'), avant=request.GET.get('avant'),
+    )
+
     context = {
         'nom_entreprise': 'Saint Jolie',
-        'rendezvous_list': rendezvous_list,
+        'rendezvous_list': page,
+        'page': page,
+        'filtres': filtres,
         'is_my_appointments_view': False,
         'title': 'Tous les rendez-vous',
     }
@@ -177,11 +214,8 @@ def choisir_salon_pour_rendezvous(request):
     """
     Vue pour lister les salons et permettre à l'utilisateur de choisir celui pour lequel il veut prendre un rendez-vous.
     """
-    # Optionnel: Préfetchez les SoinSalonDetail pour éviter N+1 requêtes si vous affichez des détails de soins ici.
-    salons = Salon.objects.prefetch_related(
-        Prefetch('soinsalondetail_set',
-                 queryset=SoinSalonDetail.objects.select_related('soin').order_by('soin__type_de_soin'))
-    ).all()
+    # Catalogue des salons et de leurs soins, servi par le cache de référence
+    salons = cache_reference.catalogue_salons()
 
     context = {
         'nom_entreprise': 'Saint Jolie',
@@ -197,17 +231,7 @@ def prendre_rendezvous_personnel(request, salon_id):
 
     if request.method == 'POST':
         form = RendezVousForm(request.POST, salon=salon, user=request.user, for_self_appointment=True)
-        if form.is_valid():
-            rendezvous = form.save(commit=False)
-
-            # --- CORRECTION ICI ---
-            rendezvous.heure_fin = form.cleaned_data['heure_fin']  # Récupère heure_fin calculée par le formulaire
-            # --- FIN DE LA CORRECTION ---
-
-            rendezvous.utilisateur = request.user
-            rendezvous.salon = salon
-            rendezvous.save()
-
+        if form.is_valid() and enregistrer_rendezvous(form, utilisateur=request.user, salon=salon):
             messages.success(request, "✅ Votre rendez-vous a été pris avec succès.")
             return redirect('mes_rendezvous')
         else:
@@ -224,6 +248,47 @@ def prendre_rendezvous_personnel(request, salon_id):
     return render(request, 'gestion/rendezvous/prendre_rendezvous_personnel.html', context)
 
 
+@login_required
+def disponibilites_salon(request, salon_id):
+    """
+    Retourne en JSON toutes les heures de début libres pour un soin du salon sur une période.
+    Paramètres GET : 'soin_detail' (obligatoire), 'du' et 'au' (AAAA-MM-JJ, par défaut les 7 prochains jours).
+    """
+    salon = get_object_or_404(Salon, id=salon_id)
+
+    try:
+        soin_detail_id = int(request.GET.get('soin_detail', ''))
+    except ValueError:
+        return JsonResponse({'erreur': "Le paramètre 'soin_detail' est obligatoire."}, status=400)
+    soin_detail = get_object_or_404(SoinSalonDetail, pk=soin_detail_id, salon=salon)
+
+    try:
+        date_debut = date.fromisoformat(request.GET['du']) if request.GET.get('du') else date.today()
+        date_fin = date.fromisoformat(request.GET['au']) if request.GET.get('au') else date_debut + timedelta(days=6)
+    except ValueError:
+        return JsonResponse({'erreur': "Les dates doivent être au format AAAA-MM-JJ."}, status=400)
+
+    if date_fin < date_debut:
+        return JsonResponse({'erreur': "La date de fin doit être postérieure à la date de début."}, status=400)
+    if (date_fin - date_debut).days >= DISPONIBILITES_JOURS_MAX:
+        return JsonResponse(
+            {'erreur': f"La période demandée ne peut pas dépasser {DISPONIBILITES_JOURS_MAX} jours."}, status=400)
+
+    creneaux = calculer_creneaux_disponibles(salon, soin_detail, date_debut, date_fin)
+
+    return JsonResponse({
+        'salon': salon.id,
+        'soin_detail': soin_detail.id,
+        'duree_minutes': int(soin_detail.duree.total_seconds() / 60),
+        'du': date_debut.isoformat(),
+        'au': date_fin.isoformat(),
+        'creneaux': {
+            jour.isoformat(): [heure.strftime('%H:%M') for heure in heures]
+            for jour, heures in creneaux.items()
+        },
+    })
+
+
 # La nouvelle vue pour la modification du statut
 @professionnel_required
 def modifier_statut_rendezvous(request, pk):
@@ -242,10 +307,18 @@ def modifier_statut_rendezvous(request, pk):
     if request.method == 'POST':
         form = ModifierStatutForm(request.POST, instance=rendezvous)
         if form.is_valid():
-            form.save()
-            messages.success(request,
-                             f"Le statut du rendez-vous a été mis à jour sur '{rendezvous.get_statut_display()}'.")
-            return redirect('anciens_rendezvous', pk=rendezvous.salon.id)
+            try:
+                with transaction.atomic():
+                    form.save()
+            except IntegrityError as erreur:
+                # Réactiver un rendez-vous annulé peut le faire chevaucher un autre rendez-vous du client.
+                if not est_chevauchement_client(erreur):
+                    raise
+                form.add_error(None, MESSAGE_CHEVAUCHEMENT_CLIENT)
+            else:
+                messages.success(request,
+                                 f"Le statut du rendez-vous a été mis à jour sur '{rendezvous.get_statut_display()}'.")
+                return redirect('anciens_rendezvous', pk=rendezvous.salon.id)
     else:
         form = ModifierStatutForm(instance=rendezvous)
 
@@ -1,15 +1,16 @@
 # GestionClient/gestion/views/salon_views.py
-from collections import defaultdict
-from datetime import datetime, timedelta, date
+from datetime import datetime, date
 from django.contrib import messages
+from django.http import HttpResponseBadRequest
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.utils import formats
 
 from gestion.decorateurs import professionnel_required, eleve_or_professionnel_required
 from gestion.forms.salon_forms import SalonForm
-# NOUVEAU: Importer JourSpecial et PlageHoraireSpeciale
-from gestion.models import Salon, RendezVous, Jour, PlageHoraire, JourSpecial, PlageHoraireSpeciale
+from gestion.models import Salon, RendezVous
+from gestion.services.archives import index_par_mois, lire_mois, du_mois
+from gestion.services.calendrier import debut_de_journee
+from gestion.services.horaires import charger_horaires_salon
 
 
 # --- VUES LIÉES AUX SALONS UNIQUEMENT ---
@@ -30,95 +31,77 @@ def detail_salon(request, pk):
     # NOUVEAU : Récupération de l'URL de la page précédente (HTTP_REFERER)
     referer = request.META.get('HTTP_REFERER')
 
-    # Récupération et organisation des plages horaires régulières
-    jours_semaine = Jour.objects.order_by('numero')
-    horaires_par_jour = {}
-    for jour in jours_semaine:
-        horaires_par_jour[jour.nom] = PlageHoraire.objects.filter(salon=salon, jour=jour).order_by('heure_debut')
-
-    # --- Logique de regroupement des jours spéciaux ---
-    all_jours_speciaux = JourSpecial.objects.filter(salon=salon).order_by('date')
-    grouped_jours_speciaux = []
-    current_period = None
-
-    for js in all_jours_speciaux:
-        if js.est_ferme:
-            if (current_period and current_period['type'] == 'period_ferme' and js.date ==
-                    current_period['date_fin'] + timedelta(days=1)):
-                current_period['date_fin'] = js.date
-                current_period['ids'].append(js.id)
-            else:
-                if current_period:
-                    grouped_jours_speciaux.append(current_period)
-                current_period = {
-                    'type': 'period_ferme',
-                    'date_debut': js.date,
-                    'date_fin': js.date,
-                    'est_ferme': True,
-                    'ids': [js.id]
-                }
-        else:
-            if current_period:
-                grouped_jours_speciaux.append(current_period)
-            grouped_jours_speciaux.append({
-                'type': 'single_jour',
-                'jour_special': js,
-                'est_ferme': False,
-                'plages_speciales': list(js.plages_specifiques.all())
-            })
-            current_period = None
-
-    if current_period:
-        grouped_jours_speciaux.append(current_period)
-    # --- Fin de la logique de regroupement des jours spéciaux ---
-
-    # --- DÉBUT MODIFICATION : Logique de regroupement des rendez-vous par mois ---
-    rendezvous_par_mois = defaultdict(list)
+    # Plages régulières, jours spéciaux et leurs plages chargés en un nombre fixe de requêtes
+    horaires = charger_horaires_salon(salon)
+
+    # Rendez-vous futurs : index des mois calculé en base, seul le mois en cours est chargé.
+    # Les autres mois sont servis à la demande par rendezvous_futurs_mois.
+    index_mois = []
+    rendezvous_du_mois = []
+    mois_courant = date.today().replace(day=1)
 
     # NOUVELLE LOGIQUE : Si l'utilisateur est un professionnel OU un élève, il voit TOUS les rendez-vous du salon.
     if request.user.is_professional or request.user.role == 'eleve':
-        rendezvous_futurs = RendezVous.objects.filter(
-            salon=salon,
-            date__gte=date.today()
-        ).order_by('date', 'heure_debut')
-
-        if rendezvous_futurs:
-            for rd in rendezvous_futurs:
-                mois_annee_key = formats.date_format(rd.date, "F Y").capitalize()
-                rendezvous_par_mois[mois_annee_key].append(rd)
-    # --- FIN MODIFICATION ---
+        futurs = _rendezvous_futurs(salon)
+        index_mois = index_par_mois(futurs, decroissant=False)
+        if index_mois and index_mois[0].mois == mois_courant:
+            rendezvous_du_mois = du_mois(futurs.pour_liste(), mois_courant).order_by('debut', 'id')
 
     context = {
         'nom_entreprise': 'Saint Jolie',
         'salon': salon,
-        'horaires_par_jour': horaires_par_jour,
-        'grouped_jours_speciaux': grouped_jours_speciaux,
-        'rendezvous_par_mois': dict(rendezvous_par_mois),
+        'horaires_par_jour': horaires.horaires_par_jour,
+        'grouped_jours_speciaux': horaires.grouped_jours_speciaux,
+        'index_mois': index_mois,
+        'mois_courant': mois_courant,
+        'rendezvous_du_mois': rendezvous_du_mois,
         # NOUVEAU : Passer l'URL de la page précédente au template
         'referer': referer,
     }
     return render(request, 'gestion/salon/detail_salon.html', context)
 
 
+def _rendezvous_futurs(salon):
+    """Rendez-vous du salon à partir d'aujourd'hui (index salon + debut)."""
+    return RendezVous.objects.filter(salon=salon, debut__gte=debut_de_journee(date.today()))
+
+
+@eleve_or_professionnel_required
+def rendezvous_futurs_mois(request, pk):
+    """
+    Fragment HTML des rendez-vous futurs d'un salon pour un mois (?mois=AAAA-MM), chargé par detail_salon
+    à l'ouverture de l'onglet correspondant.
+    """
+    salon = get_object_or_404(Salon, pk=pk)
+    mois = lire_mois(request.GET.get('mois'))
+    if mois is None:
+        return HttpResponseBadRequest("Paramètre 'mois' invalide (format attendu : AAAA-MM).")
+
+    rendezvous = du_mois(_rendezvous_futurs(salon).pour_liste(), mois).order_by('debut', 'id')
+    return render(request, 'gestion/salon/_rendezvous_mois.html', {'rendezvous': rendezvous})
+
+
 @eleve_or_professionnel_required
 def anciens_rendezvous(request, pk):
     salon = get_object_or_404(Salon, pk=pk)
 
-    # Récupérer les rendez-vous passés du salon
-    anciens_rendezvous_list = RendezVous.objects.filter(
-        salon=salon,
-        date__lt=date.today()
-    ).order_by('-date', '-heure_debut')  # Trier du plus récent au plus ancien
+    # Rendez-vous passés du salon : seul l'index des mois (calculé en base) et le mois choisi sont chargés
+    anciens = RendezVous.objects.filter(salon=salon, debut__lt=debut_de_journee(date.today()))
+    index_mois = index_par_mois(anciens)
+
+    mois_choisi = lire_mois(request.GET.get('mois'))
+    if mois_choisi is None and index_mois:
+        mois_choisi = index_mois[0].mois
 
-    # Grouper les rendez-vous par mois
-    rendezvous_par_mois = defaultdict(list)
-    for rd in anciens_rendezvous_list:
-        mois_annee_key = formats.date_format(rd.date, "F Y").capitalize()
-        rendezvous_par_mois[mois_annee_key].append(rd)
+    rendezvous_du_mois = []
+    if mois_choisi:
+        rendezvous_du_mois = du_mois(anciens.pour_liste(), mois_choisi).order_by('-debut', '-id')
 
     context = {
         'salon': salon,
-        'rendezvous_par_mois': dict(rendezvous_par_mois),
+        'index_mois': index_mois,
+        'mois_choisi': mois_choisi,
+        'rendezvous_du_mois': rendezvous_du_mois,
         'title': f'Anciens Rendez-vous pour {salon.nom}',
         'nom_entreprise': 'Saint Jolie',
     }
@@ -6,6 +6,7 @@ from gestion.forms.soin_forms import SoinForm, SoinSalonDetailForm
 from gestion.models import Soin, Salon, SoinSalonDetail, \
     RendezVous  # Assure-toi d'importer RendezVous si utilisé ailleurs
 from gestion.decorateurs import professionnel_required  # Assure-toi que le chemin est correct
+from gestion.services import cache_reference
 
 
 # Les imports suivants ne sont plus strictement nécessaires ici si la gestion de durée/prix est dans les forms
@@ -22,7 +23,7 @@ def soin_list(request):
     """
     Affiche la liste de tous les salons, permettant de gérer les soins par salon.
     """
-    salons = Salon.objects.all().order_by('nom')  # Récupère tous les salons
+    salons = cache_reference.catalogue_salons()  # Tous les salons, servis par le cache de référence
     context = {
         'nom_entreprise': "Saint Jolie",
         'salons': salons,
@@ -1,17 +1,19 @@
 # gestion/views/utilisateur_views.py
 
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.db.models.functions import Lower
 from django.contrib.auth.forms import SetPasswordForm
 
-from django.db.models import Q
 from django.db.models.functions import Lower
 
 # Importe vos modèles et formulaires spécifiques
 from gestion.models import Utilisateur
 from gestion.forms.utilisateur_forms import UtilisateurCreationForm, UtilisateurChangeForm
+from gestion.services.pagination import paginer_par_curseur
+from gestion.services.recherche import suggerer_utilisateurs, libelle_utilisateur, rechercher_utilisateurs
 
 # --- DÉBUT MODIFICATION : IMPORTS DES DÉCORATEURS ---
 # Ancienne ligne: from gestion.decorateurs import professionnel_required
@@ -20,6 +22,9 @@ from gestion.decorateurs import professionnel_required, eleve_or_professionnel_r
 
 User = get_user_model()
 
+# Nombre d'utilisateurs par page de la liste.
+UTILISATEURS_PAR_PAGE = 50
+
 
 # Assure-toi que ROLES est bien défini ou importé si tu l'utilises.
 # Si c'est une constante locale que tu as définie, elle pourrait ressembler à ça :
@@ -36,27 +41,30 @@ def utilisateur_list(request):
     # Commencez avec la liste de tous les utilisateurs (sauf les superutilisateurs)
     utilisateurs = Utilisateur.objects.all().exclude(is_superuser=True)
 
-    # Appliquez le filtre de recherche si une requête est présente
-    if query:
-        utilisateurs = utilisateurs.filter(
-            Q(last_name__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(username__icontains=query) |
-            Q(email__icontains=query)
-        )
-
     # Appliquez le filtre actif/inactif
     if show_inactive:
         utilisateurs = utilisateurs.filter(is_active=False)
     else:
         utilisateurs = utilisateurs.filter(is_active=True)
 
-    # Triez les résultats
-    utilisateurs = utilisateurs.order_by(Lower('last_name'), Lower('first_name'))
+    # Recherche par l'index plein texte (les plus pertinents d'abord), sinon ordre alphabétique indexé.
+    # Dans les deux cas, pagination par clé : le coût d'une page ne dépend pas du nombre d'utilisateurs.
+    if query and query.strip():
+        utilisateurs = rechercher_utilisateurs(utilisateurs, query)
+        champs_tri = ['-pertinence', '-id']
+    else:
+        utilisateurs = utilisateurs.annotate(nom_minuscule=Lower('last_name'), prenom_minuscule=Lower('first_name'))
+        champs_tri = ['nom_minuscule', 'prenom_minuscule', 'id']
+    page = paginer_par_curseur(
+        utilisateurs, champs_tri,
+        apres=request.GET.get('apres'), avant=request.GET.get('avant'),
+        taille=UTILISATEURS_PAR_PAGE,
+    )
 
     context = {
         'nom_entreprise': "Saint Jolie",
-        'utilisateurs': utilisateurs,
+        'utilisateurs': page,
+        'page': page,
         'show_inactive': show_inactive,
         'title': "Liste des Utilisateurs",
         'query': query,  # <-- pour que la boxe (la variable query) recherche se souvient ce que l'utilisateur à écrit
@@ -64,6 +72,18 @@ def utilisateur_list(request):
     return render(request, 'gestion/utilisateur/utilisateurs.html', context)
 
 
+@eleve_or_professionnel_required
+def utilisateur_recherche(request):
+    """
+    Suggestions pour le sélecteur de bénéficiaire : JSON {'resultats': [{'id', 'libelle'}, ...]} des utilisateurs
+    dont le nom ou le prénom commence par le paramètre GET 'q', limité à quelques résultats.
+    """
+    utilisateurs = suggerer_utilisateurs(request.GET.get('q', ''))
+    return JsonResponse({
+        'resultats': [{'id': u.pk, 'libelle': libelle_utilisateur(u)} for u in utilisateurs],
+    })
+
+
 # Les vues suivantes restent sous @professionnel_required car elles modifient des données
 # et sont réservées aux professionnels.
 @eleve_or_professionnel_required